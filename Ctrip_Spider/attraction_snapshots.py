@@ -0,0 +1,243 @@
+import argparse
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from frontier import _Transaction
+from log import CtripSpiderLogger
+
+# 顺序没有意义的列表字段，比较前排序
+UNORDERED_FIELDS = frozenset({'tags'})
+
+
+def normalize_record(record: dict, ignore_fields=()) -> str:
+    """把景点记录转换为规范的JSON文本：键排序，字符串去除首尾空白，UNORDERED_FIELDS 中的列表排序，忽略指定字段
+
+    Args:
+        record: 景点记录（_parse_poi_basic_info 的结果）
+        ignore_fields: 不参与比较的字段名
+
+    Returns:
+        str: 规范化的JSON文本
+    """
+    def clean(value):
+        if isinstance(value, str):
+            return value.strip()
+        if isinstance(value, dict):
+            return {key: clean(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [clean(item) for item in value]
+        return value
+
+    normalized = {key: clean(value) for key, value in record.items() if key not in ignore_fields}
+    for key in UNORDERED_FIELDS & normalized.keys():
+        if isinstance(normalized[key], list):
+            normalized[key] = sorted(normalized[key], key=lambda item: json.dumps(item, ensure_ascii=False))
+    return json.dumps(normalized, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+
+
+def record_hash(record: dict, ignore_fields=()) -> str:
+    """计算规范化景点记录的哈希
+
+    Args:
+        record: 景点记录
+        ignore_fields: 不参与比较的字段名
+
+    Returns:
+        str: SHA-1 十六进制摘要
+    """
+    return hashlib.sha1(normalize_record(record, ignore_fields).encode('utf-8')).hexdigest()
+
+
+class AttractionSnapshotStore:
+    """景点列表的变更快照库
+
+    每次运行把新抓取的景点列表与当前状态逐条比较哈希，只把新增、修改和删除写入变更表；
+    当前状态表是合并了所有变更的最新景点列表。写入量和下游需要处理的数据量只与变更数成正比，
+    与景点总数无关。删除只在同一范围（如同一地区）内检测。
+    apply 先读完景点列表并计算哈希，再在一个短的写事务中比较和写入，抓取期间不占用数据库写锁。
+
+    表结构:
+        snapshots(snapshot_id, scope, created_at, inserted, updated, deleted, unchanged)
+        changes(snapshot_id, poi_id, op, record)      op 为 insert/update/delete，删除时 record 为旧记录
+        current(scope, poi_id, hash, record, snapshot_id)
+    """
+
+    def __init__(self, db_path: str, ignore_fields=(), logger: CtripSpiderLogger = None):
+        """初始化快照库
+
+        Args:
+            db_path: SQLite数据库文件路径
+            ignore_fields: 比较时忽略的字段名（如每次请求都会变化的字段）
+            logger: 日志记录器实例
+        """
+        self.db_path = db_path
+        self.ignore_fields = frozenset(ignore_fields)
+        self.logger = logger or CtripSpiderLogger("AttractionSnapshotStore", "logs")
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS snapshots (
+                    snapshot_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    scope TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    inserted INTEGER NOT NULL,
+                    updated INTEGER NOT NULL,
+                    deleted INTEGER NOT NULL,
+                    unchanged INTEGER NOT NULL
+                )''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS changes (
+                    snapshot_id INTEGER NOT NULL,
+                    poi_id TEXT NOT NULL,
+                    op TEXT NOT NULL,
+                    record TEXT NOT NULL,
+                    PRIMARY KEY (snapshot_id, poi_id)
+                )''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS current (
+                    scope TEXT NOT NULL,
+                    poi_id TEXT NOT NULL,
+                    hash TEXT NOT NULL,
+                    record TEXT NOT NULL,
+                    snapshot_id INTEGER NOT NULL,
+                    PRIMARY KEY (scope, poi_id)
+                )''')
+
+    def _connect(self):
+        """获取当前线程的数据库连接"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return _Transaction(conn)
+
+    def apply(self, attractions, scope: str = '', detect_deletes: bool = True) -> dict:
+        """把一次完整抓取的景点列表与当前状态比较，记录一个新快照
+
+        Args:
+            attractions: 景点记录列表或迭代器（如 iter_attractions 的结果），需包含 poi_id；
+                         迭代器在开启写事务之前读完
+            scope: 抓取范围（如地区ID），删除只在同一范围内检测
+            detect_deletes: 是否把本次未出现的景点记为删除，抓取不完整时应为False
+
+        Returns:
+            dict: {'snapshot_id', 'inserted', 'updated', 'deleted', 'unchanged'}
+        """
+        scope = str(scope)
+        stats = {'inserted': 0, 'updated': 0, 'deleted': 0, 'unchanged': 0}
+        fetched = {}
+        for attraction in attractions:
+            poi_id = str(attraction.get('poi_id', ''))
+            if poi_id and poi_id not in fetched:
+                fetched[poi_id] = (record_hash(attraction, self.ignore_fields), attraction)
+
+        with self._connect() as conn:
+            known = dict(conn.execute('SELECT poi_id, hash FROM current WHERE scope = ?', (scope,)))
+            snapshot_id = conn.execute(
+                'INSERT INTO snapshots (scope, created_at, inserted, updated, deleted, unchanged) '
+                'VALUES (?, ?, 0, 0, 0, 0)', (scope, time.time())).lastrowid
+            seen = fetched.keys()
+            for poi_id, (digest, attraction) in fetched.items():
+                old_digest = known.get(poi_id)
+                if old_digest == digest:
+                    stats['unchanged'] += 1
+                    continue
+                op = 'insert' if old_digest is None else 'update'
+                stats['inserted' if op == 'insert' else 'updated'] += 1
+                record = json.dumps(attraction, ensure_ascii=False)
+                conn.execute('INSERT INTO changes (snapshot_id, poi_id, op, record) VALUES (?, ?, ?, ?)',
+                             (snapshot_id, poi_id, op, record))
+                conn.execute('INSERT OR REPLACE INTO current (scope, poi_id, hash, record, snapshot_id) '
+                             'VALUES (?, ?, ?, ?, ?)', (scope, poi_id, digest, record, snapshot_id))
+
+            if detect_deletes:
+                for poi_id in known.keys() - seen:
+                    row = conn.execute('SELECT record FROM current WHERE scope = ? AND poi_id = ?',
+                                       (scope, poi_id)).fetchone()
+                    conn.execute('INSERT INTO changes (snapshot_id, poi_id, op, record) VALUES (?, ?, ?, ?)',
+                                 (snapshot_id, poi_id, 'delete', row[0]))
+                    conn.execute('DELETE FROM current WHERE scope = ? AND poi_id = ?', (scope, poi_id))
+                    stats['deleted'] += 1
+            else:
+                stats['unchanged'] += len(known.keys() - seen)
+
+            conn.execute('UPDATE snapshots SET inserted = ?, updated = ?, deleted = ?, unchanged = ? '
+                         'WHERE snapshot_id = ?', (stats['inserted'], stats['updated'], stats['deleted'],
+                                                   stats['unchanged'], snapshot_id))
+
+        stats['snapshot_id'] = snapshot_id
+        self.logger.info(f"景点快照 {snapshot_id}（范围 {scope or '全部'}）: 新增 {stats['inserted']} 个，"
+                         f"修改 {stats['updated']} 个，删除 {stats['deleted']} 个，未变化 {stats['unchanged']} 个")
+        return stats
+
+    def changes_since(self, snapshot_id: int = 0, scope: str = None):
+        """按快照顺序读取某个快照之后的变更，供下游只处理变化的景点
+
+        Args:
+            snapshot_id: 起始快照ID（不含），0表示全部
+            scope: 只读取该范围的变更，默认为全部范围
+
+        Yields:
+            dict: {'snapshot_id', 'poi_id', 'op', 'record'}
+        """
+        query = ('SELECT c.snapshot_id, c.poi_id, c.op, c.record FROM changes c '
+                 'JOIN snapshots s ON s.snapshot_id = c.snapshot_id WHERE c.snapshot_id > ?')
+        params = [snapshot_id]
+        if scope is not None:
+            query += ' AND s.scope = ?'
+            params.append(str(scope))
+        with self._connect() as conn:
+            rows = conn.execute(query + ' ORDER BY c.snapshot_id, c.poi_id', params).fetchall()
+        for change_snapshot, poi_id, op, record in rows:
+            yield {'snapshot_id': change_snapshot, 'poi_id': poi_id, 'op': op, 'record': json.loads(record)}
+
+    def current(self, scope: str = None):
+        """读取合并后的当前景点列表
+
+        Args:
+            scope: 只读取该范围，默认为全部范围
+
+        Yields:
+            dict: 景点记录
+        """
+        query, params = 'SELECT record FROM current', ()
+        if scope is not None:
+            query, params = query + ' WHERE scope = ?', (str(scope),)
+        with self._connect() as conn:
+            rows = conn.execute(query + ' ORDER BY scope, poi_id', params).fetchall()
+        for (record,) in rows:
+            yield json.loads(record)
+
+    def snapshots(self) -> list:
+        """列出所有快照的统计
+
+        Returns:
+            list: [{'snapshot_id', 'scope', 'created_at', 'inserted', 'updated', 'deleted', 'unchanged'}]
+        """
+        with self._connect() as conn:
+            rows = conn.execute('SELECT snapshot_id, scope, created_at, inserted, updated, deleted, unchanged '
+                                'FROM snapshots ORDER BY snapshot_id').fetchall()
+        keys = ('snapshot_id', 'scope', 'created_at', 'inserted', 'updated', 'deleted', 'unchanged')
+        return [dict(zip(keys, row)) for row in rows]
+
+
+# 使用示例：python attraction_snapshots.py --db ./Datasets/attractions.db --district 9 --pages 5
+if __name__ == "__main__":
+    from sight_list import CtripAttractionScraper
+
+    parser = argparse.ArgumentParser(description="抓取景点列表并记录相对上次的变更")
+    parser.add_argument('--db', default='./Datasets/attractions.db', help="快照数据库文件")
+    parser.add_argument('--district', type=int, required=True, help="地区ID")
+    parser.add_argument('--pages', type=int, default=1, help="抓取页数")
+    parser.add_argument('--count', type=int, default=20, help="每页数量")
+    options = parser.parse_args()
+
+    main_logger = CtripSpiderLogger("AttractionSnapshotMain", "logs")
+    store = AttractionSnapshotStore(options.db, logger=main_logger)
+    scraper = CtripAttractionScraper(logger=main_logger)
+    print(json.dumps(scraper.snapshot_attractions(options.district, store, options.pages, options.count),
+                     ensure_ascii=False))
@@ -0,0 +1,322 @@
+import argparse
+import csv
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from compressed_io import is_comment_file, open_input
+from log import CtripSpiderLogger
+from mock_server import MockCtripServer
+
+try:
+    import resource
+except ImportError:
+    # Windows 没有 resource 模块，不统计进程内存峰值
+    resource = None
+
+
+def measure(name: str, func, trace_memory: bool = True) -> dict:
+    """运行一次基准测试并测量耗时、CPU时间和内存峰值（Python分配峰值，以及到目前为止的进程RSS峰值）
+
+    Args:
+        name: 基准测试名称
+        func: 被测函数，返回 (页数, 数据行数)
+        trace_memory: 是否使用 tracemalloc 统计Python内存峰值（会增加CPU开销）
+
+    Returns:
+        dict: 基准测试结果
+    """
+    if trace_memory:
+        tracemalloc.start()
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    pages, rows = func()
+    cpu_time = time.process_time() - cpu_start
+    wall_time = time.perf_counter() - wall_start
+    peak_memory = None
+    if trace_memory:
+        peak_memory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    return {
+        'name': name,
+        'pages': pages,
+        'rows': rows,
+        'wall_time': round(wall_time, 4),
+        'cpu_time': round(cpu_time, 4),
+        'pages_per_sec': round(pages / wall_time, 2) if wall_time else 0,
+        'rows_per_sec': round(rows / wall_time, 2) if wall_time else 0,
+        'cpu_utilization': round(cpu_time / wall_time, 3) if wall_time else 0,
+        'peak_traced_bytes': peak_memory,
+        # ru_maxrss 是整个进程到目前为止的峰值，不是本项基准测试单独的内存占用，
+        # 同一进程中后面的基准测试会沿用前面的峰值；单项的内存峰值见 peak_traced_bytes
+        'process_peak_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss if resource else None,
+    }
+
+
+def bench_comment_spider(server: MockCtripServer, logger: CtripSpiderLogger, poi_count: int, max_pages: int):
+    """评论爬虫基准测试
+
+    Returns:
+        tuple: (页数, 评论条数)
+    """
+    from sight_comments import CtripCommentSpider
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        spider = CtripCommentSpider(output_dir, logger=logger, page_delay=0, poi_delay=0)
+        spider.post_url = server.url('getCommentCollapseList')
+        requests_before = server.request_counts['getCommentCollapseList']
+        spider.crawl_multiple_pois([[str(76865 + i), f"模拟景点{i}"] for i in range(poi_count)], max_pages=max_pages)
+        rows = 0
+        for file_name in os.listdir(output_dir):
+            # 输出目录中还有爬取报告和死信文件，只统计评论CSV
+            if not is_comment_file(file_name):
+                continue
+            with open_input(os.path.join(output_dir, file_name), encoding='utf-8-sig') as f:
+                rows += sum(1 for _ in f) - 1
+    return server.request_counts['getCommentCollapseList'] - requests_before, rows
+
+
+def bench_attraction_scraper(server: MockCtripServer, logger: CtripSpiderLogger, pages: int, count_per_page: int):
+    """景点列表爬虫基准测试
+
+    Returns:
+        tuple: (页数, 景点条数)
+    """
+    from sight_list import CtripAttractionScraper
+
+    scraper = CtripAttractionScraper(logger=logger)
+    scraper.url = server.url('getSightRecreationList')
+    requests_before = server.request_counts['getSightRecreationList']
+    attractions = scraper.get_attractions_with_pagination(9, pages=pages, count_per_page=count_per_page)
+    return server.request_counts['getSightRecreationList'] - requests_before, len(attractions)
+
+
+def bench_detail_fetcher(server: MockCtripServer, logger: CtripSpiderLogger, poi_count: int):
+    """景点详情获取器基准测试
+
+    Returns:
+        tuple: (请求数, 成功条数)
+    """
+    from sight_detail import AttractionDetailFetcher
+
+    fetcher = AttractionDetailFetcher(logger=logger)
+    fetcher.detail_url = server.url('getPoiMoreDetail')
+    details = [fetcher.get_detail(87211 + i) for i in range(poi_count)]
+    return poi_count, sum(1 for detail in details if detail['success'])
+
+
+def bench_sight_id(server: MockCtripServer, logger: CtripSpiderLogger, keyword_count: int):
+    """景点ID搜索器基准测试
+
+    Returns:
+        tuple: (请求数, 找到的ID数)
+    """
+    from sight_id import SightId
+
+    searcher = SightId(logger=logger)
+    searcher.search_url = server.url('search')
+    found = [searcher.search_sight_id(f"景点{i}") for i in range(keyword_count)]
+    return keyword_count, sum(1 for sight_id in found if sight_id)
+
+
+def bench_parse_scaling(pages: int = 2000, page_size: int = 50, worker_counts: list = None, batch_size: int = 16,
+                        logger: CtripSpiderLogger = None) -> list:
+    """评论解码+解析的多核扩展性基准测试：单线程解析与不同进程数的解析进程池对比
+
+    Args:
+        pages: 解析的评论页数
+        page_size: 每页评论数
+        worker_counts: 要测试的进程数列表，默认为 1、2、4 … 直到CPU核数
+        batch_size: 进程池每批页数
+        logger: 日志记录器实例
+
+    Returns:
+        list: 各配置的基准测试结果，包含相对单线程的加速比
+    """
+    from mock_server import build_comment_page
+    from parse_pool import ParsePool
+    from sight_comments import CtripCommentSpider
+
+    logger = logger or CtripSpiderLogger("Benchmark", "logs")
+    payloads = [(json.dumps(build_comment_page(76865 + i % 10, i // 10 + 1, page_size, 10 ** 6),
+                            ensure_ascii=False).encode('utf-8'), str(76865 + i % 10), i // 10 + 1)
+                for i in range(pages)]
+    if worker_counts is None:
+        cpu_count = os.cpu_count() or 1
+        worker_counts = sorted({min(2 ** i, cpu_count) for i in range(cpu_count.bit_length() + 1)})
+
+    def count_rows(results):
+        return pages, sum(len(comments or []) for comments in results)
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        spider = CtripCommentSpider(output_dir, logger=CtripSpiderLogger("BenchmarkScraper", "logs",
+                                                                         summary_interval=60))
+        results = [measure('inline', lambda: count_rows(
+            [spider._parse_comments(json.loads(content), poi_id, page) for content, poi_id, page in payloads]),
+            trace_memory=False)]
+
+    for workers in worker_counts:
+        with ParsePool(workers, batch_size, logger=logger) as pool:
+            # 预热：启动工作进程并导入解析模块
+            pool.parse_comments(payloads[:workers * batch_size])
+            results.append(measure(f'ParsePool(workers={workers})',
+                                   lambda: count_rows(pool.parse_comments(payloads)), trace_memory=False))
+
+    baseline = results[0]['wall_time']
+    for result in results:
+        result['speedup'] = round(baseline / result['wall_time'], 2) if result['wall_time'] else 0
+        logger.info(f"{result['name']}: {result['pages_per_sec']:.1f} 页/s, 加速比 {result['speedup']:.2f}x")
+    return results
+
+
+def bench_compression(pages: int = 400, page_size: int = 50, settings: list = None,
+                      logger: CtripSpiderLogger = None) -> list:
+    """评论CSV压缩输出的基准测试：不同压缩算法和级别的写入吞吐量与压缩率
+
+    Args:
+        pages: 写入的评论页数
+        page_size: 每页评论数
+        settings: 要测试的 (压缩算法, 级别) 列表，默认为未压缩、gzip 1/6/9，安装了 zstandard 时加上 zstd 1/3/10/19
+        logger: 日志记录器实例
+
+    Returns:
+        list: 各配置的基准测试结果，包含文件大小、压缩率和未压缩数据的写入速度（MB/s）
+    """
+    from compressed_io import zstandard
+    from mock_server import build_comment_page
+    from sight_comments import CtripCommentSpider
+
+    logger = logger or CtripSpiderLogger("Benchmark", "logs")
+    if settings is None:
+        settings = [(None, None), ('gzip', 1), ('gzip', 6), ('gzip', 9)]
+        if zstandard is not None:
+            settings += [('zstd', 1), ('zstd', 3), ('zstd', 10), ('zstd', 19)]
+
+    results = []
+    with tempfile.TemporaryDirectory() as output_dir:
+        spider = CtripCommentSpider(output_dir, logger=CtripSpiderLogger("BenchmarkScraper", "logs",
+                                                                         summary_interval=60))
+        comment_pages = [spider._parse_comments(build_comment_page(76865, page, page_size, pages * page_size),
+                                                '76865', page) for page in range(1, pages + 1)]
+
+        def write_all(path, codec, level):
+            spider.compression, spider.compression_level = codec, level
+            with spider._open_csv(path, 'w') as f:
+                csv.writer(f).writerow(spider.CSV_HEADER)
+            index = 0
+            # 与爬取时相同，每页评论单独追加一次
+            for comments in comment_pages:
+                with spider._open_csv(path, 'a') as f:
+                    index = spider._write_comment_rows(f, comments, '76865', '模拟景点', index)
+            return pages, index
+
+        raw_size = None
+        for codec, level in settings:
+            path = os.path.join(output_dir, f"comments_{codec or 'plain'}_{level}.csv")
+            result = measure(f"{codec or 'plain'}(level={level})", lambda: write_all(path, codec, level),
+                             trace_memory=False)
+            result['bytes'] = os.path.getsize(path)
+            raw_size = raw_size or result['bytes']
+            result['ratio'] = round(raw_size / result['bytes'], 2)
+            result['mb_per_sec'] = round(raw_size / 1024 / 1024 / result['wall_time'], 2) if result['wall_time'] else 0
+            logger.info(f"{result['name']}: {result['bytes'] / 1024:.0f}KB, 压缩率 {result['ratio']:.2f}x, "
+                        f"{result['mb_per_sec']:.1f} MB/s")
+            results.append(result)
+    return results
+
+
+def run_benchmarks(latency: float = 0.0, error_rate: float = 0.0, total_comments: int = 1000,
+                   comment_pages: int = 50, poi_count: int = 3, list_pages: int = 10, detail_count: int = 100,
+                   trace_memory: bool = True, output: str = None, logger: CtripSpiderLogger = None) -> list:
+    """在本地模拟服务器上运行所有爬虫的基准测试
+
+    Args:
+        latency: 模拟服务器每个请求的延迟（秒）
+        error_rate: 模拟服务器返回错误的概率
+        total_comments: 每个景点的评论总数
+        comment_pages: 每个景点最多爬取的评论页数
+        poi_count: 评论爬取的景点数
+        list_pages: 景点列表爬取的页数
+        detail_count: 景点详情请求数
+        trace_memory: 是否统计Python内存峰值
+        output: 结果追加写入的JSON Lines文件路径，便于多次运行对比
+        logger: 日志记录器实例
+
+    Returns:
+        list: 各爬虫的基准测试结果
+    """
+    logger = logger or CtripSpiderLogger("Benchmark", "logs")
+    # 被测爬虫使用汇总日志，避免逐条日志影响测量
+    scraper_logger = CtripSpiderLogger("BenchmarkScraper", "logs", summary_interval=60)
+
+    with MockCtripServer(latency=latency, error_rate=error_rate, total_comments=total_comments, seed=0) as server:
+        benchmarks = [
+            ('CtripCommentSpider', lambda: bench_comment_spider(server, scraper_logger, poi_count, comment_pages)),
+            ('CtripAttractionScraper', lambda: bench_attraction_scraper(server, scraper_logger, list_pages, 20)),
+            ('AttractionDetailFetcher', lambda: bench_detail_fetcher(server, scraper_logger, detail_count)),
+            ('SightId', lambda: bench_sight_id(server, scraper_logger, detail_count)),
+        ]
+        results = [measure(name, func, trace_memory) for name, func in benchmarks]
+
+    run_info = {'time': datetime.now().isoformat(timespec='seconds'), 'latency': latency, 'error_rate': error_rate}
+    for result in results:
+        result.update(run_info)
+        logger.info(
+            f"{result['name']}: {result['pages']} 页 {result['rows']} 行, 耗时 {result['wall_time']:.2f}s, "
+            f"{result['pages_per_sec']:.1f} 页/s, {result['rows_per_sec']:.1f} 行/s, CPU {result['cpu_time']:.2f}s, "
+            f"内存峰值 {(result['peak_traced_bytes'] or 0) / 1024 / 1024:.1f}MB"
+        )
+
+    if output:
+        with open(output, 'a', encoding='utf-8') as f:
+            for result in results:
+                f.write(json.dumps(result, ensure_ascii=False) + '\n')
+        logger.info(f"基准测试结果已追加到 {output}")
+    return results
+
+
+# 使用示例：python benchmark.py --latency 0.01 --output bench_results.jsonl
+#          python benchmark.py --parse-scaling --parse-workers 1,2,4
+#          python benchmark.py --compression
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="基于本地模拟服务器的爬虫基准测试")
+    parser.add_argument('--latency', type=float, default=0.0, help="模拟请求延迟（秒）")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="模拟错误率")
+    parser.add_argument('--total-comments', type=int, default=1000, help="每个景点的评论总数")
+    parser.add_argument('--comment-pages', type=int, default=50, help="每个景点最多爬取的评论页数")
+    parser.add_argument('--pois', type=int, default=3, help="评论爬取的景点数")
+    parser.add_argument('--list-pages', type=int, default=10, help="景点列表爬取的页数")
+    parser.add_argument('--details', type=int, default=100, help="景点详情请求数")
+    parser.add_argument('--no-trace-memory', action='store_true', help="不统计Python内存峰值")
+    parser.add_argument('--output', default=None, help="结果追加写入的JSON Lines文件")
+    parser.add_argument('--parse-scaling', action='store_true', help="运行解析进程池的多核扩展性基准测试")
+    parser.add_argument('--parse-pages', type=int, default=2000, help="扩展性测试解析的评论页数")
+    parser.add_argument('--parse-workers', default=None, help="扩展性测试的进程数列表，如 1,2,4,8")
+    parser.add_argument('--parse-batch-size', type=int, default=16, help="扩展性测试的每批页数")
+    parser.add_argument('--compression', action='store_true', help="运行评论CSV压缩输出的基准测试")
+    options = parser.parse_args()
+
+    if options.parse_scaling:
+        worker_counts = [int(n) for n in options.parse_workers.split(',')] if options.parse_workers else None
+        scaling = bench_parse_scaling(options.parse_pages, worker_counts=worker_counts,
+                                      batch_size=options.parse_batch_size)
+        if options.output:
+            with open(options.output, 'a', encoding='utf-8') as f:
+                for result in scaling:
+                    f.write(json.dumps(result, ensure_ascii=False) + '\n')
+        raise SystemExit(0)
+
+    if options.compression:
+        compression_results = bench_compression()
+        if options.output:
+            with open(options.output, 'a', encoding='utf-8') as f:
+                for result in compression_results:
+                    f.write(json.dumps(result, ensure_ascii=False) + '\n')
+        raise SystemExit(0)
+
+    run_benchmarks(latency=options.latency, error_rate=options.error_rate, total_comments=options.total_comments,
+                   comment_pages=options.comment_pages, poi_count=options.pois, list_pages=options.list_pages,
+                   detail_count=options.details, trace_memory=not options.no_trace_memory, output=options.output)
@@ -0,0 +1,175 @@
+import threading
+import time
+from urllib.parse import urlsplit
+from log import CtripSpiderLogger
+
+# 熔断器状态
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(Exception):
+    """接口处于熔断状态，请求未发送"""
+    retryable = False
+
+
+class CircuitBreaker:
+    """单个接口的熔断器
+
+    closed: 正常放行，连续失败达到 failure_threshold 次后进入 open；
+    open: 拒绝所有请求，cooldown 秒后进入 half_open；
+    half_open: 只放行 half_open_max_calls 个探测请求，探测成功回到 closed，失败重新进入 open。
+    所有状态变化都在锁内完成，可以在多个线程之间共享。
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, cooldown: float = 30.0, half_open_max_calls: int = 1,
+                 logger: CtripSpiderLogger = None, clock=time.monotonic):
+        """初始化熔断器
+
+        Args:
+            name: 接口名称，用于日志
+            failure_threshold: 进入 open 状态的连续失败次数
+            cooldown: open 状态持续的秒数，之后放行探测请求
+            half_open_max_calls: half_open 状态同时放行的探测请求数
+            logger: 日志记录器实例
+            clock: 计时函数，便于测试替换
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.half_open_max_calls = half_open_max_calls
+        self.logger = logger or CtripSpiderLogger("CircuitBreaker", "logs")
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+        self.open_count = 0
+        self.rejected_count = 0
+
+    @property
+    def state(self) -> str:
+        """当前状态，open 状态冷却结束后视为 half_open"""
+        with self._lock:
+            self._refresh_state()
+            return self._state
+
+    def _refresh_state(self):
+        """冷却结束后从 open 进入 half_open，需在锁内调用"""
+        if self._state == OPEN and self.clock() - self._opened_at >= self.cooldown:
+            self._state = HALF_OPEN
+            self._probes = 0
+            self.logger.info(f"接口 {self.name} 冷却结束，放行探测请求")
+
+    def before_call(self):
+        """请求前检查是否放行
+
+        Raises:
+            CircuitOpenError: 接口处于熔断状态，或 half_open 状态的探测请求已达上限
+        """
+        with self._lock:
+            self._refresh_state()
+            if self._state == CLOSED:
+                return
+            if self._state == HALF_OPEN and self._probes < self.half_open_max_calls:
+                self._probes += 1
+                return
+            self.rejected_count += 1
+            remaining = max(0.0, self.cooldown - (self.clock() - self._opened_at))
+        raise CircuitOpenError(f"接口 {self.name} 熔断中，{remaining:.1f}秒后重试")
+
+    def record_success(self):
+        """记录一次成功请求"""
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self.logger.info(f"接口 {self.name} 探测成功，恢复正常")
+            self._state = CLOSED
+            self._failures = 0
+
+    def release(self):
+        """放行的请求没有结果（如请求预算用完，请求未发送），归还 half_open 状态的探测名额"""
+        with self._lock:
+            if self._state == HALF_OPEN and self._probes > 0:
+                self._probes -= 1
+
+    def record_failure(self):
+        """记录一次失败请求"""
+        with self._lock:
+            if self._state == OPEN:
+                return
+            self._failures += 1
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = OPEN
+                self._opened_at = self.clock()
+                self.open_count += 1
+                self.logger.warning(f"接口 {self.name} 连续失败 {self._failures} 次，熔断 {self.cooldown:.0f}秒")
+
+    def stats(self) -> dict:
+        """熔断器统计
+
+        Returns:
+            dict: {'state', 'failures', 'open_count', 'rejected_count'}
+        """
+        state = self.state
+        with self._lock:
+            return {'state': state, 'failures': self._failures, 'open_count': self.open_count,
+                    'rejected_count': self.rejected_count}
+
+
+class CircuitBreakerRegistry:
+    """按接口（主机+路径）管理熔断器，多个爬虫共享同一个注册表时共享熔断状态"""
+
+    def __init__(self, failure_threshold: int = 5, cooldown: float = 30.0, half_open_max_calls: int = 1,
+                 logger: CtripSpiderLogger = None, clock=time.monotonic):
+        """初始化注册表，参数见 CircuitBreaker
+
+        Args:
+            failure_threshold: 进入 open 状态的连续失败次数
+            cooldown: open 状态持续的秒数
+            half_open_max_calls: half_open 状态同时放行的探测请求数
+            logger: 日志记录器实例
+            clock: 计时函数，便于测试替换
+        """
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.half_open_max_calls = half_open_max_calls
+        self.logger = logger or CtripSpiderLogger("CircuitBreaker", "logs")
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._breakers = {}
+
+    @staticmethod
+    def endpoint(url: str) -> str:
+        """由请求地址得到接口名称（主机+路径，不含查询参数）"""
+        parts = urlsplit(url)
+        return parts.netloc + parts.path if parts.netloc else url
+
+    def for_url(self, url: str) -> CircuitBreaker:
+        """获取请求地址对应接口的熔断器，不存在时创建
+
+        Args:
+            url: 请求地址
+
+        Returns:
+            CircuitBreaker: 熔断器
+        """
+        name = self.endpoint(url)
+        with self._lock:
+            breaker = self._breakers.get(name)
+            if breaker is None:
+                breaker = CircuitBreaker(name, self.failure_threshold, self.cooldown, self.half_open_max_calls,
+                                         self.logger, self.clock)
+                self._breakers[name] = breaker
+            return breaker
+
+    def stats(self) -> dict:
+        """所有接口的熔断器统计
+
+        Returns:
+            dict: {接口名称: 统计}
+        """
+        with self._lock:
+            breakers = dict(self._breakers)
+        return {name: breaker.stats() for name, breaker in breakers.items()}
@@ -0,0 +1,162 @@
+"""ctrip-spider 命令行入口
+
+各子命令在执行时才导入对应的爬虫模块，requests、bs4 等依赖也只在真正发送请求或解析时加载，
+--help 和参数错误等不需要网络的操作启动很快。
+"""
+import argparse
+import json
+import sys
+
+
+def _logger(name: str):
+    """创建命令行使用的日志记录器"""
+    from log import CtripSpiderLogger
+    return CtripSpiderLogger(name, "logs")
+
+
+def cmd_search(options) -> int:
+    """根据关键词搜索景点ID"""
+    from sight_id import SightId
+
+    searcher = SightId(logger=_logger("SightIdCLI"))
+    found = {keyword: searcher.search_sight_id(keyword) for keyword in options.keywords}
+    print(json.dumps(found, ensure_ascii=False, indent=2))
+    return 0 if all(found.values()) else 1
+
+
+def cmd_list(options) -> int:
+    """获取地区的景点列表，写入JSON文件或记录到快照库"""
+    from sight_list import CtripAttractionScraper
+
+    logger = _logger("CtripAttractionScraperCLI")
+    scraper = CtripAttractionScraper(logger=logger)
+    if options.snapshot_db:
+        from attraction_snapshots import AttractionSnapshotStore
+
+        result = scraper.snapshot_attractions(options.district, AttractionSnapshotStore(options.snapshot_db,
+                                                                                        logger=logger),
+                                              options.pages, options.count)
+        print(json.dumps(result, ensure_ascii=False))
+        return 0 if result else 1
+    output = options.output or f'attractions_{options.district}.json'
+    count = scraper.save_attractions_with_pagination(options.district, output, options.pages, options.count)
+    print(json.dumps({'output': output, 'count': count}, ensure_ascii=False))
+    return 0 if count else 1
+
+
+def cmd_detail(options) -> int:
+    """并发获取景点详情，每行输出一个景点"""
+    from sight_detail import AttractionDetailFetcher
+
+    fetcher = AttractionDetailFetcher(logger=_logger("AttractionDetailFetcherCLI"), max_workers=options.workers)
+    failed = 0
+    for poi_id, detail in fetcher.get_details(options.poi_ids):
+        failed += 0 if detail['success'] else 1
+        print(json.dumps(dict(detail, poi_id=detail['poi_id'] or poi_id), ensure_ascii=False), flush=True)
+    return 1 if failed else 0
+
+
+def cmd_comments(options) -> int:
+    """爬取景点评论"""
+    from sight_comments import CtripCommentSpider
+
+    pois = [tuple(poi) for poi in options.poi or []]
+    if options.attractions:
+        with open(options.attractions, 'r', encoding='utf-8') as f:
+            pois += [(str(item['poi_id']), item.get('name', '')) for item in json.load(f)]
+    if not pois:
+        print("需要通过 --poi 或 --attractions 指定景点", file=sys.stderr)
+        return 2
+    spider = CtripCommentSpider(options.output, logger=_logger("CtripCommentSpiderCLI"),
+                                compression=options.compression)
+    results = spider.crawl_multiple_pois(pois, max_pages=options.max_pages)
+    failed = [poi for poi, report in results.items() if not report['success'] or report['truncated']]
+    return 1 if failed else 0
+
+
+def cmd_pipeline(options) -> int:
+    """运行 景点列表 → 详情 → 评论 流水线"""
+    from circuit_breaker import CircuitBreakerRegistry
+    from pipeline import CrawlPipeline
+
+    logger = _logger("CrawlPipelineCLI")
+    max_inflight_bytes = int(options.max_inflight_mb * 1024 * 1024) if options.max_inflight_mb else None
+    circuit_breakers = None
+    if options.breaker_threshold:
+        circuit_breakers = CircuitBreakerRegistry(options.breaker_threshold, options.breaker_cooldown, logger=logger)
+    pipeline = CrawlPipeline(options.output, options.list_workers, options.detail_workers,
+                             options.comment_workers, options.queue_size, options.max_comment_pages,
+                             max_inflight_bytes=max_inflight_bytes, logger=logger, circuit_breakers=circuit_breakers)
+    result = pipeline.run(options.district, options.pages, options.count)
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    return 0 if not result.get('errors') else 1
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """创建命令行参数解析器"""
+    parser = argparse.ArgumentParser(prog='ctrip-spider', description="携程景点数据爬虫")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    search = subparsers.add_parser('search', help="根据关键词搜索景点ID")
+    search.add_argument('keywords', nargs='+', help="景点关键词")
+    search.set_defaults(handler=cmd_search)
+
+    attraction_list = subparsers.add_parser('list', help="获取地区的景点列表")
+    attraction_list.add_argument('--district', type=int, required=True, help="地区ID")
+    attraction_list.add_argument('--pages', type=int, default=1, help="获取的页数")
+    attraction_list.add_argument('--count', type=int, default=20, help="每页数量")
+    attraction_list.add_argument('--output', help="输出JSON文件，以 .gz/.zst 结尾时压缩，默认为 attractions_<地区ID>.json")
+    attraction_list.add_argument('--snapshot-db', help="记录到景点快照库（只写入变更），而不是写JSON文件")
+    attraction_list.set_defaults(handler=cmd_list)
+
+    detail = subparsers.add_parser('detail', help="获取景点详情")
+    detail.add_argument('poi_ids', nargs='+', type=int, help="景点ID")
+    detail.add_argument('--workers', type=int, default=8, help="并发数")
+    detail.set_defaults(handler=cmd_detail)
+
+    comments = subparsers.add_parser('comments', help="爬取景点评论")
+    comments.add_argument('--poi', nargs=2, action='append', metavar=('ID', 'NAME'), help="景点ID和名称，可重复指定")
+    comments.add_argument('--attractions', help="景点列表JSON文件（list 子命令的输出）")
+    comments.add_argument('--output', default='./Datasets', help="输出目录")
+    comments.add_argument('--max-pages', type=int, default=100, help="每个景点最多爬取的页数")
+    comments.add_argument('--compression', choices=['gzip', 'zstd'], help="评论CSV的压缩算法")
+    comments.set_defaults(handler=cmd_comments)
+
+    pipeline = subparsers.add_parser('pipeline', help="城市全量爬取流水线：景点列表 → 详情 → 评论")
+    pipeline.add_argument('--district', type=int, required=True, help="地区ID")
+    pipeline.add_argument('--pages', type=int, default=5, help="最多获取的景点列表页数")
+    pipeline.add_argument('--count', type=int, default=20, help="景点列表每页数量")
+    pipeline.add_argument('--output', default='./Datasets', help="输出目录")
+    pipeline.add_argument('--list-workers', type=int, default=1, help="景点列表阶段并发数")
+    pipeline.add_argument('--detail-workers', type=int, default=4, help="景点详情阶段并发数")
+    pipeline.add_argument('--comment-workers', type=int, default=2, help="评论阶段并发数")
+    pipeline.add_argument('--queue-size', type=int, default=50, help="阶段之间队列的最大记录数")
+    pipeline.add_argument('--max-inflight-mb', type=float, default=None, help="阶段之间队列的最大总大小（MB）")
+    pipeline.add_argument('--max-comment-pages', type=int, default=100, help="每个景点最多爬取的评论页数")
+    pipeline.add_argument('--breaker-threshold', type=int, default=None, help="接口连续失败多少次后熔断，默认不熔断")
+    pipeline.add_argument('--breaker-cooldown', type=float, default=30.0, help="熔断后等待多少秒再放行探测请求")
+    pipeline.set_defaults(handler=cmd_pipeline)
+    return parser
+
+
+def main(argv=None) -> int:
+    """解析命令行参数并执行子命令
+
+    Args:
+        argv: 命令行参数，默认为 sys.argv[1:]
+
+    Returns:
+        int: 退出码
+    """
+    options = build_parser().parse_args(argv)
+    return options.handler(options)
+
+
+# 使用示例：
+#   python cli.py search 星海广场 棒棰岛
+#   python cli.py list --district 9 --pages 5 --output attractions_9.json.gz
+#   python cli.py detail 76865 75628 --workers 8
+#   python cli.py comments --poi 76865 星海广场 --max-pages 10 --compression gzip
+#   python cli.py pipeline --district 9 --pages 5
+if __name__ == "__main__":
+    sys.exit(main())
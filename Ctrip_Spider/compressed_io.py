@@ -0,0 +1,253 @@
+import io
+import os
+import zlib
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# 压缩算法对应的文件扩展名
+EXTENSIONS = {'gzip': '.gz', 'zstd': '.zst'}
+# 默认压缩级别：gzip 6 是 zlib 的默认值，zstd 3 是速度和压缩率的折中
+DEFAULT_LEVELS = {'gzip': 6, 'zstd': 3}
+# 默认每写入 1MB 未压缩数据刷新一次压缩块
+DEFAULT_FLUSH_BYTES = 1024 * 1024
+# 评论CSV文件（含压缩后）的扩展名
+COMMENT_FILE_SUFFIXES = ('.csv',) + tuple('.csv' + extension for extension in EXTENSIONS.values())
+# 与评论CSV放在同一目录的派生输出（情感分析结果），不是评论文件
+DERIVED_FILE_PREFIXES = ('sentiment_',)
+
+
+def codec_from_path(path: str):
+    """由文件扩展名判断压缩算法
+
+    Args:
+        path: 文件路径
+
+    Returns:
+        str: 'gzip'、'zstd'，未压缩时返回None
+    """
+    for codec, extension in EXTENSIONS.items():
+        if path.endswith(extension):
+            return codec
+    return None
+
+
+def is_comment_file(name: str) -> bool:
+    """判断文件是否为评论CSV（.csv/.csv.gz/.csv.zst），不含情感分析等派生输出
+
+    Args:
+        name: 文件名或路径
+
+    Returns:
+        bool: 是否为评论文件
+    """
+    name = os.path.basename(name)
+    return name.endswith(COMMENT_FILE_SUFFIXES) and not name.startswith(DERIVED_FILE_PREFIXES)
+
+
+def list_comment_files(directory: str) -> list:
+    """递归列出目录下的评论文件，包括分区数据集（DatasetLayout）的子目录
+
+    Args:
+        directory: 评论目录
+
+    Returns:
+        list: 按路径排序的评论文件路径
+    """
+    files = []
+    for root, dir_names, file_names in os.walk(directory):
+        dir_names.sort()
+        files.extend(os.path.join(root, name) for name in sorted(file_names) if is_comment_file(name))
+    return files
+
+
+def _check_codec(codec: str):
+    """检查压缩算法是否可用"""
+    if codec not in EXTENSIONS:
+        raise ValueError(f"不支持的压缩算法: {codec}")
+    if codec == 'zstd' and zstandard is None:
+        raise ImportError("zstd 压缩需要安装 zstandard")
+
+
+def _new_compressor(codec: str, level: int):
+    """创建流式压缩器，gzip 直接输出带gzip头的数据"""
+    if codec == 'zstd':
+        return zstandard.ZstdCompressor(level=level).compressobj()
+    return zlib.compressobj(level, zlib.DEFLATED, 31)
+
+
+def _new_decompressor(codec: str):
+    """创建流式解压器"""
+    if codec == 'zstd':
+        return zstandard.ZstdDecompressor().decompressobj()
+    return zlib.decompressobj(31)
+
+
+class CompressedWriter(io.RawIOBase):
+    """流式压缩写入器
+
+    每次打开写入一个独立的gzip成员或zstd帧，追加写入的文件仍可被 gzip/zstd 工具整体解压。
+    每写入 flush_bytes 字节未压缩数据就把已压缩的块刷新到磁盘（gzip 为 Z_SYNC_FLUSH，zstd 为块刷新），
+    进程中途退出时，最后一次刷新之前的数据都可以用 open_input 读出。
+    """
+
+    def __init__(self, path: str, codec: str, mode: str = 'w', level: int = None,
+                 flush_bytes: int = DEFAULT_FLUSH_BYTES):
+        """打开文件
+
+        Args:
+            path: 文件路径
+            codec: 压缩算法 'gzip' 或 'zstd'
+            mode: 'w' 覆盖写入，'a' 追加写入
+            level: 压缩级别，默认见 DEFAULT_LEVELS
+            flush_bytes: 每写入多少字节未压缩数据刷新一次压缩块，0表示只在关闭时刷新
+        """
+        super().__init__()
+        _check_codec(codec)
+        self.codec = codec
+        self.flush_bytes = flush_bytes
+        self._file = open(path, mode + 'b')
+        self._compressor = _new_compressor(codec, DEFAULT_LEVELS[codec] if level is None else level)
+        self._unflushed = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data) -> int:
+        """压缩并写入数据
+
+        Args:
+            data: 未压缩的字节
+
+        Returns:
+            int: 写入的未压缩字节数
+        """
+        self._file.write(self._compressor.compress(bytes(data)))
+        self._unflushed += len(data)
+        if self.flush_bytes and self._unflushed >= self.flush_bytes:
+            self.flush_block()
+        return len(data)
+
+    def flush_block(self):
+        """刷新压缩块并写入磁盘，之前写入的数据在文件截断后仍可读出"""
+        if self.codec == 'zstd':
+            self._file.write(self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK))
+        else:
+            self._file.write(self._compressor.flush(zlib.Z_SYNC_FLUSH))
+        self._file.flush()
+        self._unflushed = 0
+
+    def close(self):
+        """结束gzip成员或zstd帧并关闭文件"""
+        if not self.closed:
+            try:
+                self._file.write(self._compressor.flush())
+            finally:
+                self._file.close()
+        super().close()
+
+
+class DecompressingReader(io.RawIOBase):
+    """流式解压读取器，依次解压文件中的多个gzip成员或zstd帧，文件结尾不完整时读出已能解压的部分"""
+
+    def __init__(self, path: str, codec: str, chunk_size: int = 64 * 1024):
+        """打开文件
+
+        Args:
+            path: 文件路径
+            codec: 压缩算法 'gzip' 或 'zstd'
+            chunk_size: 每次从文件读取的压缩数据大小
+        """
+        super().__init__()
+        _check_codec(codec)
+        self.codec = codec
+        self.chunk_size = chunk_size
+        self._file = open(path, 'rb')
+        self._decompressor = _new_decompressor(codec)
+        self._buffer = b''
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self._buffer:
+            chunk = self._file.read(self.chunk_size)
+            if not chunk:
+                return 0
+            while chunk:
+                self._buffer += self._decompressor.decompress(chunk)
+                # 一个成员（帧）结束后，剩余数据属于下一个成员
+                chunk = self._decompressor.unused_data if self._decompressor.eof else b''
+                if self._decompressor.eof:
+                    self._decompressor = _new_decompressor(self.codec)
+        size = min(len(buffer), len(self._buffer))
+        buffer[:size] = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        return size
+
+    def close(self):
+        if not self.closed:
+            self._file.close()
+        super().close()
+
+
+def open_output(path: str, mode: str = 'w', codec: str = None, level: int = None,
+                flush_bytes: int = DEFAULT_FLUSH_BYTES, encoding: str = 'utf-8', newline: str = None):
+    """打开文本输出文件，压缩算法默认由扩展名（.gz/.zst）决定，未压缩时与内置 open 相同
+
+    Args:
+        path: 文件路径
+        mode: 'w' 覆盖写入，'a' 追加写入
+        codec: 压缩算法，默认由扩展名判断
+        level: 压缩级别
+        flush_bytes: 每写入多少字节未压缩数据刷新一次压缩块
+        encoding: 文本编码
+        newline: 换行符处理，同内置 open
+
+    Returns:
+        文本文件对象
+    """
+    codec = codec or codec_from_path(path)
+    if codec is None:
+        return open(path, mode, encoding=encoding, newline=newline)
+    if encoding == 'utf-8-sig' and mode == 'a' and os.path.exists(path) and os.path.getsize(path) > 0:
+        # 追加的成员不能再写BOM，否则解压后BOM会出现在文件中间
+        encoding = 'utf-8'
+    raw = CompressedWriter(path, codec, mode, level, flush_bytes)
+    return io.TextIOWrapper(io.BufferedWriter(raw), encoding=encoding, newline=newline)
+
+
+def open_input(path: str, codec: str = None, encoding: str = 'utf-8', newline: str = None):
+    """打开文本输入文件，压缩算法默认由扩展名（.gz/.zst）决定，未压缩时与内置 open 相同
+
+    Args:
+        path: 文件路径
+        codec: 压缩算法，默认由扩展名判断
+        encoding: 文本编码
+        newline: 换行符处理，同内置 open
+
+    Returns:
+        文本文件对象
+    """
+    codec = codec or codec_from_path(path)
+    if codec is None:
+        return open(path, 'r', encoding=encoding, newline=newline)
+    return io.TextIOWrapper(open_binary_input(path, codec), encoding=encoding, newline=newline)
+
+
+def open_binary_input(path: str, codec: str = None):
+    """打开二进制输入文件，返回解压后的字节流；压缩文件不支持 seek，未压缩时与 open(path, 'rb') 相同
+
+    Args:
+        path: 文件路径
+        codec: 压缩算法，默认由扩展名判断
+
+    Returns:
+        二进制文件对象
+    """
+    codec = codec or codec_from_path(path)
+    if codec is None:
+        return open(path, 'rb')
+    return io.BufferedReader(DecompressingReader(path, codec))
@@ -0,0 +1,347 @@
+import argparse
+import csv
+import json
+import os
+import threading
+import time
+from datetime import date
+from compressed_io import is_comment_file, open_input
+from log import CtripSpiderLogger
+
+# 城市未知的景点所在的分区
+UNKNOWN_CITY = '未知'
+# 合并后的分段文件名前缀，不以景点ID开头，不会与单景点文件混淆
+SEGMENT_PREFIX = 'segment-'
+
+
+def _safe_name(name: str) -> str:
+    """去除目录名中不合法的字符"""
+    return "".join(c for c in str(name) if c.isalnum() or c in (' ', '-', '_')).strip() or UNKNOWN_CITY
+
+
+class DatasetLayout:
+    """评论数据集的分区目录结构和小文件合并
+
+    评论CSV按 省份/城市/爬取日期 分区存放，单景点文件积累到一定数量后由 compact 合并为较大的分段文件。
+    清单（manifest.json）记录每个分段包含的景点、行数和发布时间范围，读取方按城市、日期和景点裁剪，
+    只打开需要的文件。景点被重新爬取时由 retire_poi 删除其他分区中的旧文件和分段中的旧评论，
+    每个景点只保留一份评论。
+
+    目录结构:
+        manifest.json
+        province=<省份>/city=<城市>/date=<YYYY-MM-DD>/<景点ID>_<名称>.csv   未合并的单景点文件（可以是 .csv.gz/.csv.zst）
+        province=<省份>/city=<城市>/date=<YYYY-MM-DD>/segment-<序号>.csv   合并后的分段
+    """
+
+    def __init__(self, root: str, crawl_date: str = None, logger: CtripSpiderLogger = None):
+        """初始化数据集目录
+
+        Args:
+            root: 数据集根目录
+            crawl_date: 本次爬取写入的日期分区（YYYY-MM-DD），默认为今天
+            logger: 日志记录器实例
+        """
+        self.root = root
+        self.crawl_date = crawl_date or date.today().isoformat()
+        self.logger = logger or CtripSpiderLogger("DatasetLayout", "logs")
+        self.manifest_path = os.path.join(root, 'manifest.json')
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+        self.manifest = self._load_manifest()
+
+    def _load_manifest(self) -> dict:
+        """加载清单，不存在时返回空清单"""
+        if not os.path.exists(self.manifest_path):
+            return {'pois': {}, 'segments': []}
+        with open(self.manifest_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _save_manifest(self):
+        """先写临时文件再替换，读取方不会看到写了一半的清单"""
+        temp_path = self.manifest_path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f, ensure_ascii=False, indent=1)
+        os.replace(temp_path, self.manifest_path)
+
+    def observe_attractions(self, attractions: list):
+        """记录景点所属的省份和城市（景点列表爬虫的输出），之后写入的评论放在对应分区
+
+        Args:
+            attractions: 景点信息列表，需包含 poi_id、city_name 和 province_name
+        """
+        with self._lock:
+            for attraction in attractions:
+                poi_id = str(attraction.get('poi_id', ''))
+                if poi_id:
+                    self.manifest['pois'][poi_id] = {
+                        'province': _safe_name(attraction.get('province_name') or UNKNOWN_CITY),
+                        'city': _safe_name(attraction.get('city_name') or UNKNOWN_CITY)}
+            self._save_manifest()
+
+    def partition_dir(self, poi_id) -> str:
+        """获取景点在本次爬取日期下的分区目录，目录不存在时创建
+
+        Args:
+            poi_id: 景点ID
+
+        Returns:
+            str: 分区目录路径
+        """
+        location = self.manifest['pois'].get(str(poi_id), {})
+        partition = os.path.join(self.root, f"province={location.get('province', UNKNOWN_CITY)}",
+                                 f"city={location.get('city', UNKNOWN_CITY)}", f"date={self.crawl_date}")
+        os.makedirs(partition, exist_ok=True)
+        return partition
+
+    def partitions(self, province: str = None, city: str = None, date_from: str = None, date_to: str = None):
+        """按目录名裁剪分区，不打开任何数据文件
+
+        Args:
+            province: 只保留该省份
+            city: 只保留该城市
+            date_from: 最早爬取日期（YYYY-MM-DD，含）
+            date_to: 最晚爬取日期（YYYY-MM-DD，含）
+
+        Yields:
+            tuple: (分区目录, {'province', 'city', 'date'})
+        """
+        for province_dir in sorted(os.listdir(self.root)):
+            if not province_dir.startswith('province=') or (province and province_dir != f'province={province}'):
+                continue
+            for city_dir in sorted(os.listdir(os.path.join(self.root, province_dir))):
+                if not city_dir.startswith('city=') or (city and city_dir != f'city={city}'):
+                    continue
+                for date_dir in sorted(os.listdir(os.path.join(self.root, province_dir, city_dir))):
+                    crawl_date = date_dir[len('date='):]
+                    if not date_dir.startswith('date=') or (date_from and crawl_date < date_from) \
+                            or (date_to and crawl_date > date_to):
+                        continue
+                    yield (os.path.join(self.root, province_dir, city_dir, date_dir),
+                           {'province': province_dir[len('province='):], 'city': city_dir[len('city='):],
+                            'date': crawl_date})
+
+    def retire_poi(self, poi_id, keep_path: str = None) -> int:
+        """景点被重新爬取时撤销它的旧评论：删除所有分区中该景点的其他单景点文件，并从分段中移除它的评论
+
+        Args:
+            poi_id: 景点ID
+            keep_path: 本次爬取写入的文件，不删除
+
+        Returns:
+            int: 从分段中移除的评论数
+        """
+        poi_id = str(poi_id)
+        keep_path = os.path.normpath(keep_path) if keep_path else None
+        removed = 0
+        with self._lock:
+            for partition, _ in self.partitions():
+                for name in os.listdir(partition):
+                    path = os.path.join(partition, name)
+                    if is_comment_file(name) and name.split('_', 1)[0] == poi_id \
+                            and os.path.normpath(path) != keep_path:
+                        os.remove(path)
+                        self.logger.info(f"景点 {poi_id} 重新爬取，删除旧文件 {path}")
+            for segment in list(self.manifest['segments']):
+                if poi_id in segment['pois']:
+                    removed += self._remove_from_segment(segment, poi_id)
+            self._save_manifest()
+        return removed
+
+    def _remove_from_segment(self, segment: dict, poi_id: str) -> int:
+        """重写分段，去掉一个景点的评论，分段变空时删除，需在锁内调用"""
+        segment_path = os.path.join(self.root, segment['path'])
+        temp_path = segment_path + '.tmp'
+        pois, rows, removed, min_time, max_time = set(), 0, 0, None, None
+        with open(segment_path, 'r', newline='', encoding='utf-8-sig') as f, \
+                open(temp_path, 'w', newline='', encoding='utf-8-sig') as out:
+            reader, writer = csv.reader(f), csv.writer(out)
+            header = next(reader, None)
+            if header:
+                writer.writerow(header)
+            for row in reader:
+                if row[1] == poi_id:
+                    removed += 1
+                    continue
+                writer.writerow(row)
+                rows += 1
+                pois.add(row[1])
+                if row[7]:
+                    min_time = min(min_time or row[7], row[7])
+                    max_time = max(max_time or row[7], row[7])
+        prefix = poi_id + '_'
+        segment['sources'] = [source for source in segment['sources']
+                              if not source.rsplit('/', 1)[-1].startswith(prefix)]
+        segment['source_stats'] = {source: value for source, value in segment.get('source_stats', {}).items()
+                                   if source in segment['sources']}
+        if rows == 0:
+            os.remove(temp_path)
+            os.remove(segment_path)
+            self.manifest['segments'].remove(segment)
+        else:
+            os.replace(temp_path, segment_path)
+            segment.update({'pois': sorted(pois), 'rows': rows, 'bytes': os.path.getsize(segment_path),
+                            'min_publish_time': min_time, 'max_publish_time': max_time})
+        self.logger.info(f"景点 {poi_id} 重新爬取，从分段 {segment['path']} 移除 {removed} 条旧评论")
+        return removed
+
+    def select_files(self, province: str = None, city: str = None, date_from: str = None, date_to: str = None,
+                     poi_ids=None) -> list:
+        """列出读取指定数据需要打开的CSV文件：先按分区目录裁剪，再按清单中分段包含的景点裁剪
+
+        Args:
+            province: 只保留该省份
+            city: 只保留该城市
+            date_from: 最早爬取日期（含）
+            date_to: 最晚爬取日期（含）
+            poi_ids: 只保留包含这些景点的文件，默认不限
+
+        Returns:
+            list: 评论文件路径（用 compressed_io.open_input 读取），分段文件中可能含有其他景点的评论，需按 景区ID 列过滤
+        """
+        wanted = {str(poi_id) for poi_id in poi_ids} if poi_ids is not None else None
+        segments = {os.path.normpath(os.path.join(self.root, segment['path'])): segment
+                    for segment in self.manifest['segments']}
+        files = []
+        for partition, _ in self.partitions(province, city, date_from, date_to):
+            for name in sorted(os.listdir(partition)):
+                if not is_comment_file(name):
+                    continue
+                path = os.path.join(partition, name)
+                if name.startswith(SEGMENT_PREFIX):
+                    segment = segments.get(os.path.normpath(path))
+                    if segment is None or (wanted is not None and wanted.isdisjoint(segment['pois'])):
+                        continue
+                elif wanted is not None and name.split('_', 1)[0] not in wanted:
+                    continue
+                files.append(path)
+        return files
+
+    def compact(self, target_bytes: int = 64 * 1024 * 1024, small_file_bytes: int = 8 * 1024 * 1024,
+                min_age: float = 60) -> dict:
+        """把各分区中的小单景点文件合并为分段文件
+
+        分段先写临时文件再改名，清单更新后才删除源文件；中途失败时源文件仍然完整，
+        重新运行时清单中已记录、且大小和修改时间与合并时相同的源文件直接删除，不会重复合并；
+        同名的新文件（景点被重新爬取）保留。
+
+        Args:
+            target_bytes: 分段的目标大小（字节）
+            small_file_bytes: 小于该大小的单景点文件才参与合并
+            min_age: 最近修改时间早于该秒数的文件才参与合并，正在写入的景点不会被合并
+
+        Returns:
+            dict: {'segments': 新分段数, 'files': 合并的文件数, 'rows': 合并的行数}
+        """
+        start_time = time.time()
+        stats = {'segments': 0, 'files': 0, 'rows': 0}
+        with self._lock:
+            merged_sources = {os.path.normpath(os.path.join(self.root, source)): segment
+                              for segment in self.manifest['segments'] for source in segment['sources']}
+            for partition, info in self.partitions():
+                candidates = []
+                for name in sorted(os.listdir(partition)):
+                    path = os.path.join(partition, name)
+                    if not is_comment_file(name) or name.startswith(SEGMENT_PREFIX):
+                        continue
+                    stat = os.stat(path)
+                    if self._is_merged_source(path, stat, merged_sources):
+                        # 上次合并后未来得及删除的源文件
+                        os.remove(path)
+                        continue
+                    if stat.st_size < small_file_bytes and start_time - stat.st_mtime >= min_age:
+                        candidates.append((path, stat.st_size))
+
+                group, group_bytes = [], 0
+                for path, size in candidates:
+                    group.append(path)
+                    group_bytes += size
+                    if group_bytes >= target_bytes:
+                        self._write_segment(partition, info, group, stats)
+                        group, group_bytes = [], 0
+                if len(group) > 1:
+                    self._write_segment(partition, info, group, stats)
+
+        self.logger.info(f"数据集合并完成: 新增 {stats['segments']} 个分段，合并 {stats['files']} 个文件、"
+                         f"{stats['rows']} 条评论，耗时 {time.time() - start_time:.2f}秒")
+        return stats
+
+    def _is_merged_source(self, path: str, stat, merged_sources: dict) -> bool:
+        """判断文件是否为已合并但未删除的源文件：大小和修改时间与合并时记录的相同
+
+        清单中没有记录源文件状态时，修改时间早于分段的才算已合并。
+        """
+        segment = merged_sources.get(os.path.normpath(path))
+        if segment is None:
+            return False
+        relative_path = os.path.relpath(path, self.root).replace(os.sep, '/')
+        recorded = segment.get('source_stats', {}).get(relative_path)
+        if recorded is not None:
+            return recorded == [stat.st_size, stat.st_mtime_ns]
+        segment_path = os.path.join(self.root, segment['path'])
+        return os.path.exists(segment_path) and stat.st_mtime_ns <= os.stat(segment_path).st_mtime_ns
+
+    def _write_segment(self, partition: str, info: dict, sources: list, stats: dict):
+        """把一组单景点文件合并为一个分段并记录到清单"""
+        # 分段可能因景点重新爬取被删除，序号取已有的最大序号加一，不覆盖已有分段
+        numbers = [int(name[len(SEGMENT_PREFIX):].split('.', 1)[0]) for name in os.listdir(partition)
+                   if name.startswith(SEGMENT_PREFIX) and name.endswith('.csv')]
+        segment_path = os.path.join(partition, f'{SEGMENT_PREFIX}{max(numbers, default=-1) + 1:05d}.csv')
+        temp_path = segment_path + '.tmp'
+        pois, rows, min_time, max_time = set(), 0, None, None
+        source_stats = {}
+        with open(temp_path, 'w', newline='', encoding='utf-8-sig') as out:
+            writer = csv.writer(out)
+            header_written = False
+            for source in sources:
+                stat = os.stat(source)
+                source_stats[os.path.relpath(source, self.root).replace(os.sep, '/')] = [stat.st_size,
+                                                                                         stat.st_mtime_ns]
+                with open_input(source, encoding='utf-8-sig', newline='') as f:
+                    reader = csv.reader(f)
+                    header = next(reader, None)
+                    if header and not header_written:
+                        writer.writerow(header)
+                        header_written = True
+                    for row in reader:
+                        writer.writerow(row)
+                        rows += 1
+                        pois.add(row[1])
+                        publish_time = row[7]
+                        if publish_time:
+                            min_time = min(min_time or publish_time, publish_time)
+                            max_time = max(max_time or publish_time, publish_time)
+        os.replace(temp_path, segment_path)
+
+        self.manifest['segments'].append({
+            'path': os.path.relpath(segment_path, self.root).replace(os.sep, '/'),
+            'province': info['province'], 'city': info['city'], 'date': info['date'],
+            'pois': sorted(pois), 'rows': rows, 'bytes': os.path.getsize(segment_path),
+            'min_publish_time': min_time, 'max_publish_time': max_time,
+            'sources': list(source_stats), 'source_stats': source_stats})
+        self._save_manifest()
+        for source in sources:
+            os.remove(source)
+        stats['segments'] += 1
+        stats['files'] += len(sources)
+        stats['rows'] += rows
+
+
+# 使用示例：python dataset_layout.py --root ./Datasets/comments --compact --city 大连
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="分区评论数据集的合并和查询")
+    parser.add_argument('--root', default='./Datasets/comments', help="数据集根目录")
+    parser.add_argument('--compact', action='store_true', help="合并小文件")
+    parser.add_argument('--target-mb', type=float, default=64, help="分段的目标大小（MB）")
+    parser.add_argument('--province', help="只列出该省份的文件")
+    parser.add_argument('--city', help="只列出该城市的文件")
+    parser.add_argument('--date-from', help="最早爬取日期（YYYY-MM-DD）")
+    parser.add_argument('--date-to', help="最晚爬取日期（YYYY-MM-DD）")
+    parser.add_argument('--poi', action='append', help="只列出包含该景点的文件，可重复指定")
+    options = parser.parse_args()
+
+    layout = DatasetLayout(options.root, logger=CtripSpiderLogger("DatasetLayoutMain", "logs"))
+    if options.compact:
+        layout.compact(target_bytes=int(options.target_mb * 1024 * 1024))
+    for path in layout.select_files(options.province, options.city, options.date_from, options.date_to,
+                                    options.poi):
+        print(path)
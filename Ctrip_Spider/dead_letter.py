@@ -0,0 +1,129 @@
+import json
+import os
+import threading
+import time
+from log import CtripSpiderLogger
+
+
+class DeadLetterQueue:
+    """死信文件：持久化记录重试和重排队后仍然失败的 (景点, 页码)，便于之后只补爬这些页面"""
+
+    def __init__(self, file_path: str, logger: CtripSpiderLogger = None):
+        """初始化死信文件
+
+        Args:
+            file_path: 死信文件路径（JSON Lines）
+            logger: 日志记录器实例
+        """
+        self.file_path = file_path
+        self.logger = logger or CtripSpiderLogger("DeadLetterQueue", "logs")
+        self._lock = threading.Lock()
+
+    def add(self, poi_id: str, poi_name: str, page: int, reason: str = '', page_size: int = 10,
+            star_type: int = 0, tag_id: int = 0):
+        """追加一条失败页面记录
+
+        Args:
+            poi_id: 景点ID
+            poi_name: 景点名称
+            page: 页码
+            reason: 失败原因
+            page_size: 失败时使用的每页数量，补爬时需要相同的分页才能对应同一批评论
+            star_type: 分片爬取的星级筛选，0表示不筛选
+            tag_id: 分片爬取的评论标签筛选，0表示不筛选
+        """
+        entry = {'poi_id': str(poi_id), 'poi_name': poi_name, 'page': page, 'page_size': page_size,
+                 'star_type': star_type, 'tag_id': tag_id, 'reason': reason, 'failed_at': time.time()}
+        with self._lock:
+            directory = os.path.dirname(self.file_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.file_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        self.logger.warning(f"页面写入死信文件: 景点 {poi_name}({poi_id}) 第 {page} 页，原因: {reason}")
+
+    def load(self) -> list:
+        """读取所有失败页面记录，同一 (景点, 筛选条件, 页码) 只保留最后一条
+
+        Returns:
+            list: 失败页面记录列表
+        """
+        if not os.path.exists(self.file_path):
+            return []
+        entries = {}
+        with self._lock, open(self.file_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    key = (entry['poi_id'], entry.get('star_type', 0), entry.get('tag_id', 0), entry['page'])
+                    entries[key] = entry
+        return list(entries.values())
+
+    def group_by_sweep(self) -> dict:
+        """按翻页序列（景点 + 筛选条件）分组失败页面
+
+        Returns:
+            dict: {(景点ID, starType, commentTagId): {'poi_name': str, 'page_size': int, 'pages': [页码]}}
+        """
+        groups = {}
+        for entry in self.load():
+            key = (entry['poi_id'], entry.get('star_type', 0), entry.get('tag_id', 0))
+            group = groups.setdefault(key, {'poi_name': entry['poi_name'],
+                                            'page_size': entry.get('page_size') or 10, 'pages': []})
+            group['pages'].append(entry['page'])
+        for group in groups.values():
+            group['pages'].sort()
+        return groups
+
+    def group_by_poi(self) -> dict:
+        """按景点分组不筛选的默认翻页序列中的失败页面
+
+        Returns:
+            dict: {景点ID: {'poi_name': str, 'page_size': int, 'pages': [页码]}}
+        """
+        return {poi_id: group for (poi_id, star_type, tag_id), group in self.group_by_sweep().items()
+                if not star_type and not tag_id}
+
+    def remove_poi(self, poi_id: str) -> int:
+        """删除某个景点的所有失败页面记录（包括分片），景点的CSV文件被重写时调用
+
+        Args:
+            poi_id: 景点ID
+
+        Returns:
+            int: 删除的记录数
+        """
+        with self._lock:
+            if not os.path.exists(self.file_path):
+                return 0
+            with open(self.file_path, 'r', encoding='utf-8') as f:
+                lines = [line for line in f if line.strip()]
+            kept = [line for line in lines if json.loads(line)['poi_id'] != str(poi_id)]
+            if len(kept) == len(lines):
+                return 0
+            temp_path = self.file_path + '.tmp'
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                f.writelines(kept)
+            os.replace(temp_path, self.file_path)
+        self.logger.info(f"景点 {poi_id} 已重新爬取，删除 {len(lines) - len(kept)} 条过期的死信记录")
+        return len(lines) - len(kept)
+
+    def rewrite(self, entries: list):
+        """用给定记录重写死信文件，记录为空时删除文件
+
+        Args:
+            entries: 仍然失败的页面记录
+        """
+        with self._lock:
+            if not entries:
+                if os.path.exists(self.file_path):
+                    os.remove(self.file_path)
+                return
+            temp_path = self.file_path + '.tmp'
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                for entry in entries:
+                    f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+            os.replace(temp_path, self.file_path)
+
+    def __len__(self):
+        return len(self.load())
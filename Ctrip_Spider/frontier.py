@@ -0,0 +1,532 @@
+import argparse
+import csv
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from log import CtripSpiderLogger
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
+
+
+class CrawlFrontier:
+    """基于SQLite的持久化爬取任务队列（frontier）
+
+    任务单元（地区列表页、景点详情、评论页）由多个工作进程以限时租约的方式领取，工作进程通过心跳续租，
+    进程退出或卡死导致租约过期后任务会被自动重新分配。同一台机器上的多个进程可以共享同一个数据库文件
+    （默认使用WAL日志模式）；WAL依赖共享内存，不能跨机器使用，多台机器通过网络文件系统共享时需要使用
+    journal_mode='DELETE'，并且网络文件系统要正确支持文件锁。
+    """
+
+    STATUS_PENDING = 'pending'
+    STATUS_LEASED = 'leased'
+    STATUS_DONE = 'done'
+    STATUS_DEAD = 'dead'
+
+    JOURNAL_MODES = ('WAL', 'DELETE')
+
+    def __init__(self, db_path: str, lease_seconds: float = 60, max_attempts: int = 5,
+                 logger: CtripSpiderLogger = None, journal_mode: str = 'WAL'):
+        """初始化任务队列
+
+        Args:
+            db_path: SQLite数据库文件路径
+            lease_seconds: 租约时长（秒）
+            max_attempts: 单个任务的最大尝试次数，超过后标记为 dead
+            logger: 日志记录器实例
+            journal_mode: SQLite日志模式，'WAL' 只能在同一台机器上共享，多台机器通过网络文件系统共享时用 'DELETE'
+        """
+        if journal_mode.upper() not in self.JOURNAL_MODES:
+            raise ValueError(f"不支持的日志模式: {journal_mode}，可选 {self.JOURNAL_MODES}")
+        self.db_path = db_path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.journal_mode = journal_mode.upper()
+        self.logger = logger or CtripSpiderLogger("CrawlFrontier", "logs")
+        self._local = threading.local()
+
+        with self._connect() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS tasks (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    task_type TEXT NOT NULL,
+                    task_key TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    priority INTEGER NOT NULL DEFAULT 0,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    lease_owner TEXT,
+                    lease_expires REAL,
+                    last_error TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL,
+                    UNIQUE (task_type, task_key)
+                )''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_tasks_claim ON tasks (status, priority DESC, id)')
+
+    def _connect(self) -> sqlite3.Connection:
+        """获取当前线程的数据库连接"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute(f'PRAGMA journal_mode={self.journal_mode}')
+            # DELETE 模式下每次提交都需要落盘才能保证其他机器读到完整数据
+            conn.execute('PRAGMA synchronous=NORMAL' if self.journal_mode == 'WAL' else 'PRAGMA synchronous=FULL')
+            self._local.conn = conn
+        return _Transaction(conn)
+
+    def add(self, task_type: str, task_key: str, payload: dict = None, priority: int = 0) -> bool:
+        """添加任务，相同 (类型, 键) 的任务已存在时忽略
+
+        Args:
+            task_type: 任务类型，如 'district_page'、'detail'、'comment_page'
+            task_key: 任务唯一键
+            payload: 任务参数
+            priority: 优先级，越大越先被领取
+
+        Returns:
+            bool: 是否新增了任务
+        """
+        return self.add_many([(task_type, task_key, payload, priority)]) == 1
+
+    def add_many(self, tasks: list) -> int:
+        """批量添加任务
+
+        Args:
+            tasks: [(task_type, task_key, payload, priority)]，priority 可省略
+
+        Returns:
+            int: 新增的任务数
+        """
+        now = time.time()
+        rows = [(task[0], str(task[1]), json.dumps(task[2] or {}, ensure_ascii=False),
+                 task[3] if len(task) > 3 else 0, now, now) for task in tasks]
+        with self._connect() as conn:
+            before = conn.total_changes
+            conn.executemany('''INSERT OR IGNORE INTO tasks (task_type, task_key, payload, priority, created_at, updated_at)
+                                VALUES (?, ?, ?, ?, ?, ?)''', rows)
+            return conn.total_changes - before
+
+    def claim(self, worker_id: str, limit: int = 1, task_types: list = None) -> list:
+        """领取任务：待处理的任务或租约已过期的任务
+
+        Args:
+            worker_id: 工作进程ID
+            limit: 最多领取的任务数
+            task_types: 只领取这些类型的任务，为None时不限制
+
+        Returns:
+            list: 任务列表，每个任务为 {'id', 'task_type', 'task_key', 'payload', 'attempts'}
+        """
+        now = time.time()
+        type_filter, params = '', [now]
+        if task_types:
+            type_filter = f" AND task_type IN ({','.join('?' * len(task_types))})"
+            params.extend(task_types)
+
+        with self._connect() as conn:
+            # 尝试次数用尽的过期任务不再重新分配
+            conn.execute('''UPDATE tasks SET status = 'dead', lease_owner = NULL, updated_at = ?,
+                                last_error = COALESCE(last_error, '租约过期次数过多')
+                            WHERE status = 'leased' AND lease_expires < ? AND attempts >= ?''',
+                         (now, now, self.max_attempts))
+            rows = conn.execute(f'''SELECT id, task_type, task_key, payload, attempts FROM tasks
+                                    WHERE (status = 'pending' OR (status = 'leased' AND lease_expires < ?)){type_filter}
+                                    ORDER BY priority DESC, id LIMIT ?''', params + [limit]).fetchall()
+            conn.executemany('''UPDATE tasks SET status = 'leased', lease_owner = ?, lease_expires = ?,
+                                    attempts = attempts + 1, updated_at = ?
+                                WHERE id = ?''',
+                             [(worker_id, now + self.lease_seconds, now, row['id']) for row in rows])
+
+        return [{'id': row['id'], 'task_type': row['task_type'], 'task_key': row['task_key'],
+                 'payload': json.loads(row['payload']), 'attempts': row['attempts'] + 1} for row in rows]
+
+    def heartbeat(self, worker_id: str, task_ids: list) -> list:
+        """为仍由该工作进程持有的任务续租
+
+        Args:
+            worker_id: 工作进程ID
+            task_ids: 任务ID列表
+
+        Returns:
+            list: 续租成功的任务ID，不在列表中的任务已被重新分配
+        """
+        if not task_ids:
+            return []
+        now = time.time()
+        renewed = []
+        with self._connect() as conn:
+            for task_id in task_ids:
+                cursor = conn.execute('''UPDATE tasks SET lease_expires = ?, updated_at = ?
+                                         WHERE id = ? AND status = 'leased' AND lease_owner = ?''',
+                                      (now + self.lease_seconds, now, task_id, worker_id))
+                if cursor.rowcount:
+                    renewed.append(task_id)
+        return renewed
+
+    def complete(self, worker_id: str, task_id: int) -> bool:
+        """标记任务完成
+
+        Args:
+            worker_id: 工作进程ID
+            task_id: 任务ID
+
+        Returns:
+            bool: 是否成功（租约已被他人接管时返回False）
+        """
+        with self._connect() as conn:
+            cursor = conn.execute('''UPDATE tasks SET status = 'done', lease_owner = NULL, lease_expires = NULL,
+                                         updated_at = ?
+                                     WHERE id = ? AND status = 'leased' AND lease_owner = ?''',
+                                  (time.time(), task_id, worker_id))
+            return cursor.rowcount == 1
+
+    def fail(self, worker_id: str, task_id: int, error: str = '', retry: bool = True) -> bool:
+        """标记任务失败，尝试次数未用尽时放回队列
+
+        Args:
+            worker_id: 工作进程ID
+            task_id: 任务ID
+            error: 错误信息
+            retry: 是否允许重新分配
+
+        Returns:
+            bool: 是否成功
+        """
+        with self._connect() as conn:
+            cursor = conn.execute('''UPDATE tasks SET
+                                         status = CASE WHEN ? AND attempts < ? THEN 'pending' ELSE 'dead' END,
+                                         lease_owner = NULL, lease_expires = NULL, last_error = ?, updated_at = ?
+                                     WHERE id = ? AND status = 'leased' AND lease_owner = ?''',
+                                  (int(retry), self.max_attempts, error, time.time(), task_id, worker_id))
+            return cursor.rowcount == 1
+
+    def release(self, worker_id: str) -> int:
+        """释放工作进程持有的所有租约（正常退出时调用）
+
+        Args:
+            worker_id: 工作进程ID
+
+        Returns:
+            int: 释放的任务数
+        """
+        with self._connect() as conn:
+            cursor = conn.execute('''UPDATE tasks SET status = 'pending', lease_owner = NULL, lease_expires = NULL,
+                                         attempts = MAX(attempts - 1, 0), updated_at = ?
+                                     WHERE status = 'leased' AND lease_owner = ?''', (time.time(), worker_id))
+            return cursor.rowcount
+
+    def dead_tasks(self) -> list:
+        """列出尝试次数用尽的任务
+
+        Returns:
+            list: [{'task_type', 'task_key', 'payload', 'last_error'}]
+        """
+        with self._connect() as conn:
+            rows = conn.execute("SELECT task_type, task_key, payload, last_error FROM tasks WHERE status = 'dead'")
+            return [{'task_type': row['task_type'], 'task_key': row['task_key'],
+                     'payload': json.loads(row['payload']), 'last_error': row['last_error']} for row in rows]
+
+    def stats(self) -> dict:
+        """按任务类型和状态统计任务数
+
+        Returns:
+            dict: {task_type: {status: count}}
+        """
+        with self._connect() as conn:
+            rows = conn.execute('SELECT task_type, status, COUNT(*) AS count FROM tasks GROUP BY task_type, status')
+            result = {}
+            for row in rows:
+                result.setdefault(row['task_type'], {})[row['status']] = row['count']
+            return result
+
+    def has_unfinished(self) -> bool:
+        """是否还有待处理或处理中的任务"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT COUNT(*) FROM tasks WHERE status IN ('pending', 'leased')").fetchone()
+            return row[0] > 0
+
+
+class _Transaction:
+    """以 BEGIN IMMEDIATE 开启写事务的上下文，保证领取任务时的互斥"""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute('BEGIN IMMEDIATE')
+        return self.conn
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.conn.execute('ROLLBACK' if exc_type else 'COMMIT')
+
+
+class FrontierWorker:
+    """任务队列工作进程：领取任务、后台心跳续租、调用对应类型的处理函数并提交结果"""
+
+    def __init__(self, frontier: CrawlFrontier, handlers: dict, worker_id: str = None, batch_size: int = 1,
+                 idle_sleep: float = 1.0, logger: CtripSpiderLogger = None):
+        """初始化工作进程
+
+        Args:
+            frontier: 任务队列
+            handlers: {任务类型: 处理函数(payload, frontier)}，处理函数抛出异常表示任务失败
+            worker_id: 工作进程ID，默认为 主机名-进程号-线程号
+            batch_size: 每次领取的任务数
+            idle_sleep: 没有可领取任务时的等待时间（秒）
+            logger: 日志记录器实例
+        """
+        self.frontier = frontier
+        self.handlers = handlers
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}-{threading.get_ident()}"
+        self.batch_size = batch_size
+        self.idle_sleep = idle_sleep
+        self.logger = logger or CtripSpiderLogger("FrontierWorker", "logs")
+        self.processed = 0
+        self.failed = 0
+        self._inflight = set()
+        self._inflight_lock = threading.Lock()
+        self._stop_event = threading.Event()
+
+    def _heartbeat_loop(self):
+        """后台续租线程"""
+        while not self._stop_event.wait(self.frontier.lease_seconds / 3):
+            with self._inflight_lock:
+                task_ids = list(self._inflight)
+            lost = set(task_ids) - set(self.frontier.heartbeat(self.worker_id, task_ids))
+            for task_id in lost:
+                self.logger.warning(f"任务 {task_id} 的租约已失效，可能已被重新分配")
+
+    def run(self, max_tasks: int = None, exit_when_idle: bool = True):
+        """运行工作循环
+
+        Args:
+            max_tasks: 最多处理的任务数，为None时不限制
+            exit_when_idle: 队列中没有未完成任务时是否退出
+        """
+        self.logger.info(f"工作进程 {self.worker_id} 启动，任务类型: {list(self.handlers)}")
+        heartbeat = threading.Thread(target=self._heartbeat_loop, name="FrontierHeartbeat", daemon=True)
+        heartbeat.start()
+        try:
+            while not self._stop_event.is_set() and (max_tasks is None or self.processed < max_tasks):
+                tasks = self.frontier.claim(self.worker_id, self.batch_size, list(self.handlers))
+                if not tasks:
+                    if exit_when_idle and not self.frontier.has_unfinished():
+                        break
+                    time.sleep(self.idle_sleep)
+                    continue
+                for task in tasks:
+                    self._run_task(task)
+        finally:
+            self._stop_event.set()
+            released = self.frontier.release(self.worker_id)
+            self.logger.info(f"工作进程 {self.worker_id} 退出，完成 {self.processed} 个任务，失败 {self.failed} 次，"
+                             f"释放 {released} 个租约")
+
+    def stop(self):
+        """请求工作循环在当前任务完成后退出"""
+        self._stop_event.set()
+
+    def _run_task(self, task: dict):
+        """执行单个任务"""
+        with self._inflight_lock:
+            self._inflight.add(task['id'])
+        try:
+            self.handlers[task['task_type']](task['payload'], self.frontier)
+        except Exception as e:
+            self.failed += 1
+            self.logger.log_error(f"任务执行失败（第 {task['attempts']} 次）: {e}",
+                                  f"{task['task_type']}:{task['task_key']}", "FRONTIER")
+            self.frontier.fail(self.worker_id, task['id'], str(e))
+        else:
+            self.processed += 1
+            if not self.frontier.complete(self.worker_id, task['id']):
+                self.logger.warning(f"任务 {task['task_type']}:{task['task_key']} 完成时租约已被接管")
+        finally:
+            with self._inflight_lock:
+                self._inflight.discard(task['id'])
+
+
+@contextmanager
+def _file_lock(file_path: str):
+    """多进程写同一文件时使用的文件锁，Unix 下使用 flock，Windows 下使用 msvcrt.locking
+
+    Args:
+        file_path: 被保护的文件路径，锁文件为该路径加 .lock
+
+    Raises:
+        RuntimeError: 当前平台不支持文件锁
+    """
+    if fcntl is None and msvcrt is None:
+        raise RuntimeError("当前平台不支持文件锁，无法在多进程间安全地写同一文件")
+    with open(file_path + '.lock', 'a+b') as lock_file:
+        if fcntl:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        else:
+            # 锁定锁文件的第一个字节；LK_LOCK 重试约10秒后仍拿不到锁时抛出 OSError，继续等待
+            lock_file.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _locked_append(file_path: str, write, encoding: str = 'utf-8'):
+    """在文件锁保护下追加写文件，保证多进程写同一文件时记录不交错
+
+    Args:
+        file_path: 文件路径
+        write: 写函数 write(file_object)
+        encoding: 文件编码
+    """
+    with _file_lock(file_path), open(file_path, 'a', newline='', encoding=encoding) as f:
+        write(f)
+
+
+def build_ctrip_handlers(output_dir: str, logger: CtripSpiderLogger = None, scraper=None, detail_fetcher=None,
+                         comment_spider=None, max_comment_pages: int = 100) -> dict:
+    """创建携程爬取任务的处理函数
+
+    任务类型:
+        district_page: {'district_id', 'page', 'count', 'max_pages'} 获取景点列表页，
+                       并派生下一页、景点详情和评论首页任务
+        detail: {'poi_id'} 获取景点详情
+        comment_page: {'poi_id', 'poi_name', 'page', 'page_size'} 获取评论页，首页派生其余页任务
+
+    Args:
+        output_dir: 输出目录
+        logger: 日志记录器实例
+        scraper: CtripAttractionScraper 实例
+        detail_fetcher: AttractionDetailFetcher 实例
+        comment_spider: CtripCommentSpider 实例
+        max_comment_pages: 每个景点最多爬取的评论页数
+
+    Returns:
+        dict: {任务类型: 处理函数}
+    """
+    from sight_comments import CtripCommentSpider
+    from sight_detail import AttractionDetailFetcher
+    from sight_list import CtripAttractionScraper
+
+    logger = logger or CtripSpiderLogger("FrontierWorker", "logs")
+    os.makedirs(output_dir, exist_ok=True)
+    scraper = scraper or CtripAttractionScraper(logger=logger)
+    detail_fetcher = detail_fetcher or AttractionDetailFetcher(logger=logger)
+    comment_spider = comment_spider or CtripCommentSpider(os.path.join(output_dir, 'comments'), logger=logger)
+
+    def append_jsonl(file_name, record):
+        line = json.dumps(record, ensure_ascii=False) + '\n'
+        _locked_append(os.path.join(output_dir, file_name), lambda f: f.write(line))
+
+    def handle_district_page(payload, frontier):
+        district_id, page, count = payload['district_id'], payload['page'], payload.get('count', 20)
+        attractions = scraper.fetch_attractions_page(district_id, page, count)
+        if attractions is None:
+            # 失败时由任务队列重试，不能当作列表结束
+            raise RuntimeError(f"第 {page} 页景点列表获取失败")
+        if len(attractions) == count and page < payload.get('max_pages', 1):
+            frontier.add('district_page', f"{district_id}:{page + 1}", dict(payload, page=page + 1))
+        tasks = []
+        for attraction in attractions:
+            append_jsonl('attractions.jsonl', attraction)
+            poi_id = attraction.get('poi_id')
+            if poi_id:
+                tasks.append(('detail', poi_id, {'poi_id': poi_id}))
+                tasks.append(('comment_page', f"{poi_id}:1", {'poi_id': poi_id, 'poi_name': attraction['name'],
+                                                               'page': 1, 'page_size': None}))
+        frontier.add_many(tasks)
+
+    def handle_detail(payload, frontier):
+        detail = detail_fetcher.get_detail(payload['poi_id'])
+        if not detail['success']:
+            raise RuntimeError(detail['error_message'])
+        append_jsonl('details.jsonl', detail)
+
+    def handle_comment_page(payload, frontier):
+        poi_id, poi_name, page = str(payload['poi_id']), payload['poi_name'], payload['page']
+        file_path = comment_spider._csv_path(poi_id, poi_name)
+        if page == 1:
+            total_pages, page_size, comments = comment_spider._get_first_page(poi_id)
+            if total_pages is None:
+                raise RuntimeError("无法获取评论首页")
+        else:
+            page_size = payload['page_size']
+            comments = comment_spider._get_page_comments(poi_id, page, page_size)
+            if comments is None:
+                raise RuntimeError(f"第 {page} 页评论获取失败")
+
+        with _file_lock(file_path):
+            # 表头只在文件不存在（为空）时写入，已写入的其他页面不会被截断
+            new_file = not os.path.exists(file_path) or os.path.getsize(file_path) == 0
+            # 租约过期或工作进程写入后崩溃时任务会重新执行，已写入的评论按commentId跳过，重复执行不会产生重复行
+            saved_ids = set() if new_file else comment_spider._get_saved_comment_ids(file_path)
+            comments = [comment for comment in comments if str(comment['commentId']) not in saved_ids]
+            if comments or new_file:
+                with comment_spider._open_csv(file_path, 'a') as f:
+                    if new_file:
+                        csv.writer(f).writerow(comment_spider.CSV_HEADER)
+                    # 多进程写同一文件，序号按页码计算而不依赖文件当前行数
+                    comment_spider._write_comment_rows(f, comments, poi_id, poi_name, (page - 1) * page_size)
+        if comment_spider.aggregates and comments:
+            comment_spider.aggregates.add_comments(poi_id, comments)
+        # 首页写入后才派生其余页面任务
+        if page == 1:
+            frontier.add_many([('comment_page', f"{poi_id}:{next_page}",
+                                dict(payload, page=next_page, page_size=page_size))
+                               for next_page in range(2, min(total_pages, max_comment_pages) + 1)])
+
+    return {'district_page': handle_district_page, 'detail': handle_detail, 'comment_page': handle_comment_page}
+
+
+# 使用示例：
+#   python frontier.py seed --db crawl.db --district 9 --pages 5
+#   python frontier.py work --db crawl.db --output ./Datasets   （可在多个进程或机器上同时运行）
+#   python frontier.py stats --db crawl.db
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="基于租约的持久化爬取任务队列")
+    parser.add_argument('command', choices=['seed', 'work', 'stats'])
+    parser.add_argument('--db', default='crawl_frontier.db', help="任务队列数据库文件")
+    parser.add_argument('--district', type=int, action='append', default=[], help="要爬取的地区ID，可重复")
+    parser.add_argument('--pages', type=int, default=1, help="每个地区的景点列表页数")
+    parser.add_argument('--count', type=int, default=20, help="景点列表每页数量")
+    parser.add_argument('--output', default='./Datasets', help="输出目录")
+    parser.add_argument('--lease', type=float, default=60, help="租约时长（秒）")
+    parser.add_argument('--max-comment-pages', type=int, default=100, help="每个景点最多爬取的评论页数")
+    parser.add_argument('--journal-mode', choices=CrawlFrontier.JOURNAL_MODES, default='WAL',
+                        help="SQLite日志模式，多台机器通过网络文件系统共享数据库时使用 DELETE")
+    options = parser.parse_args()
+
+    logger = CtripSpiderLogger("CrawlFrontierMain", "logs")
+    frontier = CrawlFrontier(options.db, lease_seconds=options.lease, logger=logger, journal_mode=options.journal_mode)
+    if options.command == 'seed':
+        added = frontier.add_many([('district_page', f"{district_id}:1",
+                                    {'district_id': district_id, 'page': 1, 'count': options.count,
+                                     'max_pages': options.pages})
+                                   for district_id in options.district])
+        logger.info(f"已添加 {added} 个地区任务")
+    elif options.command == 'work':
+        handlers = build_ctrip_handlers(options.output, logger, max_comment_pages=options.max_comment_pages)
+        FrontierWorker(frontier, handlers, logger=logger).run()
+    logger.info(f"任务统计: {json.dumps(frontier.stats(), ensure_ascii=False)}")
@@ -0,0 +1,236 @@
+import argparse
+import json
+import math
+import numpy as np
+from log import CtripSpiderLogger
+
+# 地球平均半径（千米）
+EARTH_RADIUS_KM = 6371.0088
+# 每纬度对应的距离（千米）
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+# 网格键的编码偏移，行列号加偏移后为非负数
+_KEY_OFFSET = 1 << 24
+
+
+def haversine_km(lat: float, lon: float, lats, lons) -> np.ndarray:
+    """计算一个点到一组点的球面距离（向量化）
+
+    Args:
+        lat: 纬度
+        lon: 经度
+        lats: 纬度数组
+        lons: 经度数组
+
+    Returns:
+        np.ndarray: 距离（千米）
+    """
+    lat1, lon1 = math.radians(lat), math.radians(lon)
+    lat2, lon2 = np.radians(lats), np.radians(lons)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def extract_coordinates(record: dict):
+    """从景点列表或景点详情记录中取出坐标
+
+    Args:
+        record: _parse_poi_basic_info 的结果（latitude/longitude 字段）
+                或 AttractionDetailFetcher 的结果（coordinates 字段）
+
+    Returns:
+        tuple: (纬度, 经度)，坐标缺失或无效时返回None
+    """
+    coordinates = record.get('coordinates') or record
+    try:
+        lat, lon = float(coordinates.get('latitude')), float(coordinates.get('longitude'))
+    except (TypeError, ValueError):
+        return None
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180) or (lat == 0 and lon == 0):
+        return None
+    return lat, lon
+
+
+class GeoIndex:
+    """景点坐标的网格索引
+
+    坐标保存在NumPy数组中，按经纬度网格分桶并按桶排序；范围查询只取查询圆外接矩形覆盖的网格，
+    对候选点一次性向量化计算球面距离。最近邻查询从一个网格大小的半径开始逐步扩大，直到半径内有足够的点。
+    """
+
+    def __init__(self, ids, lats, lons, cell_km: float = 2.0, weights=None, logger: CtripSpiderLogger = None):
+        """建立索引
+
+        Args:
+            ids: 景点ID列表
+            lats: 纬度列表
+            lons: 经度列表
+            cell_km: 网格边长（千米），接近常用查询半径时效率最高
+            weights: 每个景点的权重（如评论数），用于热力图，默认为1
+            logger: 日志记录器实例
+        """
+        self.ids = np.asarray(ids, dtype=object)
+        self.lats = np.asarray(lats, dtype=np.float64)
+        self.lons = np.asarray(lons, dtype=np.float64)
+        self.weights = np.ones(len(self.lats)) if weights is None else np.asarray(weights, dtype=np.float64)
+        self.cell_km = cell_km
+        self.cell_deg = cell_km / KM_PER_DEGREE
+        self.logger = logger or CtripSpiderLogger("GeoIndex", "logs")
+
+        keys = self._cell_keys(np.floor(self.lats / self.cell_deg), np.floor(self.lons / self.cell_deg))
+        self._order = np.argsort(keys, kind='stable')
+        unique_keys, starts, counts = np.unique(keys[self._order], return_index=True, return_counts=True)
+        self._cells = {int(key): (int(start), int(start + count))
+                       for key, start, count in zip(unique_keys, starts, counts)}
+        self.logger.info(f"地理索引已建立: {len(self.ids)} 个景点，{len(self._cells)} 个网格，网格边长 {cell_km}km")
+
+    @classmethod
+    def from_records(cls, records, cell_km: float = 2.0, weight_field: str = None,
+                     logger: CtripSpiderLogger = None):
+        """从景点列表或景点详情记录建立索引，跳过没有有效坐标的记录
+
+        Args:
+            records: 景点记录列表
+            cell_km: 网格边长（千米）
+            weight_field: 作为热力图权重的字段名（如 review_count）
+            logger: 日志记录器实例
+
+        Returns:
+            GeoIndex: 索引
+        """
+        ids, lats, lons, weights = [], [], [], []
+        for record in records:
+            coordinates = extract_coordinates(record)
+            if coordinates is None:
+                continue
+            ids.append(record.get('poi_id'))
+            lats.append(coordinates[0])
+            lons.append(coordinates[1])
+            weights.append(float(record.get(weight_field) or 0) if weight_field else 1.0)
+        return cls(ids, lats, lons, cell_km, weights, logger)
+
+    @staticmethod
+    def _cell_keys(rows, cols):
+        """把网格行列号编码为整数键"""
+        rows = np.asarray(rows, dtype=np.int64) + _KEY_OFFSET
+        cols = np.asarray(cols, dtype=np.int64) + _KEY_OFFSET
+        return rows * (2 * _KEY_OFFSET) + cols
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _candidates(self, lat: float, lon: float, radius_km: float) -> np.ndarray:
+        """取出查询圆外接矩形覆盖的网格中的所有点
+
+        Returns:
+            np.ndarray: 候选点的下标
+        """
+        lat_span = radius_km / KM_PER_DEGREE
+        cos_lat = math.cos(math.radians(min(89.0, abs(lat) + lat_span)))
+        lon_span = 180.0 if lat_span >= 89 or cos_lat <= 0 else min(180.0, lat_span / cos_lat)
+        row_range = range(math.floor((lat - lat_span) / self.cell_deg),
+                          math.floor((lat + lat_span) / self.cell_deg) + 1)
+        col_range = range(math.floor((lon - lon_span) / self.cell_deg),
+                          math.floor((lon + lon_span) / self.cell_deg) + 1)
+        crosses_antimeridian = lon - lon_span < -180 or lon + lon_span > 180
+        if crosses_antimeridian or len(row_range) * len(col_range) > len(self._cells):
+            # 跨越180度经线，或查询范围覆盖的网格多于非空网格时，直接遍历所有非空网格
+            slices = list(self._cells.values())
+        else:
+            slices = []
+            for row in row_range:
+                base = (row + _KEY_OFFSET) * (2 * _KEY_OFFSET) + _KEY_OFFSET
+                for col in col_range:
+                    cell = self._cells.get(base + col)
+                    if cell:
+                        slices.append(cell)
+        if not slices:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate([self._order[start:end] for start, end in slices])
+
+    def radius(self, lat: float, lon: float, radius_km: float) -> list:
+        """查询半径范围内的景点
+
+        Args:
+            lat: 中心纬度
+            lon: 中心经度
+            radius_km: 半径（千米）
+
+        Returns:
+            list: [(景点ID, 距离千米)]，按距离从近到远排列
+        """
+        candidates = self._candidates(lat, lon, radius_km)
+        distances = haversine_km(lat, lon, self.lats[candidates], self.lons[candidates])
+        inside = distances <= radius_km
+        candidates, distances = candidates[inside], distances[inside]
+        order = np.argsort(distances, kind='stable')
+        return [(self.ids[i], float(d)) for i, d in zip(candidates[order], distances[order])]
+
+    def nearest(self, lat: float, lon: float, k: int = 10) -> list:
+        """查询最近的 k 个景点
+
+        Args:
+            lat: 中心纬度
+            lon: 中心经度
+            k: 数量
+
+        Returns:
+            list: [(景点ID, 距离千米)]，按距离从近到远排列
+        """
+        k = min(k, len(self.ids))
+        if k <= 0:
+            return []
+        radius_km = self.cell_km
+        while True:
+            candidates = self._candidates(lat, lon, radius_km)
+            distances = haversine_km(lat, lon, self.lats[candidates], self.lons[candidates])
+            # 半径内的点数足够时，半径内最近的 k 个就是全局最近的 k 个
+            if np.count_nonzero(distances <= radius_km) >= k or len(candidates) == len(self.ids):
+                break
+            radius_km *= 2
+        top = np.argpartition(distances, k - 1)[:k] if len(distances) > k else np.arange(len(distances))
+        top = top[np.argsort(distances[top], kind='stable')]
+        return [(self.ids[candidates[i]], float(distances[i])) for i in top]
+
+    def density_grid(self, cell_km: float = 1.0, bounds: tuple = None, weighted: bool = False) -> dict:
+        """计算热力图使用的密度网格
+
+        Args:
+            cell_km: 热力图网格边长（千米）
+            bounds: (最小纬度, 最小经度, 最大纬度, 最大经度)，默认为所有景点的范围
+            weighted: 是否按景点权重（如评论数）累加
+
+        Returns:
+            dict: {'lat_edges': 纬度分界, 'lon_edges': 经度分界, 'counts': 二维数组（纬度 × 经度）}
+        """
+        if bounds is None:
+            if not len(self.ids):
+                return {'lat_edges': np.empty(0), 'lon_edges': np.empty(0), 'counts': np.zeros((0, 0))}
+            bounds = (self.lats.min(), self.lons.min(), self.lats.max(), self.lons.max())
+        min_lat, min_lon, max_lat, max_lon = bounds
+        lat_step = cell_km / KM_PER_DEGREE
+        lon_step = lat_step / max(math.cos(math.radians((min_lat + max_lat) / 2)), 1e-6)
+        lat_edges = min_lat + lat_step * np.arange(max(1, math.ceil((max_lat - min_lat) / lat_step)) + 1)
+        lon_edges = min_lon + lon_step * np.arange(max(1, math.ceil((max_lon - min_lon) / lon_step)) + 1)
+        counts, _, _ = np.histogram2d(self.lats, self.lons, bins=(lat_edges, lon_edges),
+                                      weights=self.weights if weighted else None)
+        return {'lat_edges': lat_edges, 'lon_edges': lon_edges, 'counts': counts}
+
+
+# 使用示例：python geo.py --attractions attractions_9.json --lat 38.9 --lon 121.6 --radius 3
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="景点坐标范围查询和最近邻查询")
+    parser.add_argument('--attractions', required=True, help="景点列表JSON文件（save_to_json 的输出）")
+    parser.add_argument('--lat', type=float, required=True, help="中心纬度")
+    parser.add_argument('--lon', type=float, required=True, help="中心经度")
+    parser.add_argument('--radius', type=float, help="查询半径（千米），不指定时查询最近邻")
+    parser.add_argument('--k', type=int, default=10, help="最近邻数量")
+    options = parser.parse_args()
+
+    with open(options.attractions, 'r', encoding='utf-8') as f:
+        index = GeoIndex.from_records(json.load(f), logger=CtripSpiderLogger("GeoIndexMain", "logs"))
+    if options.radius:
+        result = index.radius(options.lat, options.lon, options.radius)
+    else:
+        result = index.nearest(options.lat, options.lon, options.k)
+    print(json.dumps([{'poi_id': poi_id, 'distance_km': round(distance, 3)} for poi_id, distance in result],
+                     ensure_ascii=False, indent=2))
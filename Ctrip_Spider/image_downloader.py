@@ -0,0 +1,217 @@
+import argparse
+import csv
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from compressed_io import list_comment_files, open_input
+from log import CtripSpiderLogger
+from retry import RetryPolicy
+
+# 按 Content-Type 确定的文件扩展名，未知类型时使用链接中的扩展名
+CONTENT_TYPE_EXTENSIONS = {'image/jpeg': '.jpg', 'image/png': '.png', 'image/webp': '.webp', 'image/gif': '.gif'}
+
+
+def iter_image_urls(csv_files):
+    """从评论CSV文件的 图片链接列表 列中逐个取出图片链接
+
+    Args:
+        csv_files: 评论CSV文件路径列表（可以是 .csv.gz/.csv.zst）
+
+    Yields:
+        str: 图片链接
+    """
+    for file_path in csv_files:
+        with open_input(file_path, encoding='utf-8-sig', newline='') as f:
+            reader = csv.reader(f)
+            header = next(reader, None)
+            if not header or '图片链接列表' not in header:
+                continue
+            column = header.index('图片链接列表')
+            for row in reader:
+                if len(row) > column and row[column]:
+                    for url in row[column].split(';'):
+                        if url:
+                            yield url
+
+
+class ImageDownloader:
+    """评论图片下载器
+
+    多线程并发下载，线程共享一个连接池；图片按内容的SHA-256存放，相同内容只保存一份。
+    链接到哈希的索引以JSON Lines追加写入，中断后重新运行时跳过已下载的链接。
+
+    目录结构:
+        index.jsonl                       {"url", "sha256", "path", "bytes"}，每行一个链接
+        objects/<哈希前2位>/<哈希><扩展名>   图片文件
+    """
+
+    def __init__(self, store_dir: str, max_workers: int = 8, session=None, retry_policy: RetryPolicy = None,
+                 timeout: float = 10, logger: CtripSpiderLogger = None):
+        """初始化下载器，已有的索引从目录加载
+
+        Args:
+            store_dir: 图片存储目录
+            max_workers: 并发下载数，同时也是连接池大小
+            session: 发送请求的会话，默认创建连接池大小为 max_workers 的 requests.Session
+            retry_policy: 请求重试策略
+            timeout: 请求超时（秒）
+            logger: 日志记录器实例
+        """
+        self.store_dir = store_dir
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.logger = logger or CtripSpiderLogger("ImageDownloader", "logs")
+        self.retry_policy = retry_policy or RetryPolicy(logger=self.logger)
+        if session is None:
+            # 延迟导入 requests，导入模块本身不加载网络库
+            import requests
+            from requests.adapters import HTTPAdapter
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+        self.session = session
+        self.index_path = os.path.join(store_dir, 'index.jsonl')
+        self._lock = threading.Lock()
+        os.makedirs(os.path.join(store_dir, 'objects'), exist_ok=True)
+        self.index = self._load_index()
+
+    def _load_index(self) -> dict:
+        """加载链接索引，忽略中断时写了一半的最后一行和文件已丢失的记录"""
+        index = {}
+        if not os.path.exists(self.index_path):
+            return index
+        line = '\n'
+        with open(self.index_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if os.path.exists(os.path.join(self.store_dir, entry['path'])):
+                    index[entry['url']] = entry
+        if not line.endswith('\n'):
+            # 补上换行，之后追加的记录不会接在写了一半的行后面
+            with open(self.index_path, 'a', encoding='utf-8') as f:
+                f.write('\n')
+        return index
+
+    def path_for(self, url: str):
+        """获取已下载图片的本地路径
+
+        Args:
+            url: 图片链接
+
+        Returns:
+            str: 图片文件路径，未下载时返回None
+        """
+        entry = self.index.get(url)
+        return os.path.join(self.store_dir, entry['path']) if entry else None
+
+    def download(self, urls) -> dict:
+        """并发下载图片，已在索引中的链接直接跳过
+
+        Args:
+            urls: 图片链接的可迭代对象（如 iter_image_urls 的结果），重复的链接只下载一次
+
+        Returns:
+            dict: {'downloaded': 新下载的链接数, 'duplicates': 内容已存在、未重复保存的链接数,
+                   'skipped': 之前已下载的链接数, 'failed': 下载失败的链接数, 'bytes': 新保存的字节数}
+        """
+        start_time = time.time()
+        stats = {'downloaded': 0, 'duplicates': 0, 'skipped': 0, 'failed': 0, 'bytes': 0}
+        seen = set()
+        with ThreadPoolExecutor(self.max_workers) as pool:
+            pending = set()
+            for url in urls:
+                if url in seen:
+                    continue
+                seen.add(url)
+                if url in self.index:
+                    stats['skipped'] += 1
+                    continue
+                # 在途任务数有上限，链接列表很大时不会一次性创建所有任务
+                if len(pending) >= self.max_workers * 4:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    self._collect(done, stats)
+                pending.add(pool.submit(self._fetch, url))
+            self._collect(wait(pending)[0], stats)
+
+        elapsed = time.time() - start_time
+        self.logger.info(f"图片下载完成: 新下载 {stats['downloaded']} 个（其中 {stats['duplicates']} 个内容重复），"
+                         f"跳过 {stats['skipped']} 个，失败 {stats['failed']} 个，"
+                         f"保存 {stats['bytes'] / 1024 / 1024:.1f}MB，耗时 {elapsed:.2f}秒")
+        return stats
+
+    @staticmethod
+    def _collect(futures, stats: dict):
+        """累加已完成任务的结果"""
+        for future in futures:
+            for key, value in future.result().items():
+                stats[key] += value
+
+    def _fetch(self, url: str) -> dict:
+        """下载一张图片并保存
+
+        Returns:
+            dict: 计入 download 统计的增量
+        """
+        try:
+            response = self.retry_policy.call(lambda: self.session.get(url, timeout=self.timeout), url)
+            if response.status_code != 200:
+                self.logger.warning(f"图片下载失败: {url}，状态码 {response.status_code}")
+                return {'failed': 1}
+            content = response.content
+        except Exception as e:
+            self.logger.warning(f"图片下载失败: {url}，{type(e).__name__}: {e}")
+            return {'failed': 1}
+
+        digest = hashlib.sha256(content).hexdigest()
+        content_type = response.headers.get('Content-Type', '').split(';')[0].strip()
+        extension = CONTENT_TYPE_EXTENSIONS.get(content_type) or os.path.splitext(url.split('?')[0])[1][:8]
+        relative_path = f"objects/{digest[:2]}/{digest}{extension}"
+        file_path = os.path.join(self.store_dir, relative_path)
+        stored = self._store(file_path, content)
+
+        entry = {'url': url, 'sha256': digest, 'path': relative_path, 'bytes': len(content)}
+        with self._lock:
+            # 图片文件写完后才写索引，索引中的链接一定有完整的文件
+            with open(self.index_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+            self.index[url] = entry
+        return {'downloaded': 1, 'duplicates': 0 if stored else 1, 'bytes': len(content) if stored else 0}
+
+    def _store(self, file_path: str, content: bytes) -> bool:
+        """按内容地址保存图片，相同内容已存在时不再写入
+
+        Returns:
+            bool: 是否写入了新文件
+        """
+        if os.path.exists(file_path):
+            return False
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        temp_path = f"{file_path}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(content)
+        with self._lock:
+            if os.path.exists(file_path):
+                os.remove(temp_path)
+                return False
+            os.replace(temp_path, file_path)
+            return True
+
+
+# 使用示例：python image_downloader.py --comments ./Datasets --store ./Datasets/images --workers 16
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="下载评论图片（按内容去重）")
+    parser.add_argument('--comments', default='./Datasets', help="评论CSV目录")
+    parser.add_argument('--store', default='./Datasets/images', help="图片存储目录")
+    parser.add_argument('--workers', type=int, default=8, help="并发下载数")
+    options = parser.parse_args()
+
+    downloader = ImageDownloader(options.store, max_workers=options.workers,
+                                 logger=CtripSpiderLogger("ImageDownloaderMain", "logs"))
+    print(json.dumps(downloader.download(iter_image_urls(list_comment_files(options.comments))), ensure_ascii=False))
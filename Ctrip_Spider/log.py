@@ -1,15 +1,131 @@
 import logging
 import os
+import threading
+import time
 from datetime import datetime
 from logging.handlers import RotatingFileHandler
 
 
+class WindowStats:
+    """
+    汇总窗口统计类，用于在汇总日志模式下聚合高频日志事件
+    """
+
+    def __init__(self):
+        """
+        初始化窗口统计
+        """
+        self.progress = {}
+        self.reset()
+
+    def reset(self):
+        """
+        重置当前窗口的计数（进度信息跨窗口保留，用于计算ETA）
+        """
+        self.window_start = time.time()
+        self.request_count = 0
+        self.request_time = 0.0
+        self.error_count = 0
+        self.warning_count = 0
+        self.detail_count = 0
+        self.rows = {}
+
+    def record_request(self, response_time=None):
+        """
+        记录一次请求
+
+        Args:
+            response_time (float): 响应时间（秒）
+        """
+        self.request_count += 1
+        if response_time:
+            self.request_time += response_time
+
+    def record_rows(self, item_count, item_type):
+        """
+        记录提取的数据条数
+
+        Args:
+            item_count (int): 数据条数
+            item_type (str): 数据类型
+        """
+        self.rows[item_type] = self.rows.get(item_type, 0) + item_count
+
+    def record_progress(self, current, total, stage):
+        """
+        记录某个阶段的进度
+
+        Args:
+            current (int): 当前进度
+            total (int): 总数
+            stage (str): 处理阶段
+        """
+        now = time.time()
+        if stage not in self.progress or current < self.progress[stage]['current']:
+            self.progress[stage] = {'start_time': now, 'start_current': current}
+        self.progress[stage].update({'current': current, 'total': total, 'time': now})
+
+    def end_progress(self, stage):
+        """
+        结束某个阶段的进度跟踪（阶段提前结束时，如截断或失败）
+
+        Args:
+            stage (str): 处理阶段
+        """
+        self.progress.pop(stage, None)
+
+    def _format_eta(self, state):
+        """
+        根据阶段进度速率估算剩余时间
+
+        Args:
+            state (dict): 阶段进度状态
+
+        Returns:
+            str: 剩余时间描述
+        """
+        done = state['current'] - state['start_current']
+        elapsed = state['time'] - state['start_time']
+        if state['current'] >= state['total']:
+            return "完成"
+        if done <= 0 or elapsed <= 0:
+            return "ETA 未知"
+        eta = (state['total'] - state['current']) * elapsed / done
+        return f"ETA {eta:.0f}s"
+
+    def summary(self):
+        """
+        生成当前窗口的汇总信息
+
+        Returns:
+            str: 汇总日志消息
+        """
+        elapsed = max(time.time() - self.window_start, 1e-6)
+        parts = [f"[汇总 {elapsed:.1f}s] 请求: {self.request_count} ({self.request_count / elapsed:.2f}/s"]
+        if self.request_count:
+            parts[0] += f", 平均 {self.request_time / self.request_count:.2f}s"
+        parts[0] += ")"
+        parts.append(f"错误: {self.error_count}")
+        parts.append(f"警告: {self.warning_count}")
+        if self.rows:
+            rows = ", ".join(f"{item_type}={count} ({count / elapsed:.2f}/s)" for item_type, count in self.rows.items())
+            parts.append(f"数据: {rows}")
+        if self.detail_count:
+            parts.append(f"明细: {self.detail_count}")
+        for stage, state in self.progress.items():
+            parts.append(f"{stage} {state['current']}/{state['total']} {self._format_eta(state)}")
+        # 已完成的阶段只汇报一次，本窗口内没有更新的阶段（已提前结束或停滞）汇报后也不再保留
+        self.progress = {stage: state for stage, state in self.progress.items()
+                         if state['current'] < state['total'] and state['time'] >= self.window_start}
+        return " | ".join(parts)
+
+
 class CtripSpiderLogger:
     """
     携程爬虫日志类，用于收集和管理爬虫运行时的日志信息
     """
     
-    def __init__(self, name="CtripSpider", log_dir="logs", level=logging.INFO):
+    def __init__(self, name="CtripSpider", log_dir="logs", level=logging.INFO, summary_interval=None):
         """
         初始化日志类
         
@@ -17,9 +133,17 @@ class CtripSpiderLogger:
             name (str): 日志记录器名称
             log_dir (str): 日志文件存储目录
             level (int): 日志级别
+            summary_interval (float): 汇总日志间隔（秒），为None时逐条记录；
+                设置后请求、进度、数据提取和明细日志按窗口汇总为一行输出，
+                警告和错误仍逐条记录
         """
         self.logger = logging.getLogger(name)
         self.logger.setLevel(level)
+
+        # 汇总日志模式
+        self.summary_interval = summary_interval
+        self._stats = WindowStats()
+        self._stats_lock = threading.Lock()
         
         # 避免重复添加处理器
         if not self.logger.handlers:
@@ -85,6 +209,9 @@ class CtripSpiderLogger:
             message (str): 日志消息
         """
         self.logger.warning(message)
+        if self.summary_interval:
+            with self._stats_lock:
+                self._stats.warning_count += 1
     
     def error(self, message):
         """
@@ -94,6 +221,9 @@ class CtripSpiderLogger:
             message (str): 日志消息
         """
         self.logger.error(message)
+        if self.summary_interval:
+            with self._stats_lock:
+                self._stats.error_count += 1
     
     def critical(self, message):
         """
@@ -114,6 +244,12 @@ class CtripSpiderLogger:
             response_time (float): 响应时间（秒）
             method (str): HTTP方法
         """
+        if self.summary_interval:
+            with self._stats_lock:
+                self._stats.record_request(response_time)
+            self._maybe_flush_summary()
+            return
+
         if response_time:
             message = f"Request: {method} {url} | Status: {status_code} | Time: {response_time:.2f}s"
         else:
@@ -145,6 +281,12 @@ class CtripSpiderLogger:
             item_count (int): 提取的数据项数量
             item_type (str): 数据项类型
         """
+        if self.summary_interval:
+            with self._stats_lock:
+                self._stats.record_rows(item_count, item_type)
+            self._maybe_flush_summary()
+            return
+
         self.info(f"Successfully extracted {item_count} {item_type} items")
     
     def log_progress(self, current, total, stage="processing"):
@@ -156,5 +298,64 @@ class CtripSpiderLogger:
             total (int): 总数
             stage (str): 处理阶段
         """
+        if self.summary_interval:
+            with self._stats_lock:
+                self._stats.record_progress(current, total, stage)
+            self._maybe_flush_summary()
+            return
+
         progress = (current / total) * 100 if total > 0 else 0
-        self.info(f"{stage.title()} progress: {current}/{total} ({progress:.2f}%)")
\ No newline at end of file
+        self.info(f"{stage.title()} progress: {current}/{total} ({progress:.2f}%)")
+
+    def end_progress(self, stage="processing"):
+        """
+        结束某个阶段的进度记录，阶段没有达到总数就结束时调用，避免汇总中一直保留
+        
+        Args:
+            stage (str): 处理阶段
+        """
+        if self.summary_interval:
+            with self._stats_lock:
+                self._stats.end_progress(stage)
+
+    def log_detail(self, message):
+        """
+        记录高频明细日志（如逐页进度），汇总模式下只计数不逐条输出
+        
+        Args:
+            message (str): 日志消息
+        """
+        if self.summary_interval:
+            with self._stats_lock:
+                self._stats.detail_count += 1
+            self._maybe_flush_summary()
+            return
+
+        self.info(message)
+
+    def _maybe_flush_summary(self):
+        """
+        汇总窗口到期时输出一行汇总日志
+        """
+        self._flush_summary(force=False)
+
+    def flush_summary(self):
+        """
+        立即输出当前窗口的汇总日志并开始新的窗口，非汇总模式下不做任何操作
+        """
+        if self.summary_interval:
+            self._flush_summary(force=True)
+
+    def _flush_summary(self, force):
+        """
+        生成汇总日志并重置窗口
+
+        Args:
+            force (bool): 是否忽略窗口间隔强制输出
+        """
+        with self._stats_lock:
+            if not force and time.time() - self._stats.window_start < self.summary_interval:
+                return
+            message = self._stats.summary()
+            self._stats.reset()
+        self.logger.info(message)
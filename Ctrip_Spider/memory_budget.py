@@ -0,0 +1,147 @@
+import json
+import sys
+import threading
+from collections import deque
+
+try:
+    import resource
+except ImportError:
+    # Windows 没有 resource 模块，无法获取内存峰值
+    resource = None
+
+
+def estimate_size(record) -> int:
+    """估算一条记录占用的字节数（按JSON序列化后的长度计）
+
+    Args:
+        record: 记录
+
+    Returns:
+        int: 估算的字节数，无法序列化的对象按 sys.getsizeof 计
+    """
+    try:
+        return len(json.dumps(record, ensure_ascii=False).encode('utf-8'))
+    except (TypeError, ValueError):
+        return sys.getsizeof(record)
+
+
+def peak_rss_bytes() -> int:
+    """当前进程的内存占用峰值（RSS）
+
+    Returns:
+        int: 字节数，不支持的平台上返回0
+    """
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 下单位为KB，macOS 下为字节
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class MemoryBudget:
+    """在途数据的行数/字节数预算，超出预算时申请方阻塞，直到下游释放"""
+
+    def __init__(self, max_rows: int = None, max_bytes: int = None):
+        """初始化预算
+
+        Args:
+            max_rows: 最大在途行数，为None时不限制
+            max_bytes: 最大在途字节数，为None时不限制
+        """
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.rows = 0
+        self.bytes = 0
+        self.peak_rows = 0
+        self.peak_bytes = 0
+        self.blocked_count = 0
+        self._condition = threading.Condition()
+
+    def _fits(self, rows: int, size: int) -> bool:
+        """判断申请是否在预算内；没有在途数据时总是允许，避免单条超大记录永远无法通过"""
+        if self.rows == 0:
+            return True
+        if self.max_rows is not None and self.rows + rows > self.max_rows:
+            return False
+        if self.max_bytes is not None and self.bytes + size > self.max_bytes:
+            return False
+        return True
+
+    def acquire(self, rows: int = 1, size: int = 0, timeout: float = None) -> bool:
+        """申请预算，超出时阻塞
+
+        Args:
+            rows: 行数
+            size: 字节数
+            timeout: 最长等待时间（秒），为None时一直等待
+
+        Returns:
+            bool: 是否申请成功
+        """
+        with self._condition:
+            if not self._fits(rows, size):
+                self.blocked_count += 1
+                if not self._condition.wait_for(lambda: self._fits(rows, size), timeout):
+                    return False
+            self.rows += rows
+            self.bytes += size
+            self.peak_rows = max(self.peak_rows, self.rows)
+            self.peak_bytes = max(self.peak_bytes, self.bytes)
+            return True
+
+    def release(self, rows: int = 1, size: int = 0):
+        """归还预算
+
+        Args:
+            rows: 行数
+            size: 字节数
+        """
+        with self._condition:
+            self.rows = max(0, self.rows - rows)
+            self.bytes = max(0, self.bytes - size)
+            self._condition.notify_all()
+
+
+class BoundedQueue:
+    """按行数和字节数限制容量的队列：生产者在下游处理不过来时阻塞（背压）"""
+
+    def __init__(self, max_rows: int = None, max_bytes: int = None, sizeof=estimate_size):
+        """初始化队列
+
+        Args:
+            max_rows: 队列中最多的记录数
+            max_bytes: 队列中记录的最大总字节数
+            sizeof: 估算记录字节数的函数
+        """
+        self.budget = MemoryBudget(max_rows, max_bytes)
+        self.sizeof = sizeof if max_bytes is not None else (lambda record: 0)
+        self._items = deque()
+        self._not_empty = threading.Condition()
+
+    def put(self, item):
+        """放入记录，超出容量时阻塞
+
+        Args:
+            item: 记录
+        """
+        size = self.sizeof(item)
+        self.budget.acquire(1, size)
+        with self._not_empty:
+            self._items.append((item, size))
+            self._not_empty.notify()
+
+    def get(self):
+        """取出记录，队列为空时阻塞
+
+        Returns:
+            记录
+        """
+        with self._not_empty:
+            self._not_empty.wait_for(lambda: self._items)
+            item, size = self._items.popleft()
+        self.budget.release(1, size)
+        return item
+
+    def qsize(self) -> int:
+        """队列中的记录数"""
+        return len(self._items)
@@ -0,0 +1,326 @@
+import hashlib
+import json
+import random
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class MockCtripServer:
+    """本地模拟携程API服务器，按请求参数生成评论、景点列表、景点详情和搜索接口的模拟数据，用于离线测试和基准测试"""
+
+    # 接口名称与携程真实接口路径的对应关系
+    ENDPOINTS = {
+        'getCommentCollapseList': '/restapi/soa2/13444/json/getCommentCollapseList',
+        'search': '/restapi/soa2/26872/search',
+        'getSightRecreationList': '/restapi/soa2/13342/json/getSightRecreationList',
+        'getPoiMoreDetail': '/restapi/soa2/18254/json/getPoiMoreDetail',
+    }
+    # 评论图片的路径前缀（GET请求）
+    IMAGE_PATH = '/images/'
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, latency: float = 0.0, error_rate: float = 0.0,
+                 total_comments: int = 1000, total_attractions: int = 200, max_page_size: int = 50,
+                 seed: int = None, error_status: int = 500, retry_after: str = None, max_comment_pages: int = None):
+        """初始化模拟服务器
+
+        Args:
+            host: 监听地址
+            port: 监听端口，0表示自动分配
+            latency: 每个请求的模拟延迟（秒）
+            error_rate: 返回500错误的概率
+            total_comments: 每个景点的评论总数
+            total_attractions: 每个地区的景点总数
+            max_page_size: 评论接口实际支持的最大pageSize
+            seed: 随机数种子
+            error_status: 模拟错误的HTTP状态码
+            retry_after: 模拟错误响应携带的 Retry-After 头，为None时不携带
+            max_comment_pages: 评论接口可翻页的最大深度，超过后返回空列表，为None时不限制
+        """
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.error_rate = error_rate
+        self.total_comments = total_comments
+        self.total_attractions = total_attractions
+        self.max_page_size = max_page_size
+        self.random = random.Random(seed)
+        self.error_status = error_status
+        self.retry_after = retry_after
+        self.max_comment_pages = max_comment_pages
+        self.request_counts = {name: 0 for name in list(self.ENDPOINTS) + ['images']}
+        self.error_counts = {name: 0 for name in list(self.ENDPOINTS) + ['images']}
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    def start(self):
+        """在后台线程中启动服务器
+
+        Returns:
+            MockCtripServer: 服务器实例本身
+        """
+        self._server = ThreadingHTTPServer((self.host, self.port), self._make_handler())
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name="MockCtripServer", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """停止服务器"""
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    @property
+    def base_url(self) -> str:
+        """服务器根地址"""
+        return f"http://{self.host}:{self.port}"
+
+    def url(self, endpoint: str) -> str:
+        """获取指定接口的完整地址
+
+        Args:
+            endpoint: 接口名称，见 ENDPOINTS
+
+        Returns:
+            str: 接口地址
+        """
+        return self.base_url + self.ENDPOINTS[endpoint]
+
+    def _make_handler(self):
+        """创建绑定到当前服务器实例的请求处理类"""
+        server = self
+        routes = {path: name for name, path in self.ENDPOINTS.items()}
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = self.path.split('?')[0]
+                if not path.startswith(server.IMAGE_PATH):
+                    self._send(404, b'{"error": "not found"}')
+                    return
+                if server.latency:
+                    time.sleep(server.latency)
+                with server._lock:
+                    server.request_counts['images'] += 1
+                    failed = server.error_rate and server.random.random() < server.error_rate
+                    if failed:
+                        server.error_counts['images'] += 1
+                if failed:
+                    self._send(server.error_status, b'{"error": "mock server error"}')
+                    return
+                self._send(200, build_image(path[len(server.IMAGE_PATH):]), content_type='image/jpeg')
+
+            def do_POST(self):
+                endpoint = routes.get(self.path.split('?')[0])
+                if endpoint is None:
+                    self._send(404, b'{"error": "not found"}')
+                    return
+
+                length = int(self.headers.get('Content-Length') or 0)
+                try:
+                    body = json.loads(self.rfile.read(length) or b'{}')
+                except ValueError:
+                    body = {}
+
+                if server.latency:
+                    time.sleep(server.latency)
+
+                with server._lock:
+                    server.request_counts[endpoint] += 1
+                    failed = server.error_rate and server.random.random() < server.error_rate
+                    if failed:
+                        server.error_counts[endpoint] += 1
+                if failed:
+                    headers = {'Retry-After': server.retry_after} if server.retry_after else {}
+                    self._send(server.error_status, b'{"error": "mock server error"}', headers)
+                    return
+
+                payload = server.build_payload(endpoint, body)
+                self._send(200, json.dumps(payload, ensure_ascii=False).encode('utf-8'))
+
+            def _send(self, status, content, headers=None, content_type='application/json; charset=utf-8'):
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(content)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(content)
+
+            def log_message(self, format, *args):
+                # 不输出访问日志
+                pass
+
+        return Handler
+
+    def build_payload(self, endpoint: str, body: dict) -> dict:
+        """根据接口名称和请求体生成响应数据
+
+        Args:
+            endpoint: 接口名称
+            body: 请求体
+
+        Returns:
+            dict: 响应数据
+        """
+        if endpoint == 'getCommentCollapseList':
+            arg = body.get('arg', {})
+            page_index = arg.get('pageIndex', 1)
+            if self.max_comment_pages and page_index > self.max_comment_pages:
+                page_index = 0
+            return build_comment_page(arg.get('poiId', ''), page_index,
+                                      min(arg.get('pageSize', 10), self.max_page_size), self.total_comments,
+                                      arg.get('starType', 0), self.base_url + self.IMAGE_PATH + 'mock')
+        if endpoint == 'getSightRecreationList':
+            return build_sight_list_page(body.get('districtId', 0), body.get('index', 1), body.get('count', 20),
+                                         self.total_attractions)
+        if endpoint == 'getPoiMoreDetail':
+            return build_detail(body.get('poiId', 0))
+        return build_search(body.get('keyword', ''))
+
+
+def build_comment_page(poi_id, page_index: int, page_size: int, total_count: int, star_type: int = 0,
+                       image_base: str = "https://dimg04.c-ctrip.com/images/mock") -> dict:
+    """生成评论接口的模拟分页数据，第i条评论的评分为 5 - i % 5，带 i % 3 张图片
+
+    Args:
+        poi_id: 景点ID
+        page_index: 页码，0表示超出翻页深度（返回空列表）
+        page_size: 每页数量
+        total_count: 评论总数
+        star_type: 星级筛选，0表示不筛选
+        image_base: 图片链接的前缀
+
+    Returns:
+        dict: 评论接口响应数据
+    """
+    indices = range((5 - star_type) % 5, total_count, 5) if star_type else range(total_count)
+    start = (page_index - 1) * page_size
+    items = []
+    for i in (indices[start:start + page_size] if page_index > 0 else []):
+        items.append({
+            'commentId': int(f"{zlib.crc32(str(poi_id).encode()) % 100000}{i:07d}"),
+            'userInfo': {'userNick': f"游客{i}"},
+            'score': 5 - i % 5,
+            'content': f"第{i}条评论：景色很美，\n值得一去。交通方便，排队时间有点长。",
+            'publishTime': f"/Date({1700000000000 - i * 3600000}+0800)/",
+            'usefulCount': i % 7,
+            'replyCount': i % 3,
+            'touristTypeDisplay': ['家庭亲子', '情侣夫妻', '朋友出游', '独自旅行'][i % 4],
+            'ipLocatedName': ['辽宁', '北京', '上海'][i % 3],
+            'timeDuration': '2-3小时',
+            'images': [{'imageSrcUrl': f"{image_base}/{poi_id}_{i}_{n}.jpg"}
+                       for n in range(i % 3)],
+            'scores': [{'name': '景色', 'score': 5}, {'name': '趣味', 'score': 4}, {'name': '性价比', 'score': 4}],
+            'recommendItems': ['日落', '海景'] if i % 2 else [],
+        })
+    return {'result': {'totalCount': len(indices), 'items': items}}
+
+
+def build_image(name: str) -> bytes:
+    """生成评论图片的模拟内容：文件名最后一段（图片序号）相同的图片内容相同，用于测试去重
+
+    Args:
+        name: 图片路径（IMAGE_PATH 之后的部分）
+
+    Returns:
+        bytes: 图片内容
+    """
+    seed = name.rsplit('_', 1)[-1].encode('utf-8')
+    return b'\xff\xd8\xff\xe0' + hashlib.sha256(seed).digest() * 64 + b'\xff\xd9'
+
+
+def build_sight_list_page(district_id: int, index: int, count: int, total_count: int) -> dict:
+    """生成景点列表接口的模拟分页数据
+
+    Args:
+        district_id: 地区ID
+        index: 页码
+        count: 每页数量
+        total_count: 景点总数
+
+    Returns:
+        dict: 景点列表接口响应数据
+    """
+    start = (index - 1) * count
+    sights = []
+    for i in range(start, min(start + count, total_count)):
+        sights.append({
+            'name': f"模拟景点{i}",
+            'eName': f"Mock Sight {i}",
+            'id': district_id * 100000 + i,
+            'poiId': district_id * 1000000 + i,
+            'coordInfo': {'gDLat': 38.9 + i * 0.001, 'gDLon': 121.6 + i * 0.001},
+            'resourceTags': ['4A景区'],
+            'tagNameList': ['海滨'],
+            'themeTags': ['城市漫步'],
+            'shortFeatures': ['看海好去处'],
+            'price': 10 + i % 90,
+            'displayMinPrice': 8 + i % 90,
+            'commentScore': round(4.0 + (i % 10) / 10, 1),
+            'commentCount': 10000 // (i + 1),
+            'coverImageUrl': f"https://dimg04.c-ctrip.com/images/mock/cover_{i}.jpg",
+            'address': f"模拟路{i}号",
+            'districtName': '大连',
+            'cityName': '大连',
+            'provinceName': '辽宁',
+            'star': '4A',
+            'openTime': '08:00-17:00',
+            'description': '模拟景点描述',
+            'recommendDuration': '1-2小时',
+        })
+    return {'result': {'sightRecreationList': sights, 'totalCount': total_count}}
+
+
+def build_detail(poi_id) -> dict:
+    """生成景点详情接口的模拟数据
+
+    Args:
+        poi_id: 景点ID
+
+    Returns:
+        dict: 景点详情接口响应数据
+    """
+    introduction = "<p>模拟景点<b>介绍</b></p>" + "<div>这里有美丽的海景和悠久的历史。</div>" * 20
+    return {
+        'templateList': [
+            {'templateName': '头部信息', 'moduleList': [{
+                'moduleName': '基础信息',
+                'poiBasicModule': {
+                    'poiId': poi_id, 'poiName': f"模拟景点{poi_id}", 'poiEName': f"Mock Sight {poi_id}",
+                    'districtName': '大连', 'coordinate': {'latitude': 38.9, 'longitude': 121.6},
+                    'telephoneList': ['0411-12345678'],
+                }}]},
+            {'templateName': '温馨提示', 'moduleList': [{
+                'moduleName': '门票&预约信息',
+                'ticketAndAppointmentModule': {'ticketDesc': '成人票 45.5 元起'}}]},
+            {'templateName': '信息介绍', 'moduleList': [{
+                'moduleName': '图文详情', 'introductionModule': {'introduction': introduction}}]},
+            {'templateName': '实用攻略', 'moduleList': [{
+                'moduleName': '交通攻略',
+                'trafficModule': {'trafficDetail': [{'publicTransit': '乘坐地铁1号线'}],
+                                  'bigTrafficDetail': [{'poiName': '大连周水子国际机场'}]}}]},
+        ]
+    }
+
+
+def build_search(keyword: str) -> dict:
+    """生成搜索接口的模拟数据
+
+    Args:
+        keyword: 搜索关键词
+
+    Returns:
+        dict: 搜索接口响应数据
+    """
+    return {'data': [{'id': str(zlib.crc32(keyword.encode('utf-8')) % 1000000), 'word': keyword}]}
@@ -0,0 +1,185 @@
+import json
+import os
+import tempfile
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from log import CtripSpiderLogger
+
+# 工作进程内复用的解析器实例
+_comment_parser = None
+_detail_parser = None
+
+
+def _get_comment_parser():
+    """获取工作进程内的评论解析器"""
+    global _comment_parser
+    if _comment_parser is None:
+        from sight_comments import CtripCommentSpider
+        _comment_parser = CtripCommentSpider(tempfile.gettempdir(), logger=CtripSpiderLogger("ParseWorker", "logs"))
+    return _comment_parser
+
+
+def _get_detail_parser():
+    """获取工作进程内的详情解析器"""
+    global _detail_parser
+    if _detail_parser is None:
+        from sight_detail import AttractionDetailFetcher
+        _detail_parser = AttractionDetailFetcher(logger=CtripSpiderLogger("ParseWorker", "logs"))
+    return _detail_parser
+
+
+def parse_comment_batch(batch: list) -> list:
+    """在工作进程中解码并解析一批评论页
+
+    Args:
+        batch: [(原始响应体, 景点ID, 页码)]
+
+    Returns:
+        list: 每页的评论列表，无法解析的页面为None
+    """
+    parser = _get_comment_parser()
+    results = []
+    for content, poi_id, page in batch:
+        try:
+            data = json.loads(content)
+        except ValueError:
+            data = None
+        results.append(parser._parse_comments(data, poi_id, page))
+    return results
+
+
+def parse_detail_batch(batch: list) -> list:
+    """在工作进程中解码并解析一批景点详情
+
+    Args:
+        batch: [原始响应体]
+
+    Returns:
+        list: [(解析结果, 错误信息, 错误类型)]
+    """
+    parser = _get_detail_parser()
+    return [parser._parse_detail_content(content) for content in batch]
+
+
+class ParsePool:
+    """解码和解析进程池
+
+    高并发爬取时JSON解码、评论字段整理和BeautifulSoup清洗会占用GIL，使I/O线程排队等待。
+    I/O线程把原始响应体交给进程池后只等待结果；同时到达的请求按 batch_size 合批发送到工作进程，
+    不足一批时最多等待 linger 秒，以减少进程间通信的次数。
+    """
+
+    _BATCH_FUNCTIONS = {'comments': parse_comment_batch, 'detail': parse_detail_batch}
+
+    def __init__(self, max_workers: int = None, batch_size: int = 8, linger: float = 0.005,
+                 logger: CtripSpiderLogger = None):
+        """初始化进程池
+
+        Args:
+            max_workers: 工作进程数，默认为CPU核数
+            batch_size: 每批发送到工作进程的页数
+            linger: 不足一批时等待凑批的最长时间（秒）
+            logger: 日志记录器实例
+        """
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.batch_size = max(1, batch_size)
+        self.linger = linger
+        self.logger = logger or CtripSpiderLogger("ParsePool", "logs")
+        self.executor = ProcessPoolExecutor(self.max_workers)
+        self.batch_count = 0
+        self._lock = threading.Lock()
+        self._pending = {kind: [] for kind in self._BATCH_FUNCTIONS}
+        self._timers = {}
+        self.logger.info(f"解析进程池已启动: {self.max_workers} 个进程，每批 {self.batch_size} 页")
+
+    def parse_comment_page(self, content: bytes, poi_id: str, page: int):
+        """解码并解析一页评论，阻塞直到结果返回
+
+        Args:
+            content: 原始响应体
+            poi_id: 景点ID
+            page: 页码
+
+        Returns:
+            list: 评论列表，无法解析时返回None
+        """
+        return self._submit('comments', (content, poi_id, page)).result()
+
+    def parse_detail(self, content: bytes):
+        """解码并解析一个景点详情，阻塞直到结果返回
+
+        Args:
+            content: 原始响应体
+
+        Returns:
+            tuple: (解析结果, 错误信息, 错误类型)
+        """
+        return self._submit('detail', content).result()
+
+    def parse_comments(self, pages: list) -> list:
+        """批量解码并解析评论页（如重新解析归档数据），按 batch_size 分批并行
+
+        Args:
+            pages: [(原始响应体, 景点ID, 页码)]
+
+        Returns:
+            list: 与输入顺序一致的评论列表
+        """
+        batches = [pages[i:i + self.batch_size] for i in range(0, len(pages), self.batch_size)]
+        self.batch_count += len(batches)
+        return [comments for batch in self.executor.map(parse_comment_batch, batches) for comments in batch]
+
+    def _submit(self, kind: str, item) -> Future:
+        """加入待发送批次，凑满一批立即发送，否则启动定时发送"""
+        future = Future()
+        with self._lock:
+            pending = self._pending[kind]
+            pending.append((item, future))
+            if len(pending) >= self.batch_size:
+                self._flush_locked(kind)
+            elif kind not in self._timers:
+                timer = threading.Timer(self.linger, self._flush, args=(kind,))
+                timer.daemon = True
+                self._timers[kind] = timer
+                timer.start()
+        return future
+
+    def _flush(self, kind: str):
+        """发送当前待发送的批次"""
+        with self._lock:
+            self._flush_locked(kind)
+
+    def _flush_locked(self, kind: str):
+        """发送当前待发送的批次（调用方持有锁）"""
+        timer = self._timers.pop(kind, None)
+        if timer is not None:
+            timer.cancel()
+        pending, self._pending[kind] = self._pending[kind], []
+        if not pending:
+            return
+        self.batch_count += 1
+        batch_future = self.executor.submit(self._BATCH_FUNCTIONS[kind], [item for item, _ in pending])
+        futures = [future for _, future in pending]
+
+        def distribute(done: Future):
+            error = done.exception()
+            for index, future in enumerate(futures):
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(done.result()[index])
+
+        batch_future.add_done_callback(distribute)
+
+    def close(self):
+        """发送剩余批次并关闭进程池"""
+        for kind in self._BATCH_FUNCTIONS:
+            self._flush(kind)
+        self.executor.shutdown(wait=True)
+        self.logger.info(f"解析进程池已关闭，共发送 {self.batch_count} 批")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
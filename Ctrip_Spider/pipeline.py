@@ -0,0 +1,267 @@
+import argparse
+import json
+import os
+import threading
+import time
+from circuit_breaker import CircuitBreakerRegistry
+from log import CtripSpiderLogger
+from memory_budget import BoundedQueue, peak_rss_bytes
+from profiler import StageTracer
+from retry import RetryPolicy
+from sight_comments import CtripCommentSpider
+from sight_detail import AttractionDetailFetcher
+from sight_list import CtripAttractionScraper, JsonArrayWriter
+
+# 队列结束标记
+_DONE = object()
+
+
+class CrawlPipeline:
+    """城市全量爬取流水线：景点列表 → 景点详情 → 景点评论
+
+    各阶段之间通过有界队列连接，下游阶段在上游仍在运行时即开始处理：列表页还在加载时，
+    靠前景点的评论已经开始爬取。队列按记录数和字节数限制容量，超出时上游阶段阻塞等待（背压）；
+    景点列表和详情边爬边写入文件，评论只保留统计数，内存占用不随爬取规模增长。
+    """
+
+    def __init__(self, output_dir: str = './Datasets', list_workers: int = 1, detail_workers: int = 4,
+                 comment_workers: int = 2, queue_size: int = 50, max_comment_pages: int = 100,
+                 scraper: CtripAttractionScraper = None, detail_fetcher: AttractionDetailFetcher = None,
+                 comment_spider: CtripCommentSpider = None, logger: CtripSpiderLogger = None,
+                 tracer: StageTracer = None, max_inflight_bytes: int = None,
+                 circuit_breakers: CircuitBreakerRegistry = None):
+        """初始化流水线
+
+        Args:
+            output_dir: 输出目录
+            list_workers: 景点列表阶段的并发数
+            detail_workers: 景点详情阶段的并发数
+            comment_workers: 评论阶段的并发数（按景点并发）
+            queue_size: 阶段之间队列的最大记录数
+            max_comment_pages: 每个景点最多爬取的评论页数
+            scraper: 景点列表爬虫实例
+            detail_fetcher: 景点详情爬虫实例
+            comment_spider: 评论爬虫实例
+            logger: 日志记录器实例
+            tracer: 阶段计时器实例
+            max_inflight_bytes: 阶段之间队列中记录的最大总字节数，为None时只按记录数限制
+            circuit_breakers: 熔断器注册表，各阶段的所有工作线程共享，为None时不熔断
+        """
+        self.output_dir = output_dir
+        os.makedirs(output_dir, exist_ok=True)
+        self.list_workers = max(1, list_workers)
+        self.detail_workers = max(1, detail_workers)
+        self.comment_workers = max(1, comment_workers)
+        self.queue_size = queue_size
+        self.max_inflight_bytes = max_inflight_bytes
+        self.max_comment_pages = max_comment_pages
+        self.logger = logger or CtripSpiderLogger("CrawlPipeline", "logs")
+        self.tracer = tracer or StageTracer(self.logger)
+        self.circuit_breakers = circuit_breakers
+        self.scraper = scraper or CtripAttractionScraper(logger=self.logger, tracer=self.tracer,
+                                                         retry_policy=self._retry_policy())
+        self.detail_fetcher = detail_fetcher or AttractionDetailFetcher(logger=self.logger, tracer=self.tracer,
+                                                                        retry_policy=self._retry_policy())
+        self.comment_spider = comment_spider or CtripCommentSpider(
+            os.path.join(output_dir, 'comments'), logger=self.logger, tracer=self.tracer,
+            retry_policy=self._retry_policy())
+        self._lock = threading.Lock()
+
+    def _retry_policy(self) -> RetryPolicy:
+        """为默认创建的爬虫创建重试策略，熔断器注册表在各爬虫之间共享"""
+        return RetryPolicy(logger=self.logger, circuit_breakers=self.circuit_breakers)
+
+    def run(self, district_id: int, pages: int = 1, count_per_page: int = 20) -> dict:
+        """爬取一个地区的景点列表、详情和评论
+
+        Args:
+            district_id: 地区ID
+            pages: 最多获取的景点列表页数
+            count_per_page: 景点列表每页数量
+
+        Returns:
+            dict: 各阶段的统计信息和输出文件路径
+        """
+        self.logger.info(f"流水线启动: 地区 {district_id}，列表 {pages} 页，并发 列表/详情/评论 = "
+                         f"{self.list_workers}/{self.detail_workers}/{self.comment_workers}，队列长度 {self.queue_size}")
+        start_time = time.time()
+        detail_queue = BoundedQueue(self.queue_size, self.max_inflight_bytes)
+        comment_queue = BoundedQueue(self.queue_size, self.max_inflight_bytes)
+        details_path = os.path.join(self.output_dir, f'details_{district_id}.jsonl')
+        # 详情按完成顺序追加写入，重新运行时覆盖
+        open(details_path, 'w', encoding='utf-8').close()
+
+        attractions_path = os.path.join(self.output_dir, f'attractions_{district_id}.json')
+        self._attractions_writer = JsonArrayWriter(attractions_path)
+        # 多个列表线程乱序完成的页面先缓存，按页码顺序写入景点文件
+        self._pending_pages = {}
+        self._next_write_page = 1
+        self._stats = {
+            'attractions': 0,
+            'details_ok': 0,
+            'details_failed': 0,
+            'comment_pois_ok': 0,
+            'comment_pois_failed': 0,
+            'comments': 0,
+            'errors': 0,
+        }
+        next_page = iter(range(1, pages + 1))
+        list_done = threading.Event()
+
+        list_threads = [threading.Thread(target=self._list_worker, name=f"ListWorker-{i}",
+                                         args=(district_id, count_per_page, next_page, list_done, detail_queue))
+                        for i in range(self.list_workers)]
+        detail_threads = [threading.Thread(target=self._detail_worker, name=f"DetailWorker-{i}",
+                                           args=(detail_queue, comment_queue, details_path))
+                          for i in range(self.detail_workers)]
+        comment_threads = [threading.Thread(target=self._comment_worker, name=f"CommentWorker-{i}",
+                                            args=(comment_queue,))
+                           for i in range(self.comment_workers)]
+        for thread in list_threads + detail_threads + comment_threads:
+            thread.start()
+
+        # 上游阶段全部结束后，向下游每个工作线程发送结束标记
+        self._join_and_close(list_threads, detail_queue, self.detail_workers)
+        self._join_and_close(detail_threads, comment_queue, self.comment_workers)
+        for thread in comment_threads:
+            thread.join()
+
+        for page in sorted(self._pending_pages):
+            self._write_attractions(self._pending_pages.pop(page))
+        self._attractions_writer.close()
+
+        summary = dict(self._stats, district_id=district_id)
+        summary.update({
+            'queue_peak': {'detail': detail_queue.budget.peak_rows, 'comment': comment_queue.budget.peak_rows},
+            'queue_peak_bytes': {'detail': detail_queue.budget.peak_bytes,
+                                 'comment': comment_queue.budget.peak_bytes},
+            'peak_rss_mb': round(peak_rss_bytes() / 1024 / 1024, 1),
+            'elapsed': time.time() - start_time,
+            'attractions_file': attractions_path,
+            'details_file': details_path,
+            'comments_dir': self.comment_spider.output_dir,
+        })
+        if self.circuit_breakers is not None:
+            summary['circuit_breakers'] = self.circuit_breakers.stats()
+        self.logger.flush_summary()
+        self.logger.info(f"流水线完成: 景点 {summary['attractions']} 个，详情成功 {summary['details_ok']} 个，"
+                         f"评论 {summary['comments']} 条，耗时 {summary['elapsed']:.2f}秒，"
+                         f"内存峰值 {summary['peak_rss_mb']}MB")
+        self.tracer.report()
+        return summary
+
+    @staticmethod
+    def _join_and_close(threads: list, downstream: BoundedQueue, consumers: int):
+        """等待上游线程结束后向下游队列发送结束标记"""
+        for thread in threads:
+            thread.join()
+        for _ in range(consumers):
+            downstream.put(_DONE)
+
+    def _list_worker(self, district_id: int, count: int, next_page, list_done: threading.Event,
+                     detail_queue: BoundedQueue):
+        """景点列表阶段：按页获取景点，不足一页时停止领取后续页；获取失败的页面记为错误，不结束列表"""
+        while not list_done.is_set():
+            with self._lock:
+                page = next(next_page, None)
+            if page is None:
+                return
+            try:
+                attractions = self.scraper.fetch_attractions_page(district_id, page, count)
+                if attractions is None:
+                    raise RuntimeError("请求或解析失败")
+            except Exception as e:
+                self._record_error(f"获取第 {page} 页景点列表失败: {e}", f"District: {district_id}")
+                self._page_done(page, [])
+                continue
+            if len(attractions) < count:
+                list_done.set()
+            self._page_done(page, attractions)
+            for attraction in attractions:
+                # 下游处理不过来时在此阻塞
+                detail_queue.put(attraction)
+            self.logger.log_detail(f"第 {page} 页景点列表已进入流水线，共 {len(attractions)} 个景点")
+
+    def _page_done(self, page: int, attractions: list):
+        """记录完成的列表页，并按页码顺序写入所有已连续完成的页面"""
+        with self._lock:
+            self._pending_pages[page] = attractions
+            while self._next_write_page in self._pending_pages:
+                self._write_attractions(self._pending_pages.pop(self._next_write_page))
+                self._next_write_page += 1
+
+    def _write_attractions(self, attractions: list):
+        """写入景点文件（调用方持有锁或已无并发写入）"""
+        for attraction in attractions:
+            self._stats['attractions'] += 1
+            self._attractions_writer.write(attraction)
+
+    def _detail_worker(self, detail_queue: BoundedQueue, comment_queue: BoundedQueue, details_path: str):
+        """景点详情阶段：获取详情后将景点转交评论阶段，详情失败不影响评论爬取"""
+        while True:
+            attraction = detail_queue.get()
+            if attraction is _DONE:
+                return
+            poi_id = attraction.get('poi_id')
+            if not poi_id:
+                continue
+            try:
+                detail = self.detail_fetcher.get_detail(poi_id)
+                line = json.dumps(dict(detail, poi_id=poi_id), ensure_ascii=False) + '\n'
+                with self._lock:
+                    self._stats['details_ok' if detail['success'] else 'details_failed'] += 1
+                    with open(details_path, 'a', encoding='utf-8') as f:
+                        f.write(line)
+            except Exception as e:
+                self._record_error(f"获取景点详情失败: {e}", f"POI_ID: {poi_id}")
+            comment_queue.put(attraction)
+
+    def _comment_worker(self, comment_queue: BoundedQueue):
+        """评论阶段：逐个景点爬取评论"""
+        while True:
+            attraction = comment_queue.get()
+            if attraction is _DONE:
+                return
+            poi_id, name = str(attraction['poi_id']), attraction.get('name') or str(attraction['poi_id'])
+            try:
+                report = self.comment_spider.crawl_poi(poi_id, name, self.max_comment_pages)
+            except Exception as e:
+                self._record_error(f"爬取景点评论失败: {e}", f"POI_ID: {poi_id}")
+                continue
+            with self._lock:
+                self._stats['comment_pois_ok' if report['success'] else 'comment_pois_failed'] += 1
+                self._stats['comments'] += report['comment_count']
+
+    def _record_error(self, message: str, context: str):
+        """记录阶段内的异常，异常不会中断流水线"""
+        with self._lock:
+            self._stats['errors'] += 1
+        self.logger.log_error(message, context, "PIPELINE")
+
+
+# 使用示例：python pipeline.py --district 9 --pages 5 --detail-workers 4 --comment-workers 2
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="城市全量爬取流水线：景点列表 → 详情 → 评论")
+    parser.add_argument('--district', type=int, required=True, help="地区ID")
+    parser.add_argument('--pages', type=int, default=5, help="最多获取的景点列表页数")
+    parser.add_argument('--count', type=int, default=20, help="景点列表每页数量")
+    parser.add_argument('--output', default='./Datasets', help="输出目录")
+    parser.add_argument('--list-workers', type=int, default=1, help="景点列表阶段并发数")
+    parser.add_argument('--detail-workers', type=int, default=4, help="景点详情阶段并发数")
+    parser.add_argument('--comment-workers', type=int, default=2, help="评论阶段并发数")
+    parser.add_argument('--queue-size', type=int, default=50, help="阶段之间队列的最大记录数")
+    parser.add_argument('--max-inflight-mb', type=float, default=None, help="阶段之间队列的最大总大小（MB）")
+    parser.add_argument('--max-comment-pages', type=int, default=100, help="每个景点最多爬取的评论页数")
+    parser.add_argument('--breaker-threshold', type=int, default=None, help="接口连续失败多少次后熔断，默认不熔断")
+    parser.add_argument('--breaker-cooldown', type=float, default=30.0, help="熔断后等待多少秒再放行探测请求")
+    options = parser.parse_args()
+
+    max_inflight_bytes = int(options.max_inflight_mb * 1024 * 1024) if options.max_inflight_mb else None
+    pipeline = CrawlPipeline(options.output, options.list_workers, options.detail_workers,
+                             options.comment_workers, options.queue_size, options.max_comment_pages,
+                             max_inflight_bytes=max_inflight_bytes,
+                             logger=CtripSpiderLogger("CrawlPipelineMain", "logs"),
+                             circuit_breakers=CircuitBreakerRegistry(options.breaker_threshold, options.breaker_cooldown)
+                             if options.breaker_threshold else None)
+    result = pipeline.run(options.district, options.pages, options.count)
+    print(json.dumps(result, ensure_ascii=False, indent=2))
@@ -0,0 +1,208 @@
+import argparse
+import cProfile
+import os
+import runpy
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from log import CtripSpiderLogger
+
+
+class StageTracer:
+    """爬取流水线阶段计时器，按景点和整次运行聚合 fetch/decode/parse/write 等阶段耗时"""
+
+    def __init__(self, logger: CtripSpiderLogger = None):
+        """初始化阶段计时器
+
+        Args:
+            logger: 日志记录器实例
+        """
+        self.logger = logger or CtripSpiderLogger("StageTracer", "logs")
+        self._lock = threading.Lock()
+        self.run_stats = {}
+        self.poi_stats = {}
+
+    @contextmanager
+    def span(self, stage: str, poi_id=None):
+        """对一个阶段计时
+
+        Args:
+            stage: 阶段名称，如 fetch、decode、parse、write
+            poi_id: 景点ID，为None时只计入整次运行
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start, poi_id)
+
+    def record(self, stage: str, elapsed: float, poi_id=None):
+        """记录一次阶段耗时
+
+        Args:
+            stage: 阶段名称
+            elapsed: 耗时（秒）
+            poi_id: 景点ID
+        """
+        with self._lock:
+            self._add(self.run_stats, stage, elapsed)
+            if poi_id is not None:
+                self._add(self.poi_stats.setdefault(str(poi_id), {}), stage, elapsed)
+
+    @staticmethod
+    def _add(stats: dict, stage: str, elapsed: float):
+        """累加阶段统计：[次数, 总耗时, 最大耗时]"""
+        entry = stats.setdefault(stage, [0, 0.0, 0.0])
+        entry[0] += 1
+        entry[1] += elapsed
+        entry[2] = max(entry[2], elapsed)
+
+    def get_stats(self, poi_id=None) -> dict:
+        """获取阶段统计
+
+        Args:
+            poi_id: 景点ID，为None时返回整次运行的统计
+
+        Returns:
+            dict: {阶段: {'count': int, 'total': float, 'avg': float, 'max': float}}
+        """
+        with self._lock:
+            stats = self.run_stats if poi_id is None else self.poi_stats.get(str(poi_id), {})
+            return {
+                stage: {'count': count, 'total': total, 'avg': total / count if count else 0.0, 'max': max_time}
+                for stage, (count, total, max_time) in stats.items()
+            }
+
+    def report(self, poi_id=None) -> str:
+        """输出阶段耗时汇总日志
+
+        Args:
+            poi_id: 景点ID，为None时汇总整次运行
+
+        Returns:
+            str: 汇总信息
+        """
+        stats = self.get_stats(poi_id)
+        scope = "整次运行" if poi_id is None else f"景点 {poi_id}"
+        if not stats:
+            message = f"阶段耗时 [{scope}]: 无记录"
+        else:
+            total = sum(item['total'] for item in stats.values()) or 1e-9
+            parts = [
+                f"{stage} {item['count']}次 共{item['total']:.3f}s ({item['total'] / total * 100:.1f}%) "
+                f"平均{item['avg'] * 1000:.1f}ms 最大{item['max'] * 1000:.1f}ms"
+                for stage, item in sorted(stats.items(), key=lambda kv: -kv[1]['total'])
+            ]
+            message = f"阶段耗时 [{scope}]: " + " | ".join(parts)
+        self.logger.info(message)
+        return message
+
+    def reset(self):
+        """清空所有统计"""
+        with self._lock:
+            self.run_stats = {}
+            self.poi_stats = {}
+
+
+class SamplingProfiler:
+    """采样分析器，定时采集目标线程调用栈并输出火焰图（collapsed stack）格式"""
+
+    def __init__(self, interval: float = 0.005, thread_id: int = None):
+        """初始化采样分析器
+
+        Args:
+            interval: 采样间隔（秒）
+            thread_id: 被采样的线程ID，默认为当前线程
+        """
+        self.interval = interval
+        self.thread_id = thread_id or threading.get_ident()
+        self.samples = Counter()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def _sample_loop(self):
+        """采样线程主循环"""
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            self.samples[";".join(reversed(stack))] += 1
+
+    def start(self):
+        """开始采样"""
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._sample_loop, name="SamplingProfiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """停止采样"""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join()
+
+    def write_collapsed(self, output_path: str):
+        """写出 collapsed stack 文件，可直接用于 flamegraph.pl 或 speedscope
+
+        Args:
+            output_path: 输出文件路径
+        """
+        with open(output_path, 'w', encoding='utf-8') as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+def profile_call(func, *args, output_path: str = 'crawl.prof', mode: str = 'cprofile',
+                 interval: float = 0.005, logger: CtripSpiderLogger = None, **kwargs):
+    """在分析器下运行一次调用并写出分析结果
+
+    Args:
+        func: 被分析的函数，如 spider.crawl_multiple_pois
+        output_path: 分析结果输出路径
+        mode: 'cprofile' 输出 pstats 文件，'sampling' 输出火焰图 collapsed stack 文件
+        interval: 采样间隔（秒），仅 sampling 模式有效
+        logger: 日志记录器实例
+
+    Returns:
+        被分析函数的返回值
+    """
+    logger = logger or CtripSpiderLogger("Profiler", "logs")
+    if mode == 'cprofile':
+        profiler = cProfile.Profile()
+        try:
+            return profiler.runcall(func, *args, **kwargs)
+        finally:
+            profiler.dump_stats(output_path)
+            logger.info(f"cProfile 分析结果已保存到 {output_path}")
+    elif mode == 'sampling':
+        profiler = SamplingProfiler(interval=interval)
+        profiler.start()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profiler.stop()
+            profiler.write_collapsed(output_path)
+            logger.info(f"采样分析结果已保存到 {output_path}，共 {sum(profiler.samples.values())} 个样本")
+    else:
+        raise ValueError(f"不支持的分析模式: {mode}")
+
+
+# 使用示例：python profiler.py --mode sampling --output crawl.folded sight_comments.py
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="在分析器下运行爬虫脚本")
+    parser.add_argument('--mode', choices=['cprofile', 'sampling'], default='cprofile', help="分析模式")
+    parser.add_argument('--output', default='crawl.prof', help="分析结果输出路径")
+    parser.add_argument('--interval', type=float, default=0.005, help="采样间隔（秒）")
+    parser.add_argument('script', help="要运行的爬虫脚本")
+    parser.add_argument('script_args', nargs=argparse.REMAINDER, help="脚本参数")
+    options = parser.parse_args()
+
+    sys.argv = [options.script] + options.script_args
+    profile_call(runpy.run_path, options.script, output_path=options.output, mode=options.mode,
+                 interval=options.interval, run_name="__main__")
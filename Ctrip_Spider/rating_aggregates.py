@@ -0,0 +1,300 @@
+import argparse
+import csv
+import json
+import math
+import sqlite3
+import threading
+from compressed_io import list_comment_files, open_input
+from frontier import _Transaction
+from log import CtripSpiderLogger
+
+# 所有景点的汇总行使用的景点ID
+ALL_POIS = '*'
+# 全部时间的汇总行使用的周期
+ALL_PERIODS = 'all'
+# 参与统计的评分字段：{统计名: 评论字段}
+SCORE_FIELDS = {'overall': 'score', 'scenery': 'sceneryScore', 'fun': 'funScore', 'value': 'valueScore'}
+
+
+def empty_stats() -> dict:
+    """空的可合并统计量"""
+    return {'count': 0, 'scores': {name: {'count': 0, 'sum': 0.0, 'sum_sq': 0.0} for name in SCORE_FIELDS},
+            'histogram': {}, 'tourist_types': {}}
+
+
+def merge_stats(target: dict, other: dict) -> dict:
+    """把 other 合并到 target（计数、和、平方和与直方图都可以直接相加）
+
+    Args:
+        target: 被合并的统计量，原地修改
+        other: 要合并的统计量
+
+    Returns:
+        dict: target
+    """
+    target['count'] += other['count']
+    for name, score in other['scores'].items():
+        merged = target['scores'].setdefault(name, {'count': 0, 'sum': 0.0, 'sum_sq': 0.0})
+        for key in ('count', 'sum', 'sum_sq'):
+            merged[key] += score[key]
+    for field in ('histogram', 'tourist_types'):
+        for key, count in other[field].items():
+            target[field][key] = target[field].get(key, 0) + count
+    return target
+
+
+def summarize(stats: dict) -> dict:
+    """由统计量计算均值和标准差
+
+    Args:
+        stats: 可合并统计量
+
+    Returns:
+        dict: {'count', 'mean', 'std', 'histogram', 'tourist_types'}，mean 和 std 按评分字段给出，
+              没有该评分的字段为None
+    """
+    mean, std = {}, {}
+    for name, score in stats['scores'].items():
+        if not score['count']:
+            mean[name] = std[name] = None
+            continue
+        mean[name] = score['sum'] / score['count']
+        std[name] = math.sqrt(max(0.0, score['sum_sq'] / score['count'] - mean[name] ** 2))
+    return {'count': stats['count'], 'mean': mean, 'std': std,
+            'histogram': dict(stats['histogram']), 'tourist_types': dict(stats['tourist_types'])}
+
+
+def _to_float(value):
+    """把评分转换为数字，空值或无法转换时返回None"""
+    try:
+        return float(value) if value not in ('', None) else None
+    except (TypeError, ValueError):
+        return None
+
+
+class RatingAggregateStore:
+    """景点评分的物化汇总表
+
+    每写入一批评论就把它们的统计量（计数、和、平方和、星级直方图、出行类型计数）合并到
+    (景点, 月份)、(景点, 全部)、(全部景点, 月份)、(全部景点, 全部) 四类汇总行中。
+    已计入的评论ID记录在 rating_comments 表中，同一条评论重复写入（任务重新执行、死信重放）只计一次。
+    查询单个景点或单个周期只读取一行，不需要重新读取评论CSV。
+    """
+
+    def __init__(self, db_path: str, logger: CtripSpiderLogger = None):
+        """初始化汇总表
+
+        Args:
+            db_path: SQLite数据库文件路径，多个进程可以共享
+            logger: 日志记录器实例
+        """
+        self.db_path = db_path
+        self.logger = logger or CtripSpiderLogger("RatingAggregateStore", "logs")
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS rating_aggregates (
+                    poi_id TEXT NOT NULL,
+                    period TEXT NOT NULL,
+                    stats TEXT NOT NULL,
+                    PRIMARY KEY (poi_id, period)
+                )''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS rating_comments (
+                    poi_id TEXT NOT NULL,
+                    comment_id TEXT NOT NULL,
+                    PRIMARY KEY (poi_id, comment_id)
+                )''')
+
+    def _connect(self):
+        """获取当前线程的数据库连接"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return _Transaction(conn)
+
+    @staticmethod
+    def _period(publish_time: str) -> str:
+        """由发布时间（YYYY-MM-DD HH:MM:SS）得到月份，无法识别时返回None"""
+        if isinstance(publish_time, str) and len(publish_time) >= 7 and publish_time[4] == '-':
+            return publish_time[:7]
+        return None
+
+    def add_comments(self, poi_id, comments: list):
+        """合并一批新写入的评论，作为 CtripCommentSpider 写入CSV后的回调，已计入的评论跳过
+
+        Args:
+            poi_id: 景点ID
+            comments: 评论列表（_parse_comments 的结果）
+        """
+        if not comments:
+            return
+        with self._connect() as conn:
+            self._add_comments(conn, str(poi_id), comments)
+
+    def _add_comments(self, conn, poi_id: str, comments: list) -> int:
+        """在已开启的写事务中记录评论ID，并把未计入过的评论合并到汇总行，返回合并的评论数"""
+        deltas, added = {}, 0
+        for comment in comments:
+            comment_id = comment.get('commentId')
+            if comment_id not in ('', None) and not conn.execute(
+                    'INSERT OR IGNORE INTO rating_comments (poi_id, comment_id) VALUES (?, ?)',
+                    (poi_id, str(comment_id))).rowcount:
+                continue
+            added += 1
+            stats = empty_stats()
+            stats['count'] = 1
+            for name, field in SCORE_FIELDS.items():
+                value = _to_float(comment.get(field))
+                if value is not None:
+                    stats['scores'][name] = {'count': 1, 'sum': value, 'sum_sq': value * value}
+            overall = _to_float(comment.get('score'))
+            if overall is not None:
+                stats['histogram'][str(int(round(overall)))] = 1
+            tourist_type = comment.get('touristTypeDisplay') or '未知'
+            stats['tourist_types'][tourist_type] = 1
+
+            periods = [ALL_PERIODS]
+            month = self._period(comment.get('publishTime'))
+            if month:
+                periods.append(month)
+            for key in ((poi, period) for poi in (poi_id, ALL_POIS) for period in periods):
+                merge_stats(deltas.setdefault(key, empty_stats()), stats)
+        for (poi, period), delta in deltas.items():
+            row = conn.execute('SELECT stats FROM rating_aggregates WHERE poi_id = ? AND period = ?',
+                               (poi, period)).fetchone()
+            stats = merge_stats(json.loads(row[0]), delta) if row else delta
+            conn.execute('INSERT OR REPLACE INTO rating_aggregates (poi_id, period, stats) VALUES (?, ?, ?)',
+                         (poi, period, json.dumps(stats, ensure_ascii=False)))
+        return added
+
+    def reset_poi(self, poi_id):
+        """重新爬取景点前清除其汇总，并从全部景点的汇总中减去
+
+        Args:
+            poi_id: 景点ID
+        """
+        with self._connect() as conn:
+            self._reset_poi(conn, str(poi_id))
+
+    @staticmethod
+    def _reset_poi(conn, poi_id: str):
+        """在已开启的写事务中清除景点的汇总和已计入的评论ID"""
+        rows = conn.execute('SELECT period, stats FROM rating_aggregates WHERE poi_id = ?', (poi_id,)).fetchall()
+        for period, stats_text in rows:
+            stats = json.loads(stats_text)
+            negated = {'count': -stats['count'],
+                       'scores': {name: {key: -value for key, value in score.items()}
+                                  for name, score in stats['scores'].items()},
+                       'histogram': {key: -count for key, count in stats['histogram'].items()},
+                       'tourist_types': {key: -count for key, count in stats['tourist_types'].items()}}
+            row = conn.execute('SELECT stats FROM rating_aggregates WHERE poi_id = ? AND period = ?',
+                               (ALL_POIS, period)).fetchone()
+            if row:
+                total = merge_stats(json.loads(row[0]), negated)
+                for field in ('histogram', 'tourist_types'):
+                    total[field] = {key: count for key, count in total[field].items() if count}
+                conn.execute('UPDATE rating_aggregates SET stats = ? WHERE poi_id = ? AND period = ?',
+                             (json.dumps(total, ensure_ascii=False), ALL_POIS, period))
+        conn.execute('DELETE FROM rating_aggregates WHERE poi_id = ?', (poi_id,))
+        conn.execute('DELETE FROM rating_comments WHERE poi_id = ?', (poi_id,))
+
+    def get(self, poi_id=ALL_POIS, period: str = ALL_PERIODS):
+        """查询一个景点（或全部景点）在一个周期（月份或全部）的汇总
+
+        Args:
+            poi_id: 景点ID，默认为全部景点
+            period: 月份（YYYY-MM），默认为全部时间
+
+        Returns:
+            dict: 汇总，见 summarize；没有数据时返回None
+        """
+        with self._connect() as conn:
+            row = conn.execute('SELECT stats FROM rating_aggregates WHERE poi_id = ? AND period = ?',
+                               (str(poi_id), period)).fetchone()
+        return summarize(json.loads(row[0])) if row else None
+
+    def trend(self, poi_id=ALL_POIS) -> list:
+        """按月份查询一个景点（或全部景点）的评分趋势
+
+        Args:
+            poi_id: 景点ID，默认为全部景点
+
+        Returns:
+            list: [(月份, 汇总)]，按月份排列
+        """
+        with self._connect() as conn:
+            rows = conn.execute('SELECT period, stats FROM rating_aggregates WHERE poi_id = ? AND period != ? '
+                                'ORDER BY period', (str(poi_id), ALL_PERIODS)).fetchall()
+        return [(period, summarize(json.loads(stats))) for period, stats in rows]
+
+    def rollup(self, poi_ids: list, period: str = ALL_PERIODS):
+        """合并多个景点（如同一城市的景点）在一个周期的汇总
+
+        Args:
+            poi_ids: 景点ID列表
+            period: 月份（YYYY-MM），默认为全部时间
+
+        Returns:
+            dict: 汇总，见 summarize
+        """
+        total = empty_stats()
+        with self._connect() as conn:
+            for poi_id in poi_ids:
+                row = conn.execute('SELECT stats FROM rating_aggregates WHERE poi_id = ? AND period = ?',
+                                   (str(poi_id), period)).fetchone()
+                if row:
+                    merge_stats(total, json.loads(row[0]))
+        return summarize(total)
+
+    def backfill(self, csv_files: list) -> int:
+        """从已有的评论CSV文件重建汇总，已有汇总的景点先清除
+
+        评论按每行的 景区ID 归属景点（合并后的分段文件含有多个景点），
+        景点第一次出现时清除旧汇总和合并新评论在同一个事务中完成，查询方不会看到清空后的中间状态。
+
+        Args:
+            csv_files: 评论CSV文件路径列表（可以是压缩文件）
+
+        Returns:
+            int: 合并的评论数
+        """
+        columns = {'commentId': '评论ID', 'score': '总体评分', 'publishTime': '发布时间',
+                   'touristTypeDisplay': '出行类型', 'sceneryScore': '景色评分', 'funScore': '趣味评分',
+                   'valueScore': '性价比评分'}
+        total, rebuilt = 0, set()
+        for file_path in csv_files:
+            groups = {}
+            with open_input(file_path, encoding='utf-8-sig', newline='') as f:
+                for row in csv.DictReader(f):
+                    if row.get('景区ID'):
+                        groups.setdefault(row['景区ID'], []).append(
+                            {field: row.get(column) for field, column in columns.items()})
+            for poi_id, comments in groups.items():
+                with self._connect() as conn:
+                    if poi_id not in rebuilt:
+                        self._reset_poi(conn, poi_id)
+                        rebuilt.add(poi_id)
+                    total += self._add_comments(conn, poi_id, comments)
+        self.logger.info(f"评分汇总重建完成: {len(csv_files)} 个文件，{len(rebuilt)} 个景点，{total} 条评论")
+        return total
+
+
+# 使用示例：python rating_aggregates.py --db ./Datasets/ratings.db --backfill ./Datasets --poi 76865
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="景点评分汇总查询")
+    parser.add_argument('--db', default='./Datasets/ratings.db', help="汇总数据库文件")
+    parser.add_argument('--backfill', help="从该目录下的评论CSV文件重建汇总")
+    parser.add_argument('--poi', default=ALL_POIS, help="景点ID，默认为全部景点")
+    parser.add_argument('--period', default=ALL_PERIODS, help="月份（YYYY-MM），默认为全部时间")
+    parser.add_argument('--trend', action='store_true', help="输出按月份的趋势")
+    options = parser.parse_args()
+
+    store = RatingAggregateStore(options.db, CtripSpiderLogger("RatingAggregateMain", "logs"))
+    if options.backfill:
+        store.backfill(list_comment_files(options.backfill))
+    result = store.trend(options.poi) if options.trend else store.get(options.poi, options.period)
+    print(json.dumps(result, ensure_ascii=False, indent=2))
@@ -0,0 +1,254 @@
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from log import CtripSpiderLogger
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+class RawArchive:
+    """原始响应归档库：追加写入的压缩分段文件 + 紧凑的二进制偏移索引，支持内存映射随机读取单条记录
+
+    目录结构:
+        manifest.json       压缩算法、索引格式版本等元数据
+        index.bin           定长索引记录 (类型, 景点ID, 页码, pageSize, 星级筛选, 标签筛选, 抓取时间) -> (分段, 偏移, 长度)
+        segment-000001.dat  逐条独立压缩的原始响应
+
+    同一页用不同 pageSize 或筛选条件请求得到的是不同的数据，分别索引；pageSize 为0表示未知（旧版本归档）。
+    """
+
+    # 索引记录：类型(B) 景点ID(Q) 页码(I) pageSize(H) 星级筛选(B) 标签筛选(I) 抓取时间(d) 分段号(I) 偏移(Q) 长度(I)
+    INDEX_RECORD = struct.Struct('<BQIHBIdIQI')
+    INDEX_VERSION = 2
+    # 版本1的索引记录，没有 pageSize 和筛选条件：类型(B) 景点ID(Q) 页码(I) 抓取时间(d) 分段号(I) 偏移(Q) 长度(I)
+    LEGACY_INDEX_RECORD = struct.Struct('<BQIdIQI')
+    KINDS = {'comments': 0, 'detail': 1, 'attractions': 2}
+
+    def __init__(self, root: str, codec: str = None, level: int = None, segment_max_bytes: int = 64 * 1024 * 1024,
+                 logger: CtripSpiderLogger = None):
+        """初始化归档库，已存在的归档沿用其压缩算法
+
+        Args:
+            root: 归档目录
+            codec: 压缩算法 'zstd' 或 'gzip'，默认在安装了 zstandard 时使用 zstd
+            level: 压缩级别，默认 zstd 为 10，gzip 为 6
+            segment_max_bytes: 单个分段文件的最大字节数
+            logger: 日志记录器实例
+        """
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self.logger = logger or CtripSpiderLogger("RawArchive", "logs")
+        self.segment_max_bytes = segment_max_bytes
+        self.index_path = os.path.join(root, 'index.bin')
+
+        self.manifest_path = os.path.join(root, 'manifest.json')
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            self.codec = manifest['codec']
+            if manifest.get('index_version', 1) < self.INDEX_VERSION:
+                self._upgrade_index(manifest)
+        else:
+            self.codec = codec or ('zstd' if zstandard else 'gzip')
+            self._write_manifest({'codec': self.codec, 'created_at': time.time(), 'index_version': self.INDEX_VERSION})
+        if self.codec == 'zstd' and zstandard is None:
+            raise ImportError("zstd 归档需要安装 zstandard")
+        self.level = level if level is not None else (10 if self.codec == 'zstd' else 6)
+
+        self._lock = threading.Lock()
+        self._maps = {}
+        self._index = {}
+        self._load_index()
+        self._segment = max([entry[1] for entries in self._index.values() for entry in entries] or [1])
+
+    def _segment_path(self, segment: int) -> str:
+        """分段文件路径"""
+        return os.path.join(self.root, f'segment-{segment:06d}.dat')
+
+    def _write_manifest(self, manifest: dict):
+        """写入元数据文件"""
+        temp_path = self.manifest_path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f)
+        os.replace(temp_path, self.manifest_path)
+
+    def _upgrade_index(self, manifest: dict):
+        """把版本1的索引转换为当前格式，旧记录的 pageSize 记为0（未知），筛选条件记为不筛选"""
+        if os.path.exists(self.index_path):
+            with open(self.index_path, 'rb') as f:
+                data = f.read()
+            data = data[:len(data) - len(data) % self.LEGACY_INDEX_RECORD.size]
+            temp_path = self.index_path + '.tmp'
+            with open(temp_path, 'wb') as f:
+                for kind, poi_id, page, *location in self.LEGACY_INDEX_RECORD.iter_unpack(data):
+                    f.write(self.INDEX_RECORD.pack(kind, poi_id, page, 0, 0, 0, *location))
+            os.replace(temp_path, self.index_path)
+            self.logger.info(f"归档索引已升级到版本 {self.INDEX_VERSION}")
+        self._write_manifest(dict(manifest, index_version=self.INDEX_VERSION))
+
+    def _load_index(self):
+        """加载索引，截掉崩溃时写了一半的末尾记录，并丢弃指向分段末尾之外的记录"""
+        if not os.path.exists(self.index_path):
+            return
+        segment_sizes = {}
+        with open(self.index_path, 'rb') as f:
+            data = f.read()
+        usable = len(data) - len(data) % self.INDEX_RECORD.size
+        if usable < len(data):
+            # 不截断的话，之后追加的记录会与记录边界错位
+            self.logger.warning(f"索引文件末尾有 {len(data) - usable} 字节不完整的记录，已截断")
+            with open(self.index_path, 'r+b') as f:
+                f.truncate(usable)
+        for record in self.INDEX_RECORD.iter_unpack(data[:usable]):
+            key, (fetched_at, segment, offset, length) = record[:6], record[6:]
+            if segment not in segment_sizes:
+                path = self._segment_path(segment)
+                segment_sizes[segment] = os.path.getsize(path) if os.path.exists(path) else 0
+            if offset + length > segment_sizes[segment]:
+                continue
+            self._index.setdefault(key, []).append((fetched_at, segment, offset, length))
+
+    def _compress(self, payload: bytes) -> bytes:
+        """压缩单条记录"""
+        if self.codec == 'zstd':
+            return zstandard.ZstdCompressor(level=self.level).compress(payload)
+        return zlib.compress(payload, self.level)
+
+    def _decompress(self, payload: bytes) -> bytes:
+        """解压单条记录"""
+        if self.codec == 'zstd':
+            return zstandard.ZstdDecompressor().decompress(payload)
+        return zlib.decompress(payload)
+
+    def append(self, kind: str, poi_id, page: int, payload: bytes, fetched_at: float = None, page_size: int = 0,
+               star_type: int = 0, tag_id: int = 0):
+        """追加一条原始响应
+
+        Args:
+            kind: 数据类型，见 KINDS
+            poi_id: 景点ID（数字）
+            page: 页码，详情数据为0
+            payload: 原始响应体
+            fetched_at: 抓取时间戳，默认为当前时间
+            page_size: 请求的每页数量，0表示未知或不适用
+            star_type: 星级筛选，0表示不筛选
+            tag_id: 评论标签筛选，0表示不筛选
+        """
+        fetched_at = fetched_at or time.time()
+        compressed = self._compress(payload)
+        key = (self.KINDS[kind], int(poi_id), int(page), int(page_size), int(star_type), int(tag_id))
+
+        with self._lock:
+            path = self._segment_path(self._segment)
+            if os.path.exists(path) and os.path.getsize(path) + len(compressed) > self.segment_max_bytes:
+                self._segment += 1
+                path = self._segment_path(self._segment)
+            with open(path, 'ab') as f:
+                offset = f.tell()
+                f.write(compressed)
+            # 先写数据再写索引，崩溃时最多丢失索引而不会产生悬空记录
+            with open(self.index_path, 'ab') as f:
+                f.write(self.INDEX_RECORD.pack(*key, fetched_at, self._segment, offset, len(compressed)))
+            self._index.setdefault(key, []).append((fetched_at, self._segment, offset, len(compressed)))
+
+    def _read_range(self, segment: int, offset: int, length: int) -> bytes:
+        """通过内存映射读取分段中的一段数据"""
+        with self._lock:
+            mapped = self._maps.get(segment)
+            if mapped is None or len(mapped) < offset + length:
+                if mapped is not None:
+                    mapped.close()
+                with open(self._segment_path(segment), 'rb') as f:
+                    mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                self._maps[segment] = mapped
+            return mapped[offset:offset + length]
+
+    def _entries(self, kind: str, poi_id, page: int, page_size: int = None, star_type: int = 0,
+                 tag_id: int = 0) -> list:
+        """某页的索引记录，page_size 为None时包括所有 pageSize"""
+        prefix = (self.KINDS[kind], int(poi_id), int(page))
+        if page_size is not None:
+            return list(self._index.get(prefix + (int(page_size), int(star_type), int(tag_id)), []))
+        return [entry for key, entries in list(self._index.items())
+                if key[:3] == prefix and key[4:] == (int(star_type), int(tag_id)) for entry in entries]
+
+    def versions(self, kind: str, poi_id, page: int, page_size: int = None, star_type: int = 0,
+                 tag_id: int = 0) -> list:
+        """列出某页的所有抓取时间
+
+        Returns:
+            list: 按时间升序排列的抓取时间戳，参数见 get
+        """
+        return sorted(entry[0] for entry in self._entries(kind, poi_id, page, page_size, star_type, tag_id))
+
+    def get(self, kind: str, poi_id, page: int, fetched_at: float = None, page_size: int = None,
+            star_type: int = 0, tag_id: int = 0):
+        """读取一条原始响应
+
+        Args:
+            kind: 数据类型
+            poi_id: 景点ID
+            page: 页码
+            fetched_at: 抓取时间戳，为None时返回最新一次抓取，否则返回不晚于该时间的最近一次抓取
+            page_size: 请求的每页数量，为None时不区分 pageSize
+            star_type: 星级筛选，0表示不筛选
+            tag_id: 评论标签筛选，0表示不筛选
+
+        Returns:
+            bytes: 原始响应体，不存在时返回None
+        """
+        entries = self._entries(kind, poi_id, page, page_size, star_type, tag_id)
+        if fetched_at is not None:
+            entries = [entry for entry in entries if entry[0] <= fetched_at]
+        if not entries:
+            return None
+        _, segment, offset, length = max(entries)
+        return self._decompress(self._read_range(segment, offset, length))
+
+    def get_json(self, kind: str, poi_id, page: int, fetched_at: float = None, page_size: int = None,
+                 star_type: int = 0, tag_id: int = 0):
+        """读取一条原始响应并解析为JSON，参数见 get
+
+        Returns:
+            dict: 响应数据，不存在时返回None
+        """
+        payload = self.get(kind, poi_id, page, fetched_at, page_size, star_type, tag_id)
+        return json.loads(payload) if payload is not None else None
+
+    def keys(self, kind: str = None):
+        """列出归档中的 (类型, 景点ID, 页码, pageSize, 星级筛选, 标签筛选)
+
+        Args:
+            kind: 只列出该类型的记录
+
+        Returns:
+            list: 排序后的键列表
+        """
+        names = {code: name for name, code in self.KINDS.items()}
+        return sorted((names[code],) + tuple(rest) for code, *rest in self._index
+                      if kind is None or names[code] == kind)
+
+    def stats(self) -> dict:
+        """归档统计信息
+
+        Returns:
+            dict: 记录数、压缩后字节数、索引字节数
+        """
+        records = sum(len(entries) for entries in self._index.values())
+        stored = sum(entry[3] for entries in self._index.values() for entry in entries)
+        index_bytes = os.path.getsize(self.index_path) if os.path.exists(self.index_path) else 0
+        return {'records': records, 'stored_bytes': stored, 'index_bytes': index_bytes, 'codec': self.codec}
+
+    def close(self):
+        """关闭所有内存映射"""
+        with self._lock:
+            for mapped in self._maps.values():
+                mapped.close()
+            self._maps = {}
@@ -0,0 +1,216 @@
+import argparse
+import json
+import math
+import os
+import threading
+import time
+from log import CtripSpiderLogger
+
+SECONDS_PER_DAY = 86400
+
+
+class RefreshScheduler:
+    """按活跃度安排景点评论刷新的调度器
+
+    每个景点维护 评论数、评分、新增评论速率（条/天）和上次爬取时间，按预计新增评论数排序，
+    在固定的单次请求预算内优先刷新评论变化最多的景点。新增评论速率来自历次景点列表中评论数的变化
+    和历次刷新实际新增的评论数，使用指数加权平均平滑；没有观测值时按评论总数估算。
+    """
+
+    def __init__(self, state_file: str, page_size: int = 10, max_pages_per_poi: int = 20,
+                 prior_window_days: float = 365.0, staleness_weight: float = 0.1, smoothing: float = 0.5,
+                 logger: CtripSpiderLogger = None):
+        """初始化调度器
+
+        Args:
+            state_file: 调度状态文件路径（JSON）
+            page_size: 评论接口每页数量，用于估算刷新需要的请求数
+            max_pages_per_poi: 单个景点一次刷新最多分配的页数
+            prior_window_days: 没有速率观测值时，假设评论总数在这么多天内均匀产生
+            staleness_weight: 距上次爬取每过一天增加的优先级，保证冷门景点也会被定期刷新
+            smoothing: 新增评论速率的指数加权平均系数，越大越偏向最近的观测值
+            logger: 日志记录器实例
+        """
+        self.state_file = state_file
+        self.page_size = page_size
+        self.max_pages_per_poi = max_pages_per_poi
+        self.prior_window_days = prior_window_days
+        self.staleness_weight = staleness_weight
+        self.smoothing = smoothing
+        self.logger = logger or CtripSpiderLogger("RefreshScheduler", "logs")
+        self._lock = threading.Lock()
+        self.pois = {}
+        if os.path.exists(state_file):
+            with open(state_file, 'r', encoding='utf-8') as f:
+                self.pois = json.load(f).get('pois', {})
+
+    def save(self):
+        """保存调度状态"""
+        with self._lock:
+            directory = os.path.dirname(self.state_file)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            temp_path = self.state_file + '.tmp'
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump({'pois': self.pois, 'saved_at': time.time()}, f, ensure_ascii=False, indent=2)
+            os.replace(temp_path, self.state_file)
+
+    def _update_rate(self, state: dict, rate: float):
+        """用新的速率观测值更新指数加权平均"""
+        if state.get('comments_per_day') is None:
+            state['comments_per_day'] = rate
+        else:
+            state['comments_per_day'] = self.smoothing * rate + (1 - self.smoothing) * state['comments_per_day']
+
+    def observe(self, attractions: list, observed_at: float = None):
+        """记录景点列表中的评论数和评分，评论数的变化用于估算新增评论速率
+
+        Args:
+            attractions: _parse_poi_basic_info 解析出的景点列表
+            observed_at: 观测时间戳，默认为当前时间
+        """
+        observed_at = observed_at or time.time()
+        with self._lock:
+            for attraction in attractions:
+                poi_id = str(attraction.get('poi_id') or '')
+                if not poi_id:
+                    continue
+                state = self.pois.setdefault(poi_id, {'last_crawled': None, 'comments_per_day': None})
+                review_count = int(attraction.get('review_count') or 0)
+                previous_count, previous_at = state.get('review_count'), state.get('observed_at')
+                if previous_count is not None and previous_at and observed_at > previous_at \
+                        and review_count >= previous_count:
+                    self._update_rate(state, (review_count - previous_count) * SECONDS_PER_DAY /
+                                      (observed_at - previous_at))
+                state.update({'name': attraction.get('name') or state.get('name') or poi_id,
+                              'review_count': review_count, 'rating': attraction.get('rating'),
+                              'observed_at': observed_at})
+
+    def record_crawl(self, poi_id, new_comments: int, crawled_at: float = None):
+        """记录一次刷新的结果
+
+        Args:
+            poi_id: 景点ID
+            new_comments: 本次新增的评论数
+            crawled_at: 爬取时间戳，默认为当前时间
+        """
+        crawled_at = crawled_at or time.time()
+        with self._lock:
+            state = self.pois.setdefault(str(poi_id), {'name': str(poi_id), 'comments_per_day': None})
+            last_crawled = state.get('last_crawled')
+            if last_crawled and crawled_at > last_crawled:
+                self._update_rate(state, new_comments * SECONDS_PER_DAY / (crawled_at - last_crawled))
+            state['last_crawled'] = crawled_at
+
+    def _comments_per_day(self, state: dict) -> float:
+        """新增评论速率，没有观测值时按评论总数估算"""
+        if state.get('comments_per_day') is not None:
+            return state['comments_per_day']
+        return (state.get('review_count') or 0) / self.prior_window_days
+
+    def expected_new_comments(self, poi_id, now: float = None) -> float:
+        """估算景点自上次爬取以来的新增评论数，从未爬取过的景点为其评论总数
+
+        Args:
+            poi_id: 景点ID
+            now: 当前时间戳
+
+        Returns:
+            float: 预计新增评论数
+        """
+        state = self.pois[str(poi_id)]
+        if not state.get('last_crawled'):
+            return float(max(state.get('review_count') or 0, 1))
+        days = max(0.0, ((now or time.time()) - state['last_crawled']) / SECONDS_PER_DAY)
+        return self._comments_per_day(state) * days
+
+    def priority(self, poi_id, now: float = None) -> float:
+        """计算景点的刷新优先级
+
+        Args:
+            poi_id: 景点ID
+            now: 当前时间戳
+
+        Returns:
+            float: 优先级，越大越先刷新
+        """
+        now = now or time.time()
+        state = self.pois[str(poi_id)]
+        last_crawled = state.get('last_crawled')
+        days = (now - last_crawled) / SECONDS_PER_DAY if last_crawled else self.prior_window_days
+        return self.expected_new_comments(poi_id, now) + self.staleness_weight * max(0.0, days)
+
+    def plan(self, budget: int, now: float = None) -> list:
+        """按优先级在请求预算内安排刷新任务
+
+        Args:
+            budget: 本次运行的请求预算（评论页数）
+            now: 当前时间戳
+
+        Returns:
+            list: [{'poi_id', 'name', 'priority', 'expected_new', 'max_pages'}]，按优先级降序
+        """
+        now = now or time.time()
+        ranked = sorted(((self.priority(poi_id, now), poi_id) for poi_id in self.pois), reverse=True)
+        plan, remaining = [], budget
+        for priority, poi_id in ranked:
+            if remaining <= 0:
+                break
+            expected_new = self.expected_new_comments(poi_id, now)
+            pages = min(self.max_pages_per_poi, max(1, math.ceil(expected_new / self.page_size)), remaining)
+            plan.append({'poi_id': poi_id, 'name': self.pois[poi_id].get('name') or poi_id, 'priority': priority,
+                         'expected_new': expected_new, 'max_pages': pages})
+            remaining -= pages
+        return plan
+
+    def run(self, spider, budget: int) -> dict:
+        """按计划刷新评论，实际消耗的请求数计入预算，运行结束后保存状态
+
+        Args:
+            spider: CtripCommentSpider 实例
+            budget: 本次运行的请求预算（实际发送的请求数）
+
+        Returns:
+            dict: {'requests': int, 'new_comments': int, 'refreshed': [景点ID]}
+        """
+        plan = self.plan(budget)
+        self.logger.info(f"刷新计划: 预算 {budget} 次请求，安排 {len(plan)} 个景点")
+        used, new_comments, refreshed = 0, 0, []
+        # 预算按实际发送的请求计算，首页探测、重试和重新排队都计入，超出预算的请求不会发出
+        with spider.retry_policy.request_budget(budget):
+            for task in plan:
+                pages = min(task['max_pages'], budget - used)
+                if pages <= 0:
+                    break
+                result = spider.refresh_poi(task['poi_id'], task['name'], pages)
+                used += result['requests']
+                new_comments += result['new_comments']
+                # 没有追上已保存评论的刷新不记为已爬取，保持优先级，下次从续爬位置继续
+                if result['success']:
+                    self.record_crawl(task['poi_id'], result['new_comments'])
+                    refreshed.append(task['poi_id'])
+                self.logger.log_detail(f"景点 {task['name']} 优先级 {task['priority']:.2f}，"
+                                       f"预计新增 {task['expected_new']:.1f} 条，实际新增 {result['new_comments']} 条，"
+                                       f"请求 {result['requests']} 次")
+        self.save()
+        self.logger.info(f"刷新完成: 消耗 {used}/{budget} 次请求，刷新 {len(refreshed)} 个景点，新增 {new_comments} 条评论")
+        return {'requests': used, 'new_comments': new_comments, 'refreshed': refreshed}
+
+
+# 使用示例：python refresh_scheduler.py --state ./Datasets/refresh_state.json --attractions attractions.json --budget 200
+if __name__ == "__main__":
+    from sight_comments import CtripCommentSpider
+
+    parser = argparse.ArgumentParser(description="按活跃度在请求预算内刷新景点评论")
+    parser.add_argument('--state', default='./Datasets/refresh_state.json', help="调度状态文件")
+    parser.add_argument('--attractions', help="景点列表JSON文件（save_to_json 的输出），用于更新评论数")
+    parser.add_argument('--budget', type=int, default=200, help="本次运行的请求预算（评论页数）")
+    parser.add_argument('--output', default='./Datasets', help="评论输出目录")
+    options = parser.parse_args()
+
+    logger = CtripSpiderLogger("RefreshSchedulerMain", "logs")
+    scheduler = RefreshScheduler(options.state, logger=logger)
+    if options.attractions:
+        with open(options.attractions, 'r', encoding='utf-8') as f:
+            scheduler.observe(json.load(f))
+    scheduler.run(CtripCommentSpider(options.output, logger=logger), options.budget)
@@ -0,0 +1,274 @@
+import base64
+import hashlib
+import json
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+import requests
+from requests.structures import CaseInsensitiveDict
+from log import CtripSpiderLogger
+
+
+class ReplayMissError(requests.ConnectionError):
+    """回放模式下找不到对应请求的录制记录"""
+
+    # 重试不会改变回放结果
+    retryable = False
+
+
+def request_key(url: str, body) -> str:
+    """计算请求的唯一键：接口路径 + 规范化后的请求体，与服务器地址无关
+
+    Args:
+        url: 请求地址
+        body: 请求体（dict 或 JSON 字符串）
+
+    Returns:
+        str: 请求键
+    """
+    if isinstance(body, (str, bytes)):
+        try:
+            body = json.loads(body)
+        except ValueError:
+            body = body.decode('utf-8', 'replace') if isinstance(body, bytes) else body
+    canonical = json.dumps(body, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha1(f"{urlsplit(url).path}\n{canonical}".encode('utf-8')).hexdigest()
+
+
+class RecordedResponse:
+    """录制的响应，提供与 requests.Response 相同的常用接口"""
+
+    def __init__(self, url: str, status_code: int, headers: dict, content: bytes):
+        """初始化录制的响应
+
+        Args:
+            url: 请求地址
+            status_code: HTTP状态码
+            headers: 响应头
+            content: 响应体
+        """
+        self.url = url
+        self.status_code = status_code
+        self.headers = CaseInsensitiveDict(headers)
+        self.content = content
+        self.encoding = 'utf-8'
+
+    @property
+    def text(self) -> str:
+        """响应文本"""
+        return self.content.decode(self.encoding, 'replace')
+
+    def json(self):
+        """解析JSON响应体"""
+        return json.loads(self.text)
+
+    def raise_for_status(self):
+        """状态码为4xx/5xx时抛出HTTPError"""
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} Error for url: {self.url}", response=self)
+
+
+class RecordingSession:
+    """录制会话：转发请求并将请求/响应对追加写入录制文件"""
+
+    def __init__(self, record_dir: str, session=None, logger: CtripSpiderLogger = None):
+        """初始化录制会话
+
+        Args:
+            record_dir: 录制文件目录
+            session: 实际发送请求的会话，默认为 requests 模块
+            logger: 日志记录器实例
+        """
+        self.record_dir = record_dir
+        os.makedirs(record_dir, exist_ok=True)
+        self.record_file = os.path.join(record_dir, 'responses.jsonl')
+        self.session = session or requests
+        self.logger = logger or CtripSpiderLogger("RecordingSession", "logs")
+        self.record_count = 0
+        self._lock = threading.Lock()
+
+    def post(self, url: str, data=None, json=None, **kwargs):
+        """发送POST请求并录制
+
+        Args:
+            url: 请求地址
+            data: 请求体字符串
+            json: 请求体对象
+
+        Returns:
+            requests.Response: 实际的响应
+        """
+        response = self.session.post(url, data=data, json=json, **kwargs)
+        self.record(url, json if json is not None else data, response.status_code, response.headers,
+                    response.content)
+        return response
+
+    def record(self, url: str, body, status_code: int, headers, content: bytes):
+        """写入一条录制记录
+
+        Args:
+            url: 请求地址
+            body: 请求体
+            status_code: HTTP状态码
+            headers: 响应头
+            content: 响应体
+        """
+        if isinstance(body, (str, bytes)):
+            try:
+                body = json.loads(body)
+            except ValueError:
+                body = body.decode('utf-8', 'replace') if isinstance(body, bytes) else body
+        try:
+            payload, encoding = content.decode('utf-8'), 'utf-8'
+        except UnicodeDecodeError:
+            payload, encoding = base64.b64encode(content).decode('ascii'), 'base64'
+
+        record = {
+            'key': request_key(url, body),
+            'url': url,
+            'request': body,
+            'status': status_code,
+            'headers': {name: value for name, value in headers.items()
+                        if name.lower() in ('content-type', 'retry-after')},
+            'encoding': encoding,
+            'body': payload,
+            'recorded_at': time.time(),
+        }
+        line = json.dumps(record, ensure_ascii=False) + '\n'
+        with self._lock:
+            with open(self.record_file, 'a', encoding='utf-8') as f:
+                f.write(line)
+            self.record_count += 1
+
+
+class ReplaySession:
+    """回放会话：从录制文件中返回请求对应的响应，不访问网络"""
+
+    def __init__(self, record_dir: str, logger: CtripSpiderLogger = None):
+        """初始化回放会话，建立请求键到文件偏移的索引
+
+        Args:
+            record_dir: 录制文件目录
+            logger: 日志记录器实例
+        """
+        self.record_file = os.path.join(record_dir, 'responses.jsonl')
+        self.logger = logger or CtripSpiderLogger("ReplaySession", "logs")
+        self.hit_count = 0
+        self.miss_count = 0
+        self._lock = threading.Lock()
+        self._index = {}
+
+        # 同一请求录制多次时以最后一次为准
+        with open(self.record_file, 'rb') as f:
+            offset = 0
+            for line in f:
+                if line.strip():
+                    self._index[json.loads(line)['key']] = offset
+                offset += len(line)
+        self.logger.info(f"回放索引已加载: {len(self._index)} 个请求，文件: {self.record_file}")
+
+    def post(self, url: str, data=None, json=None, **kwargs):
+        """返回录制的响应
+
+        Args:
+            url: 请求地址
+            data: 请求体字符串
+            json: 请求体对象
+
+        Returns:
+            RecordedResponse: 录制的响应
+
+        Raises:
+            ReplayMissError: 没有对应的录制记录
+        """
+        key = request_key(url, json if json is not None else data)
+        offset = self._index.get(key)
+        if offset is None:
+            with self._lock:
+                self.miss_count += 1
+            raise ReplayMissError(f"没有录制记录: {url}")
+
+        with open(self.record_file, 'rb') as f:
+            f.seek(offset)
+            record = _load_record(f.readline())
+        with self._lock:
+            self.hit_count += 1
+        return _to_response(record)
+
+    def __len__(self):
+        return len(self._index)
+
+
+def _load_record(line: bytes) -> dict:
+    """解析一行录制记录（post 方法的 json 参数会遮蔽 json 模块）"""
+    return json.loads(line)
+
+
+def _to_response(record: dict) -> RecordedResponse:
+    """将录制记录转换为响应对象"""
+    if record.get('encoding') == 'base64':
+        content = base64.b64decode(record['body'])
+    else:
+        content = record['body'].encode('utf-8')
+    return RecordedResponse(record['url'], record['status'], record.get('headers', {}), content)
+
+
+def iter_records(record_dir: str, path_suffix: str = None):
+    """遍历录制记录
+
+    Args:
+        record_dir: 录制文件目录
+        path_suffix: 只返回接口路径以此结尾的记录，如 'getCommentCollapseList'
+
+    Yields:
+        tuple: (录制记录, 响应对象)
+    """
+    with open(os.path.join(record_dir, 'responses.jsonl'), 'rb') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = _load_record(line)
+            if path_suffix and not urlsplit(record['url']).path.endswith(path_suffix):
+                continue
+            yield record, _to_response(record)
+
+
+def reparse_comments(record_dir: str, output_dir: str, poi_names: dict = None, max_pages: int = 100,
+                     logger: CtripSpiderLogger = None) -> dict:
+    """从录制记录中回放评论接口，使用当前的解析逻辑重新生成评论CSV，不访问网络
+
+    Args:
+        record_dir: 录制文件目录
+        output_dir: 输出目录
+        poi_names: 景点ID到名称的映射，缺省时以景点ID作为名称
+        max_pages: 每个景点最大爬取页数
+        logger: 日志记录器实例
+
+    Returns:
+        dict: crawl_multiple_pois 的爬取结果
+    """
+    from sight_comments import CtripCommentSpider
+
+    logger = logger or CtripSpiderLogger("ReplaySession", "logs")
+    poi_ids = []
+    for record, _ in iter_records(record_dir, 'getCommentCollapseList'):
+        poi_id = str(record['request'].get('arg', {}).get('poiId', ''))
+        if poi_id and poi_id not in poi_ids:
+            poi_ids.append(poi_id)
+
+    poi_names = poi_names or {}
+    spider = CtripCommentSpider(output_dir, logger=logger, page_delay=0, poi_delay=0,
+                                session=ReplaySession(record_dir, logger))
+    return spider.crawl_multiple_pois([[poi_id, poi_names.get(poi_id, poi_id)] for poi_id in poi_ids],
+                                      max_pages=max_pages)
+
+
+# 使用示例：python replay.py ./recordings ./Datasets_reparsed
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) != 3:
+        print("用法: python replay.py <录制目录> <输出目录>")
+        sys.exit(1)
+    reparse_comments(sys.argv[1], sys.argv[2])
@@ -0,0 +1,251 @@
+import random
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from circuit_breaker import OPEN, CircuitBreakerRegistry, CircuitOpenError
+from log import CtripSpiderLogger
+
+
+class RequestBudgetExhausted(Exception):
+    """请求预算已用完，不再发送请求"""
+    retryable = False
+
+
+class CircuitOutcome:
+    """熔断器保护的一次请求的结果"""
+
+    def __init__(self):
+        self.failed = False
+        self.skipped = False
+
+    def fail(self):
+        """标记请求失败（状态码错误、响应无法解析或接口返回错误）"""
+        self.failed = True
+
+    def skip(self):
+        """标记请求没有发送完成（如请求预算用完），不计入接口的成功或失败"""
+        self.skipped = True
+
+
+class RetryPolicy:
+    """请求重试策略：区分可重试错误，指数退避加随机抖动，支持 Retry-After 和单次请求的总时限"""
+
+    # 可重试的HTTP状态码
+    RETRYABLE_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+    def __init__(self, max_attempts: int = 4, base_delay: float = 1.0, max_delay: float = 30.0,
+                 deadline: float = 120.0, jitter: bool = True, retryable_statuses=None,
+                 logger: CtripSpiderLogger = None, sleep=time.sleep,
+                 circuit_breakers: CircuitBreakerRegistry = None):
+        """初始化重试策略
+
+        Args:
+            max_attempts: 最大尝试次数（含首次请求）
+            base_delay: 退避基础延迟（秒）
+            max_delay: 单次退避的最大延迟（秒）
+            deadline: 单个请求包括所有重试在内的总时限（秒）
+            jitter: 是否使用随机抖动（full jitter）
+            retryable_statuses: 可重试的HTTP状态码集合，默认为 RETRYABLE_STATUSES
+            logger: 日志记录器实例
+            sleep: 等待函数，便于测试替换
+            circuit_breakers: 按接口划分的熔断器注册表，多个爬虫传入同一个注册表时共享熔断状态，为None时不熔断
+        """
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+        self.jitter = jitter
+        self.retryable_statuses = frozenset(retryable_statuses or self.RETRYABLE_STATUSES)
+        self.logger = logger or CtripSpiderLogger("RetryPolicy", "logs")
+        self.sleep = sleep
+        self.circuit_breakers = circuit_breakers
+        self.retry_count = 0
+        # 实际发送的请求次数（含重试），以及允许达到的上限，为None时不限制
+        self.attempt_count = 0
+        self.max_total_attempts = None
+        self._count_lock = threading.Lock()
+
+    def remaining_attempts(self):
+        """剩余的请求预算
+
+        Returns:
+            int: 剩余可发送的请求次数，没有预算限制时返回None
+        """
+        with self._count_lock:
+            if self.max_total_attempts is None:
+                return None
+            return max(0, self.max_total_attempts - self.attempt_count)
+
+    @contextmanager
+    def request_budget(self, attempts: int):
+        """在代码块内限制实际发送的请求次数（含探测、重试和重新排队），可嵌套，取更严格的限制
+
+        Args:
+            attempts: 代码块内最多发送的请求次数
+        """
+        with self._count_lock:
+            previous = self.max_total_attempts
+            limit = self.attempt_count + max(0, attempts)
+            self.max_total_attempts = limit if previous is None else min(previous, limit)
+        try:
+            yield self
+        finally:
+            with self._count_lock:
+                self.max_total_attempts = previous
+
+    @contextmanager
+    def circuit(self, url: str):
+        """用接口的熔断器保护一次完整的请求（含重试和解析）
+
+        代码块内抛出异常或调用 outcome.fail() 记为失败，否则记为成功；请求预算用完、熔断等重试策略自身的
+        控制流异常以及调用 outcome.skip() 不计入接口的成功或失败。没有配置熔断器时不做任何处理。
+
+        Args:
+            url: 请求地址
+
+        Yields:
+            CircuitOutcome: 请求结果，接口返回错误数据时调用 fail()
+
+        Raises:
+            CircuitOpenError: 接口处于熔断状态，请求未发送
+        """
+        outcome = CircuitOutcome()
+        if self.circuit_breakers is None:
+            yield outcome
+            return
+        breaker = self.circuit_breakers.for_url(url)
+        breaker.before_call()
+        try:
+            yield outcome
+        except (RequestBudgetExhausted, CircuitOpenError):
+            breaker.release()
+            raise
+        except Exception:
+            breaker.record_failure()
+            raise
+        if outcome.skipped:
+            breaker.release()
+        elif outcome.failed:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+
+    def _circuit_open(self, url: str) -> bool:
+        """接口是否已经熔断，熔断后不再重试"""
+        return self.circuit_breakers is not None and self.circuit_breakers.for_url(url).state == OPEN
+
+    def is_retryable_exception(self, error: Exception) -> bool:
+        """判断异常是否可重试
+
+        Args:
+            error: 请求异常
+
+        Returns:
+            bool: 是否可重试
+        """
+        if getattr(error, 'retryable', True) is False:
+            return False
+        # 可重试的异常类型：超时、连接失败和连接重置；requests 在出错时才导入
+        import requests
+        return isinstance(error, (requests.Timeout, requests.ConnectionError, ConnectionResetError))
+
+    def is_retryable_response(self, response) -> bool:
+        """判断响应是否可重试
+
+        Args:
+            response: HTTP响应
+
+        Returns:
+            bool: 是否可重试
+        """
+        return response.status_code in self.retryable_statuses
+
+    def backoff(self, attempt: int) -> float:
+        """计算第 attempt 次失败后的退避时间
+
+        Args:
+            attempt: 已失败的次数（从1开始）
+
+        Returns:
+            float: 退避时间（秒）
+        """
+        delay = min(self.max_delay, self.base_delay * (2 ** (attempt - 1)))
+        return random.uniform(0, delay) if self.jitter else delay
+
+    @staticmethod
+    def parse_retry_after(response):
+        """解析 Retry-After 响应头，支持秒数和HTTP日期两种格式
+
+        Args:
+            response: HTTP响应
+
+        Returns:
+            float: 需要等待的秒数，没有或无法解析时返回None
+        """
+        value = response.headers.get('Retry-After') if response is not None else None
+        if not value:
+            return None
+        value = value.strip()
+        if value.isdigit():
+            return float(value)
+        try:
+            retry_at = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if retry_at.tzinfo is None:
+            retry_at = retry_at.replace(tzinfo=timezone.utc)
+        return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+    def call(self, send, description: str = "request"):
+        """按重试策略发送请求
+
+        Args:
+            send: 无参函数，发送一次请求并返回响应
+            description: 请求描述（通常是URL），用于日志
+
+        Returns:
+            最后一次请求的响应；不可重试的状态码或重试耗尽时原样返回，由调用方处理
+
+        Raises:
+            Exception: 不可重试的异常，或重试耗尽后的最后一个异常
+        """
+        start_time = time.monotonic()
+        attempt = 0
+        while True:
+            attempt += 1
+            response = None
+            with self._count_lock:
+                if self.max_total_attempts is not None and self.attempt_count >= self.max_total_attempts:
+                    raise RequestBudgetExhausted(f"{description} 请求预算已用完（{self.max_total_attempts} 次）")
+                self.attempt_count += 1
+            try:
+                response = send()
+            except Exception as e:
+                if not self.is_retryable_exception(e):
+                    raise
+                delay = self.backoff(attempt)
+                reason = f"{type(e).__name__}: {e}"
+                if not self._should_retry(attempt, start_time, delay) or self._circuit_open(description):
+                    raise
+            else:
+                if not self.is_retryable_response(response):
+                    return response
+                delay = self.backoff(attempt)
+                retry_after = self.parse_retry_after(response)
+                if retry_after is not None:
+                    delay = max(delay, retry_after)
+                reason = f"状态码 {response.status_code}"
+                if not self._should_retry(attempt, start_time, delay) or self._circuit_open(description):
+                    return response
+
+            self.retry_count += 1
+            self.logger.warning(f"{description} 请求失败（{reason}），{delay:.2f}秒后进行第 {attempt} 次重试")
+            self.sleep(delay)
+
+    def _should_retry(self, attempt: int, start_time: float, delay: float) -> bool:
+        """判断是否还有重试次数且等待后不会超过总时限"""
+        if attempt >= self.max_attempts or self.remaining_attempts() == 0:
+            return False
+        return time.monotonic() - start_time + delay <= self.deadline
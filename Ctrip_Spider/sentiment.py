@@ -0,0 +1,414 @@
+import argparse
+import csv
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from compressed_io import list_comment_files, open_input
+from log import CtripSpiderLogger
+
+try:
+    from sklearn.feature_extraction.text import HashingVectorizer
+    from sklearn.linear_model import LogisticRegression
+except ImportError:
+    HashingVectorizer = LogisticRegression = None
+
+# 情感倾向阈值：得分高于 POSITIVE_THRESHOLD 为正面，低于 NEGATIVE_THRESHOLD 为负面
+POSITIVE_THRESHOLD = 0.2
+NEGATIVE_THRESHOLD = -0.2
+
+
+def sentiment_label(score: float) -> str:
+    """根据情感得分判断情感倾向
+
+    Args:
+        score: 情感得分（-1~1）
+
+    Returns:
+        str: 'positive'、'neutral' 或 'negative'
+    """
+    if score > POSITIVE_THRESHOLD:
+        return 'positive'
+    if score < NEGATIVE_THRESHOLD:
+        return 'negative'
+    return 'neutral'
+
+
+class LexiconSentimentModel:
+    """基于情感词典的评论情感模型，不依赖网络和GPU
+
+    逐条扫描评论中的正面/负面词语，词前出现否定词时反转极性，出现程度副词时加权，
+    得分为 (正面权重 - 负面权重) / (正面权重 + 负面权重)，没有情感词时为0。
+    """
+
+    name = 'lexicon-v1'
+
+    POSITIVE_WORDS = (
+        '好', '不错', '很好', '满意', '喜欢', '推荐', '值得', '漂亮', '美丽', '壮观', '震撼', '干净', '方便',
+        '热情', '周到', '专业', '划算', '实惠', '便宜', '舒服', '舒适', '开心', '愉快', '惊喜', '精彩', '好玩',
+        '有趣', '美', '棒', '赞', '优美', '清新', '宜人', '感动', '难忘', '享受', '安静', '整洁', '耐心',
+        '友好', '给力', '超值', '完美', '优秀', '快', '顺利', '秩序', '值', '必去', '好看', '惬意', '贴心',
+    )
+    NEGATIVE_WORDS = (
+        '差', '失望', '坑', '贵', '脏', '乱', '挤', '拥挤', '排队', '难吃', '无聊', '垃圾', '后悔', '糟糕',
+        '不值', '骗', '宰', '态度差', '冷漠', '慢', '麻烦', '吵', '破', '旧', '臭', '坑人', '不好', '一般',
+        '敷衍', '混乱', '暴晒', '投诉', '黑心', '难找', '无语', '恶心', '不满', '遗憾', '累', '堵',
+    )
+    NEGATIONS = ('不', '没', '没有', '无', '非', '别', '未', '不太', '不是')
+    DEGREE_WORDS = {'非常': 2.0, '特别': 2.0, '超级': 2.0, '极其': 2.5, '太': 1.8, '很': 1.5, '挺': 1.3,
+                    '真': 1.5, '十分': 1.8, '比较': 1.2, '有点': 0.8, '稍微': 0.6, '略': 0.6}
+
+    def __init__(self):
+        """初始化词典"""
+        self.polarity = {word: 1.0 for word in self.POSITIVE_WORDS}
+        self.polarity.update({word: -1.0 for word in self.NEGATIVE_WORDS})
+        self.max_word_length = max(len(word) for word in self.polarity)
+
+    def score(self, text: str) -> float:
+        """计算单条评论的情感得分
+
+        Args:
+            text: 评论内容
+
+        Returns:
+            float: 情感得分（-1~1）
+        """
+        positive, negative = 0.0, 0.0
+        i = 0
+        while i < len(text):
+            # 正向最大匹配情感词
+            for length in range(min(self.max_word_length, len(text) - i), 0, -1):
+                word = text[i:i + length]
+                if word in self.polarity:
+                    break
+            else:
+                i += 1
+                continue
+
+            weight = self.polarity[word]
+            window = text[max(0, i - 4):i]
+            for degree, factor in self.DEGREE_WORDS.items():
+                if window.endswith(degree) or window[:-1].endswith(degree):
+                    weight *= factor
+                    break
+            # 程度副词中的字（如“非常”的“非”）不算否定词
+            plain = window
+            for degree in self.DEGREE_WORDS:
+                plain = plain.replace(degree, '')
+            if any(negation in plain[-3:] for negation in self.NEGATIONS):
+                weight = -weight * 0.8
+            if weight > 0:
+                positive += weight
+            else:
+                negative -= weight
+            i += length
+
+        if positive + negative == 0:
+            return 0.0
+        return (positive - negative) / (positive + negative)
+
+    def score_batch(self, texts: list) -> list:
+        """批量计算情感得分
+
+        Args:
+            texts: 评论内容列表
+
+        Returns:
+            list: 情感得分列表
+        """
+        return [self.score(text) for text in texts]
+
+
+class RatingSentimentModel:
+    """以评论星级为弱标注训练的 scikit-learn 情感模型（字符 n-gram 哈希特征 + 逻辑回归）
+
+    4星及以上视为正面、2星及以下视为负面，不需要人工标注；批量打分时整批向量化后一次预测。
+    """
+
+    name = 'rating-lr-v1'
+
+    def __init__(self, n_features: int = 2 ** 18):
+        """初始化模型
+
+        Args:
+            n_features: 哈希特征维数
+        """
+        if LogisticRegression is None:
+            raise ImportError("RatingSentimentModel 需要安装 scikit-learn")
+        self.vectorizer = HashingVectorizer(analyzer='char', ngram_range=(1, 2), n_features=n_features,
+                                            alternate_sign=False)
+        self.classifier = LogisticRegression(max_iter=1000)
+
+    def fit(self, texts: list, ratings: list):
+        """用评论星级训练模型，3星评论不参与训练
+
+        Args:
+            texts: 评论内容列表
+            ratings: 对应的总体评分列表
+
+        Returns:
+            RatingSentimentModel: 模型自身
+        """
+        samples = [(text, 1 if rating >= 4 else 0) for text, rating in zip(texts, ratings)
+                   if rating is not None and rating != 3]
+        if len({label for _, label in samples}) < 2:
+            raise ValueError("训练数据需要同时包含正面和负面评论")
+        self.classifier.fit(self.vectorizer.transform([text for text, _ in samples]),
+                            [label for _, label in samples])
+        return self
+
+    def score_batch(self, texts: list) -> list:
+        """批量计算情感得分
+
+        Args:
+            texts: 评论内容列表
+
+        Returns:
+            list: 情感得分列表，为正面概率映射到 -1~1
+        """
+        probabilities = self.classifier.predict_proba(self.vectorizer.transform(texts))[:, 1]
+        return [float(probability) * 2 - 1 for probability in probabilities]
+
+
+# 工作进程内的情感模型
+_worker_model = None
+
+
+def _init_worker(model):
+    """工作进程初始化：每个进程只接收一次模型"""
+    global _worker_model
+    _worker_model = model
+
+
+def _score_in_worker(texts: list) -> list:
+    """在工作进程中批量打分"""
+    return _worker_model.score_batch(texts)
+
+
+def iter_comment_chunks(file_path: str, chunk_size: int = 2000):
+    """分块读取评论CSV文件，内存中只保留当前块
+
+    Args:
+        file_path: 评论CSV文件路径（CtripCommentSpider 的输出，可以是压缩文件）
+        chunk_size: 每块的评论数
+
+    Yields:
+        list: [{'poi_id', 'poi_name', 'comment_id', 'rating', 'content'}]
+    """
+    with open_input(file_path, encoding='utf-8-sig', newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if not header:
+            return
+        columns = {name: header.index(name) for name in ('景区ID', '景区名称', '评论ID', '总体评分', '评论内容')}
+        chunk = []
+        for row in reader:
+            if len(row) < len(header):
+                continue
+            try:
+                rating = float(row[columns['总体评分']])
+            except ValueError:
+                rating = None
+            chunk.append({'poi_id': row[columns['景区ID']], 'poi_name': row[columns['景区名称']],
+                          'comment_id': row[columns['评论ID']], 'rating': rating,
+                          'content': row[columns['评论内容']]})
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+
+class SentimentAnalyzer:
+    """评论情感分析：流式分块读取爬取结果，按批量打分，得分按 commentId+内容哈希 缓存，重复运行只对新评论打分
+
+    输出:
+        sentiment_scores.csv     每条评论的情感得分和倾向
+        sentiment_summary.json   每个景点的情感汇总
+    """
+
+    def __init__(self, cache_file: str, model=None, max_workers: int = 0, chunk_size: int = 2000,
+                 batch_size: int = 500, logger: CtripSpiderLogger = None):
+        """初始化情感分析器
+
+        Args:
+            cache_file: 得分缓存文件（JSON Lines），不同模型的得分分别缓存
+            model: 情感模型，需提供 name 属性和 score_batch(texts) 方法，默认为 LexiconSentimentModel
+            max_workers: 打分进程数，0或1时在当前进程中打分
+            chunk_size: 每次从CSV读取的评论数
+            batch_size: 每批送入模型（或工作进程）的评论数
+            logger: 日志记录器实例
+        """
+        self.cache_file = cache_file
+        self.model = model or LexiconSentimentModel()
+        self.max_workers = max_workers
+        self.chunk_size = chunk_size
+        self.batch_size = batch_size
+        self.logger = logger or CtripSpiderLogger("SentimentAnalyzer", "logs")
+        self.cache = self._load_cache()
+
+    @staticmethod
+    def cache_key(comment_id: str, content: str) -> str:
+        """计算缓存键：评论被修改后内容哈希变化，会重新打分
+
+        Args:
+            comment_id: 评论ID
+            content: 评论内容
+
+        Returns:
+            str: 缓存键
+        """
+        digest = hashlib.sha1(content.encode('utf-8')).hexdigest()[:16]
+        return f"{comment_id}:{digest}"
+
+    def _load_cache(self) -> dict:
+        """加载当前模型的得分缓存"""
+        cache = {}
+        if not os.path.exists(self.cache_file):
+            return cache
+        with open(self.cache_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if record.get('model') == self.model.name:
+                    cache[record['key']] = record['score']
+        return cache
+
+    def analyze(self, csv_files: list, output_dir: str) -> dict:
+        """对评论CSV文件打分，输出每条评论的得分和每个景点的汇总
+
+        Args:
+            csv_files: 评论CSV文件路径列表
+            output_dir: 输出目录
+
+        Returns:
+            dict: {景点ID: 汇总}，汇总包含 poi_name、count、mean_score、positive、neutral、negative、
+                  positive_ratio、mean_rating
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        start_time = time.time()
+        summary = {}
+        stats = {'comments': 0, 'scored': 0}
+        pool = None
+        if self.max_workers and self.max_workers > 1:
+            pool = ProcessPoolExecutor(self.max_workers, initializer=_init_worker, initargs=(self.model,))
+        scores_path = os.path.join(output_dir, 'sentiment_scores.csv')
+        try:
+            with open(scores_path, 'w', newline='', encoding='utf-8-sig') as out, \
+                    open(self.cache_file, 'a', encoding='utf-8') as cache_out:
+                writer = csv.writer(out)
+                writer.writerow(['景区ID', '评论ID', '总体评分', '情感得分', '情感倾向'])
+                for file_path in csv_files:
+                    for chunk in iter_comment_chunks(file_path, self.chunk_size):
+                        scores = self._score_chunk(chunk, pool, cache_out, stats)
+                        for comment, score in zip(chunk, scores):
+                            label = sentiment_label(score)
+                            writer.writerow([comment['poi_id'], comment['comment_id'], comment['rating'],
+                                             round(score, 4), label])
+                            self._aggregate(summary, comment, score, label)
+                        stats['comments'] += len(chunk)
+                        self.logger.log_data_extraction(len(chunk), "sentiment_scores")
+        finally:
+            if pool:
+                pool.shutdown()
+
+        for item in summary.values():
+            count = item['count']
+            item['mean_score'] = round(item.pop('score_sum') / count, 4)
+            item['positive_ratio'] = round(item['positive'] / count, 4)
+            rated = item.pop('rated')
+            item['mean_rating'] = round(item.pop('rating_sum') / rated, 2) if rated else None
+        with open(os.path.join(output_dir, 'sentiment_summary.json'), 'w', encoding='utf-8') as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+
+        self.logger.flush_summary()
+        self.logger.info(f"情感分析完成: {len(summary)} 个景点，{stats['comments']} 条评论，新打分 {stats['scored']} 条，"
+                         f"命中缓存 {stats['comments'] - stats['scored']} 条，耗时 {time.time() - start_time:.2f}秒")
+        return summary
+
+    def analyze_directory(self, comments_dir: str, output_dir: str = None) -> dict:
+        """对评论目录（含分区子目录）下的所有评论文件打分
+
+        Args:
+            comments_dir: 评论CSV目录
+            output_dir: 输出目录，默认为评论目录
+
+        Returns:
+            dict: 每个景点的情感汇总，见 analyze
+        """
+        return self.analyze(list_comment_files(comments_dir), output_dir or comments_dir)
+
+    def _score_chunk(self, chunk: list, pool, cache_out, stats: dict) -> list:
+        """对一块评论打分，缓存中已有的评论不再打分
+
+        Args:
+            chunk: 评论块
+            pool: 进程池，为None时在当前进程中打分
+            cache_out: 缓存文件对象（追加写入新得分）
+            stats: 统计信息
+
+        Returns:
+            list: 与评论块一一对应的得分
+        """
+        keys = [self.cache_key(comment['comment_id'], comment['content']) for comment in chunk]
+        missing = [i for i, key in enumerate(keys) if key not in self.cache]
+        if missing:
+            texts = [chunk[i]['content'] for i in missing]
+            batches = [texts[start:start + self.batch_size] for start in range(0, len(texts), self.batch_size)]
+            if pool:
+                results = pool.map(_score_in_worker, batches)
+            else:
+                results = map(self.model.score_batch, batches)
+            new_scores = [score for batch in results for score in batch]
+            for i, score in zip(missing, new_scores):
+                self.cache[keys[i]] = score
+                cache_out.write(json.dumps({'key': keys[i], 'model': self.model.name, 'score': score}) + '\n')
+            stats['scored'] += len(missing)
+        return [self.cache[key] for key in keys]
+
+    @staticmethod
+    def _aggregate(summary: dict, comment: dict, score: float, label: str):
+        """累加景点的情感汇总"""
+        item = summary.setdefault(comment['poi_id'], {
+            'poi_name': comment['poi_name'], 'count': 0, 'score_sum': 0.0,
+            'positive': 0, 'neutral': 0, 'negative': 0, 'rating_sum': 0.0, 'rated': 0,
+        })
+        item['count'] += 1
+        item['score_sum'] += score
+        item[label] += 1
+        if comment['rating'] is not None:
+            item['rating_sum'] += comment['rating']
+            item['rated'] += 1
+
+
+# 使用示例：python sentiment.py --comments ./Datasets/comments --workers 4
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="评论情感分析")
+    parser.add_argument('--comments', default='./Datasets', help="评论CSV目录")
+    parser.add_argument('--output', help="输出目录，默认为评论目录")
+    parser.add_argument('--cache', help="得分缓存文件，默认为输出目录下的 sentiment_cache.jsonl")
+    parser.add_argument('--model', choices=['lexicon', 'rating'], default='lexicon',
+                        help="情感模型：lexicon 情感词典，rating 以星级为标注训练的 scikit-learn 模型")
+    parser.add_argument('--workers', type=int, default=0, help="打分进程数")
+    parser.add_argument('--chunk-size', type=int, default=2000, help="每次读取的评论数")
+    options = parser.parse_args()
+
+    output_dir = options.output or options.comments
+    main_logger = CtripSpiderLogger("SentimentMain", "logs")
+    sentiment_model = None
+    if options.model == 'rating':
+        analyzer_files = list_comment_files(options.comments)
+        train_texts, train_ratings = [], []
+        for csv_file in analyzer_files:
+            for comment_chunk in iter_comment_chunks(csv_file, options.chunk_size):
+                train_texts.extend(comment['content'] for comment in comment_chunk)
+                train_ratings.extend(comment['rating'] for comment in comment_chunk)
+        sentiment_model = RatingSentimentModel().fit(train_texts, train_ratings)
+    analyzer = SentimentAnalyzer(options.cache or os.path.join(output_dir, 'sentiment_cache.jsonl'),
+                                 model=sentiment_model, max_workers=options.workers,
+                                 chunk_size=options.chunk_size, logger=main_logger)
+    result = analyzer.analyze_directory(options.comments, output_dir)
+    print(json.dumps(result, ensure_ascii=False, indent=2))
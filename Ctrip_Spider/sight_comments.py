@@ -1,25 +1,77 @@
-import requests
 import json
 import csv
 import time
 import os
 import re
+import math
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
+from circuit_breaker import CircuitOpenError
 from log import CtripSpiderLogger
+from profiler import StageTracer
+from retry import RequestBudgetExhausted, RetryPolicy
+from dead_letter import DeadLetterQueue
+from memory_budget import peak_rss_bytes
+from compressed_io import EXTENSIONS, open_input, open_output
 
 
 class CtripCommentSpider:
     """携程景点评论爬虫类，用于爬取携程网上的景点评论数据"""
 
-    def __init__(self, output_dir: str = './Datasets', logger: CtripSpiderLogger = None):
+    # 探测评论接口pageSize时依次尝试的候选值
+    PAGE_SIZE_CANDIDATES = (50, 30, 20, 10)
+    # 分片爬取时按星级筛选的starType取值
+    STAR_TYPES = (1, 2, 3, 4, 5)
+    # 评论CSV文件表头
+    CSV_HEADER = ['序号', '景区ID', '景区名称', '评论ID', '用户昵称',
+                  '总体评分', '评论内容', '发布时间', '有用数', '回复数',
+                  '出行类型', '用户所在地', '游玩时长', '图片数量', '图片链接列表',
+                  '景色评分', '趣味评分', '性价比评分', '推荐项目']
+
+    def __init__(self, output_dir: str = './Datasets', logger: CtripSpiderLogger = None,
+                 tracer: StageTracer = None, page_delay: float = 1, poi_delay: float = 2, session=None,
+                 archive=None, retry_policy: RetryPolicy = None, requeue_rounds: int = 2,
+                 dead_letter_file: str = None, page_size: int = None, parse_pool=None, aggregates=None,
+                 layout=None, compression: str = None, compression_level: int = None):
         """
         初始化爬虫
 
         Args:
             output_dir: 输出目录路径
             logger: 日志记录器实例
+            tracer: 阶段计时器实例
+            page_delay: 评论翻页间的延迟（秒）
+            poi_delay: 景点间的延迟（秒）
+            session: 发送请求的会话（如 requests.Session 或录制/回放会话），默认为 requests 模块
+            archive: 原始响应归档库（RawArchive），为None时不归档
+            retry_policy: 请求重试策略
+            requeue_rounds: 景点结束时失败页面重新排队重试的轮数
+            dead_letter_file: 死信文件路径，默认为输出目录下的 dead_letters.jsonl
+            page_size: 评论接口每页数量，为None时在第一个景点的首页请求中自动探测接口支持的最大值
+            parse_pool: 解码和解析评论页的进程池（ParsePool），为None时在当前线程解析
+            aggregates: 评分汇总库（RatingAggregateStore），每次写入评论后增量更新，为None时不汇总
+            layout: 分区数据集（DatasetLayout），评论文件按 省份/城市/爬取日期 分区存放，为None时存放在输出目录下
+            compression: 评论CSV的压缩算法 'gzip' 或 'zstd'，文件名相应加 .gz/.zst 扩展名，为None时不压缩
+            compression_level: 压缩级别，默认见 compressed_io.DEFAULT_LEVELS
         """
         self.output_dir = output_dir
+        self.page_delay = page_delay
+        self.poi_delay = poi_delay
+        if session is None:
+            # 延迟导入 requests，导入模块本身不加载网络库
+            import requests
+            session = requests
+        self.session = session
+        self.archive = archive
+        self.requeue_rounds = requeue_rounds
+        self.page_size = page_size
+        self.parse_pool = parse_pool
+        self.aggregates = aggregates
+        self.layout = layout
+        self.compression = compression
+        self.compression_level = compression_level
         # 创建输出目录
         os.makedirs(self.output_dir, exist_ok=True)
 
@@ -34,7 +86,44 @@ class CtripCommentSpider:
 
         # 初始化日志记录器
         self.logger = logger or CtripSpiderLogger("CtripCommentSpider", "logs")
+        self.retry_policy = retry_policy or RetryPolicy(logger=self.logger)
+        # 初始化阶段计时器
+        self.tracer = tracer or StageTracer(self.logger)
+        # 初始化死信文件
+        self.dead_letters = DeadLetterQueue(
+            dead_letter_file or os.path.join(self.output_dir, 'dead_letters.jsonl'), self.logger)
+        # 最近一次批量爬取的报告文件
+        self.report_file = None
     
+    def _csv_path(self, poi_id: str, poi_name: str) -> str:
+        """获取景点对应的CSV文件路径
+
+        Args:
+            poi_id: 景点ID
+            poi_name: 景点名称
+
+        Returns:
+            str: CSV文件路径
+        """
+        # 创建文件名，移除可能的不合法字符
+        safe_name = "".join(c for c in poi_name if c.isalnum() or c in (' ', '-', '_')).rstrip()
+        directory = self.layout.partition_dir(poi_id) if self.layout else self.output_dir
+        extension = EXTENSIONS[self.compression] if self.compression else ''
+        return os.path.join(directory, f'{poi_id}_{safe_name}.csv{extension}')
+
+    def _open_csv(self, file_path: str, mode: str):
+        """打开评论CSV文件用于写入，按 compression 设置流式压缩
+
+        Args:
+            file_path: CSV文件路径
+            mode: 'w' 覆盖写入，'a' 追加写入
+
+        Returns:
+            文本文件对象
+        """
+        return open_output(file_path, mode, self.compression, self.compression_level,
+                           encoding='utf-8-sig', newline='')
+
     def _init_csv_file(self, poi_id: str, poi_name: str):
         """初始化CSV文件，写入表头
 
@@ -45,19 +134,20 @@ class CtripCommentSpider:
         Returns:
             str: CSV文件路径，失败时返回None
         """
-        # 创建文件名，移除可能的不合法字符
-        safe_name = "".join(c for c in poi_name if c.isalnum() or c in (' ', '-', '_')).rstrip()
-        file_path = os.path.join(self.output_dir, f'{poi_id}_{safe_name}.csv')
+        file_path = self._csv_path(poi_id, poi_name)
 
         try:
-            with open(file_path, 'w', newline='', encoding='utf-8-sig') as f:
-                writer = csv.writer(f)
-                writer.writerow([
-                    '序号', '景区ID', '景区名称', '评论ID', '用户昵称', 
-                    '总体评分', '评论内容', '发布时间', '有用数', '回复数',
-                    '出行类型', '用户所在地', '游玩时长', '图片数量', '图片链接列表',
-                    '景色评分', '趣味评分', '性价比评分', '推荐项目'
-                ])
+            with self._open_csv(file_path, 'w') as f:
+                csv.writer(f).writerow(self.CSV_HEADER)
+            if self.layout:
+                # 其他分区中的旧文件和分段中的旧评论已被本次爬取代替
+                self.layout.retire_poi(poi_id, file_path)
+            if self.aggregates:
+                # CSV被重写，旧评论的汇总同时清除
+                self.aggregates.reset_poi(poi_id)
+            # 旧文件的失败页面和增量刷新的续爬位置已经没有意义
+            self.dead_letters.remove_poi(poi_id)
+            self._remove_refresh_cursor(file_path)
             self.logger.info(f"CSV文件已初始化: {file_path}")
             return file_path
         except Exception as e:
@@ -150,160 +240,724 @@ class CtripCommentSpider:
         Args:
             poi_id: 景点ID
             poi_name: 景点名称
-            max_pages: 最大爬取页数
+            max_pages: 最大爬取页数（按实际每页数量计）
+
+        Returns:
+            bool: 所有计划页面是否都爬取成功
+        """
+        return self.crawl_poi(poi_id, poi_name, max_pages)['success']
+
+    def crawl_poi(self, poi_id: str, poi_name: str, max_pages: int = 100) -> dict:
+        """爬取指定景点的评论，失败页面在景点结束时重新排队重试，仍然失败的写入死信文件
+
+        Args:
+            poi_id: 景点ID
+            poi_name: 景点名称
+            max_pages: 最大爬取页数（按实际每页数量计）
+
+        Returns:
+            dict: 爬取报告，结构如下：
+                {
+                    'success': bool,  # 所有计划页面是否都爬取成功
+                    'total_pages': int,  # 计划爬取页数
+                    'page_size': int,  # 每页评论数量
+                    'crawled_pages': int,  # 成功爬取页数
+                    'failed_pages': list,  # 最终失败的页码，[0] 表示整个景点失败
+                    'truncated': bool,  # 是否在计划页数之前遇到空页（超出接口可翻页深度）而提前停止
+                    'comment_count': int,  # 获取的评论数
+                    'completeness': float,  # 完整度（0~1），提前停止时按计划页数计算
+                    'file_path': str  # CSV文件路径
+                }
+        """
+        report = self._crawl_poi(poi_id, poi_name, max_pages)
+        for page in report['failed_pages']:
+            self.dead_letters.add(poi_id, poi_name, page, "重试和重新排队后仍然失败", report['page_size'])
+        return report
+
+    def refresh_poi(self, poi_id: str, poi_name: str, max_pages: int = 10) -> dict:
+        """增量刷新已爬取过的景点：评论按发布时间倒序返回，从首页开始追加未保存过的评论，
+        遇到含有已保存评论的页面或不满一页时停止；没有爬取过的景点按 crawl_poi 完整爬取
+
+        因页数或请求预算用完而提前停止时，新评论与已保存评论之间还有没爬到的页面，刷新记为未完成，
+        并在CSV文件旁保存续爬位置（见 _refresh_existing），下次刷新从该位置继续。
+
+        Args:
+            poi_id: 景点ID
+            poi_name: 景点名称
+            max_pages: 本次刷新最多发送的请求数，首页探测、重试和重新排队都计入
+
+        Returns:
+            dict: 刷新报告 {'success': bool, 'new_comments': int, 'requests': int, 'file_path': str}，
+                  success 表示已经追上已保存的评论，requests 为实际发送的请求数
+        """
+        attempts_before = self.retry_policy.attempt_count
+        with self.retry_policy.request_budget(max_pages):
+            file_path = self._csv_path(poi_id, poi_name)
+            if not os.path.exists(file_path):
+                report = self.crawl_poi(poi_id, poi_name, max_pages)
+                return {'success': report['success'], 'new_comments': report['comment_count'],
+                        'requests': self.retry_policy.attempt_count - attempts_before,
+                        'file_path': report['file_path']}
+            success, new_comments = self._refresh_existing(poi_id, poi_name, file_path, max_pages)
+        requests_used = self.retry_policy.attempt_count - attempts_before
+        self.logger.info(f"景点 {poi_name} 增量刷新完成，请求 {requests_used} 次，新增 {new_comments} 条评论")
+        return {'success': success, 'new_comments': new_comments, 'requests': requests_used, 'file_path': file_path}
+
+    def _refresh_existing(self, poi_id: str, poi_name: str, file_path: str, max_pages: int):
+        """追加已爬取景点中未保存过的评论，直到追上刷新开始前已保存的评论
+
+        续爬位置 {'page', 'page_size', 'known_rows'} 保存在 <CSV文件>.refresh.json：known_rows 是第一次
+        未完成的刷新开始前CSV中的评论数，这些评论（文件只追加，即前 known_rows 行）是要追上的目标。
+        续爬时从上次停止的页面继续，之间新发布的评论只会把内容往后推，不会跳过；续爬期间页面中
+        上次刷新保存的评论只去重、不作为停止条件。
+
+        Args:
+            poi_id: 景点ID
+            poi_name: 景点名称
+            file_path: CSV文件路径
+            max_pages: 最多请求的页数
 
         Returns:
-            bool: 爬取是否成功
+            tuple: (是否已追上已保存的评论, 新增评论数)
+        """
+        saved_ids = self._get_saved_comment_ids(file_path)
+        dedupe = {'seen': saved_ids, 'index': self._get_current_index(file_path),
+                  'duplicates': 0, 'lock': threading.Lock()}
+        start_index = dedupe['index']
+        cursor = self._load_refresh_cursor(file_path)
+        if cursor:
+            known_ids = self._get_saved_comment_ids(file_path, cursor['known_rows'])
+            page, page_size, known_rows = cursor['page'], cursor['page_size'], cursor['known_rows']
+            self.logger.info(f"景点 {poi_name} 从上次未完成的刷新继续，第 {page} 页起")
+        else:
+            known_ids = set(saved_ids)
+            page, page_size, known_rows = 1, self.page_size or self.PAGE_SIZE_CANDIDATES[-1], start_index
+
+        for _ in range(max_pages):
+            if self.retry_policy.remaining_attempts() == 0:
+                self.logger.info(f"景点 {poi_name} 请求预算已用完，停止刷新")
+                break
+            if page > 1:
+                time.sleep(self.page_delay)
+            comments = self._get_page_comments(poi_id, page, page_size)
+            if comments is None:
+                break
+            self._save_unique_comments(comments, poi_id, poi_name, file_path, dedupe)
+            if len(comments) < page_size or any(str(comment['commentId']) in known_ids for comment in comments):
+                self._remove_refresh_cursor(file_path)
+                return True, dedupe['index'] - start_index
+            page += 1
+
+        # 没有追上已保存的评论，记录下次继续的位置
+        self._save_refresh_cursor(file_path, {'page': page, 'page_size': page_size, 'known_rows': known_rows})
+        self.logger.warning(f"景点 {poi_name} 刷新未完成，下次从第 {page} 页继续")
+        return False, dedupe['index'] - start_index
+
+    @staticmethod
+    def _refresh_cursor_path(file_path: str) -> str:
+        """增量刷新续爬位置文件的路径"""
+        return file_path + '.refresh.json'
+
+    def _load_refresh_cursor(self, file_path: str):
+        """读取增量刷新的续爬位置
+
+        Returns:
+            dict: {'page', 'page_size', 'known_rows'}，没有未完成的刷新时返回None
+        """
+        try:
+            with open(self._refresh_cursor_path(file_path), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _save_refresh_cursor(self, file_path: str, cursor: dict):
+        """保存增量刷新的续爬位置"""
+        temp_path = self._refresh_cursor_path(file_path) + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(cursor, f)
+        os.replace(temp_path, self._refresh_cursor_path(file_path))
+
+    def _remove_refresh_cursor(self, file_path: str):
+        """删除增量刷新的续爬位置"""
+        if os.path.exists(self._refresh_cursor_path(file_path)):
+            os.remove(self._refresh_cursor_path(file_path))
+
+    def _crawl_poi(self, poi_id: str, poi_name: str, max_pages: int) -> dict:
+        """爬取指定景点的评论并生成爬取报告，不写死信文件
+
+        Args:
+            poi_id: 景点ID
+            poi_name: 景点名称
+            max_pages: 最大爬取页数（按实际每页数量计）
+
+        Returns:
+            dict: 爬取报告
         """
         self.logger.info(f"开始爬取景点: {poi_name} (ID: {poi_id})")
         start_time = time.time()
+        report = {'success': False, 'total_pages': 0, 'page_size': 0, 'crawled_pages': 0, 'failed_pages': [0],
+                  'truncated': False, 'comment_count': 0, 'completeness': 0.0, 'file_path': None}
 
         # 为每个景点创建独立的CSV文件
         file_path = self._init_csv_file(poi_id, poi_name)
         if not file_path:
             self.logger.error(f"无法为景点 {poi_name} 创建文件")
-            return False
+            return report
+        report['file_path'] = file_path
 
-        # 获取总页数
-        total_pages = self._get_total_pages(poi_id)
-        if total_pages == 0:
+        # 获取首页，同时得到总页数和实际每页数量，首页数据直接复用
+        total_pages, page_size, first_comments = self._get_first_page(poi_id)
+        if total_pages is None:
             self.logger.warning(f"无法获取 {poi_name} 的评论页数")
-            return False
+            return report
 
         total_pages = min(total_pages, max_pages)
-        self.logger.info(f"计划爬取 {total_pages} 页评论")
+        report['page_size'] = page_size
+        self.logger.info(f"计划爬取 {total_pages} 页评论，每页 {page_size} 条")
 
-        # 爬取所有页面的评论
+        # 保存首页评论
         current_index = 0
-        success_count = 0  # 记录成功爬取的页面数
+        failed_pages = []
+        # 接口可翻页深度小于评论总数时，超出深度的页面返回空列表，遇到第一个空页即停止
+        last_page = total_pages
+        if total_pages > 0:
+            if not first_comments:
+                last_page = 0
+            current_index = self._save_comments(first_comments, poi_id, poi_name, current_index, file_path)
+            self.logger.log_progress(1, total_pages, f"comment crawling {poi_id}")
+
+        # 爬取其余页面的评论
+        for page in range(2, last_page + 1):
+            if self.retry_policy.remaining_attempts() == 0:
+                self.logger.warning(f"请求预算已用完，跳过剩余 {total_pages - page + 1} 页")
+                last_page = page - 1
+                break
+            time.sleep(self.page_delay)
+            self.logger.log_detail(f"正在爬取第 {page}/{total_pages} 页...")
+            current_index, fetched = self._crawl_page(poi_id, poi_name, page, current_index, file_path, page_size)
+            if fetched is None:
+                self.logger.warning(f"第 {page} 页数据获取失败，稍后重新排队")
+                failed_pages.append(page)
+            elif fetched == 0:
+                self.logger.warning(f"第 {page} 页没有评论，已超出可翻页深度，跳过剩余 {total_pages - page + 1} 页")
+                last_page = page - 1
+                break
 
-        for page in range(1, total_pages + 1):
-            self.logger.info(f"正在爬取第 {page}/{total_pages} 页...")
+            # 记录进度
+            self.logger.log_progress(page, total_pages, f"comment crawling {poi_id}")
+
+        # 失败页面重新排队
+        for round_index in range(1, self.requeue_rounds + 1):
+            if not failed_pages or self.retry_policy.remaining_attempts() == 0:
+                break
+            self.logger.info(f"第 {round_index} 轮重新排队，重试 {len(failed_pages)} 个失败页面: {failed_pages}")
+            still_failed = []
+            for page in failed_pages:
+                time.sleep(self.page_delay)
+                current_index, fetched = self._crawl_page(poi_id, poi_name, page, current_index, file_path,
+                                                          page_size)
+                if fetched is None:
+                    still_failed.append(page)
+            failed_pages = still_failed
 
-            # 获取当前页数据
-            comments_data = self._get_page_comments(poi_id, page)
-            if not comments_data:
-                self.logger.warning(f"第 {page} 页数据获取失败，跳过")
-                continue
+        end_time = time.time()
+        self.logger.end_progress(f"comment crawling {poi_id}")
+        crawled_pages = last_page - len(failed_pages)
+        report.update({
+            'success': not failed_pages,
+            'total_pages': total_pages,
+            'crawled_pages': crawled_pages,
+            'failed_pages': failed_pages,
+            'truncated': last_page < total_pages,
+            'comment_count': current_index,
+            'completeness': crawled_pages / total_pages if total_pages else 1.0,
+        })
+        self.logger.info(f"景点 {poi_name} 爬取完成，总耗时: {end_time-start_time:.2f}秒，共获取 {current_index} 条评论，"
+                         f"完整度: {report['completeness']:.2%}，保存至: {file_path}")
+        # 汇总模式下每页的行数已计入汇总，不再重复记录景点总数
+        if not self.logger.summary_interval:
+            self.logger.log_data_extraction(report['comment_count'], "comments")
+        self.tracer.report(poi_id)
+        return report
+
+    def _crawl_page(self, poi_id: str, poi_name: str, page: int, current_index: int, file_path: str,
+                    page_size: int = 10, star_type: int = 0, tag_id: int = 0, dedupe: dict = None):
+        """爬取并保存单页评论
 
-            # 保存评论到该景点对应的文件
-            current_index = self._save_comments(comments_data, poi_id, poi_name, current_index, file_path)
-            self.logger.info(f"第 {page} 页爬取完成，获取 {len(comments_data)} 条评论")
-            success_count += 1  # 成功爬取一页
+        Args:
+            poi_id: 景点ID
+            poi_name: 景点名称
+            page: 页码
+            current_index: 当前序号
+            file_path: CSV文件路径
+            page_size: 每页数量
+            star_type: 星级筛选，0表示不筛选
+            tag_id: 评论标签筛选，0表示不筛选
+            dedupe: 分片爬取的共享去重状态，见 crawl_comments_sharded；传入时忽略 current_index
 
-            # 记录进度
-            self.logger.log_progress(page, total_pages, "comment crawling")
+        Returns:
+            tuple: (保存后的新序号, 本页获取的评论数)，获取失败时评论数为None，空页为0
+        """
+        comments_data = self._get_page_comments(poi_id, page, page_size, star_type, tag_id)
+        if comments_data is None:
+            return current_index, None
 
-            # 延迟
-            if page < total_pages:
-                time.sleep(1)
+        if dedupe is not None:
+            return self._save_unique_comments(comments_data, poi_id, poi_name, file_path, dedupe), len(comments_data)
 
-        end_time = time.time()
-        self.logger.info(f"景点 {poi_name} 爬取完成，总耗时: {end_time-start_time:.2f}秒，共获取 {current_index} 条评论，保存至: {file_path}")
-        self.logger.log_data_extraction(current_index, "comments")
+        # 保存评论到该景点对应的文件
+        current_index = self._save_comments(comments_data, poi_id, poi_name, current_index, file_path)
+        self.logger.log_detail(f"第 {page} 页爬取完成，获取 {len(comments_data)} 条评论")
+        return current_index, len(comments_data)
+
+    def crawl_comments_sharded(self, poi_id: str, poi_name: str, shard_by: str = 'star', tag_ids: list = None,
+                               max_pages: int = 100, max_workers: int = 5, include_unfiltered: bool = True) -> dict:
+        """分片爬取评论：按星级和/或评论标签把一个景点拆成多个独立的翻页序列并发爬取，按commentId合并去重
+
+        适用于评论数超过接口可翻页深度的热门景点，每个分片各自受翻页深度限制，合起来覆盖更多评论。
+
+        Args:
+            poi_id: 景点ID
+            poi_name: 景点名称
+            shard_by: 分片方式：'star' 按星级，'tag' 按评论标签，'star_tag' 按星级和标签的组合
+            tag_ids: 评论标签ID列表（commentTagId），按标签分片时必须提供
+            max_pages: 每个分片的最大爬取页数（按实际每页数量计）
+            max_workers: 并发爬取的分片数
+            include_unfiltered: 是否同时爬取不筛选的默认排序序列
 
-        # 如果有成功爬取的页面，则认为整体成功
-        return success_count > 0
+        Returns:
+            dict: 爬取报告，结构如下：
+                {
+                    'success': bool,  # 所有分片的计划页面是否都爬取成功
+                    'shards': dict,  # {(starType, commentTagId): 分片报告}
+                    'comment_count': int,  # 去重后的评论数
+                    'duplicate_count': int,  # 分片间重复而被丢弃的评论数
+                    'truncated': bool,  # 是否有分片因遇到空页而提前停止
+                    'completeness': float,  # 所有分片的页面完整度（0~1）
+                    'file_path': str  # CSV文件路径
+                }
+        """
+        shards = self._build_shards(shard_by, tag_ids, include_unfiltered)
+        self.logger.info(f"开始分片爬取景点: {poi_name} (ID: {poi_id})，共 {len(shards)} 个分片，并发数 {max_workers}")
+        start_time = time.time()
+        report = {'success': False, 'shards': {}, 'comment_count': 0, 'duplicate_count': 0,
+                  'truncated': False, 'completeness': 0.0, 'file_path': None}
 
-    def crawl_multiple_pois(self, poi_list: list, max_pages: int = 100):
+        file_path = self._init_csv_file(poi_id, poi_name)
+        if not file_path:
+            self.logger.error(f"无法为景点 {poi_name} 创建文件")
+            return report
+        report['file_path'] = file_path
+
+        # 所有分片共享的去重状态
+        dedupe = {'seen': set(), 'index': 0, 'duplicates': 0, 'lock': threading.Lock()}
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(self._crawl_shard, poi_id, poi_name, star_type, tag_id, max_pages, file_path,
+                                dedupe): (star_type, tag_id)
+                for star_type, tag_id in shards
+            }
+            for future in as_completed(futures):
+                star_type, tag_id = futures[future]
+                shard_report = future.result()
+                report['shards'][(star_type, tag_id)] = shard_report
+                for page in shard_report['failed_pages']:
+                    self.dead_letters.add(poi_id, poi_name, page, "分片重试和重新排队后仍然失败",
+                                          shard_report['page_size'], star_type, tag_id)
+
+        total_pages = sum(item['total_pages'] for item in report['shards'].values())
+        crawled_pages = sum(item['crawled_pages'] for item in report['shards'].values())
+        report.update({
+            'success': all(not item['failed_pages'] for item in report['shards'].values()),
+            'comment_count': dedupe['index'],
+            'duplicate_count': dedupe['duplicates'],
+            'truncated': any(item['truncated'] for item in report['shards'].values()),
+            'completeness': crawled_pages / total_pages if total_pages else 1.0,
+        })
+        self.logger.info(f"景点 {poi_name} 分片爬取完成，总耗时: {time.time()-start_time:.2f}秒，"
+                         f"去重后共 {dedupe['index']} 条评论，重复 {dedupe['duplicates']} 条，"
+                         f"完整度: {report['completeness']:.2%}，保存至: {file_path}")
+        # 汇总模式下每页的行数已计入汇总，不再重复记录景点总数
+        if not self.logger.summary_interval:
+            self.logger.log_data_extraction(report['comment_count'], "comments")
+        self.tracer.report(poi_id)
+        return report
+
+    def _build_shards(self, shard_by: str, tag_ids: list = None, include_unfiltered: bool = True) -> list:
+        """生成分片列表
+
+        Args:
+            shard_by: 分片方式
+            tag_ids: 评论标签ID列表
+            include_unfiltered: 是否包含不筛选的分片
+
+        Returns:
+            list: [(starType, commentTagId)]
+        """
+        if shard_by in ('tag', 'star_tag') and not tag_ids:
+            raise ValueError(f"分片方式 {shard_by} 需要提供 tag_ids")
+        if shard_by == 'star':
+            shards = [(star_type, 0) for star_type in self.STAR_TYPES]
+        elif shard_by == 'tag':
+            shards = [(0, tag_id) for tag_id in tag_ids]
+        elif shard_by == 'star_tag':
+            shards = [(star_type, tag_id) for star_type in self.STAR_TYPES for tag_id in tag_ids]
+        else:
+            raise ValueError(f"不支持的分片方式: {shard_by}")
+        return ([(0, 0)] if include_unfiltered else []) + shards
+
+    def _crawl_shard(self, poi_id: str, poi_name: str, star_type: int, tag_id: int, max_pages: int,
+                     file_path: str, dedupe: dict) -> dict:
+        """爬取一个分片的所有页面，失败页面在分片结束时重新排队
+
+        Args:
+            poi_id: 景点ID
+            poi_name: 景点名称
+            star_type: 星级筛选
+            tag_id: 评论标签筛选
+            max_pages: 最大爬取页数
+            file_path: CSV文件路径
+            dedupe: 共享去重状态
+
+        Returns:
+            dict: 分片报告 {'total_pages', 'page_size', 'crawled_pages', 'failed_pages', 'truncated'}
+        """
+        shard = f"starType={star_type}, commentTagId={tag_id}"
+        total_pages, page_size, first_comments = self._get_first_page(poi_id, star_type, tag_id)
+        if total_pages is None:
+            self.logger.warning(f"分片 [{shard}] 无法获取评论页数")
+            return {'total_pages': 1, 'page_size': 0, 'crawled_pages': 0, 'failed_pages': [0], 'truncated': False}
+
+        total_pages = min(total_pages, max_pages)
+        last_page = total_pages
+        if total_pages > 0:
+            if not first_comments:
+                last_page = 0
+            self._save_unique_comments(first_comments, poi_id, poi_name, file_path, dedupe)
+
+        failed_pages = []
+        pages = list(range(2, last_page + 1))
+        for round_index in range(self.requeue_rounds + 1):
+            for page in pages:
+                if page > last_page:
+                    break
+                time.sleep(self.page_delay)
+                _, fetched = self._crawl_page(poi_id, poi_name, page, 0, file_path, page_size, star_type, tag_id,
+                                              dedupe)
+                if fetched is None:
+                    failed_pages.append(page)
+                elif fetched == 0:
+                    # 超出可翻页深度，之后的页面都是空页
+                    last_page = page - 1
+                    break
+            failed_pages = [page for page in failed_pages if page <= last_page]
+            if not failed_pages or round_index == self.requeue_rounds:
+                break
+            self.logger.info(f"分片 [{shard}] 第 {round_index + 1} 轮重新排队，重试失败页面: {failed_pages}")
+            pages, failed_pages = failed_pages, []
+
+        truncated = last_page < total_pages
+        self.logger.info(f"分片 [{shard}] 完成，共 {total_pages} 页，失败 {len(failed_pages)} 页"
+                         + (f"，第 {last_page + 1} 页起为空页，提前停止" if truncated else ""))
+        return {'total_pages': total_pages, 'page_size': page_size, 'crawled_pages': last_page - len(failed_pages),
+                'failed_pages': failed_pages, 'truncated': truncated}
+
+    def _save_unique_comments(self, comments: list, poi_id: str, poi_name: str, file_path: str, dedupe: dict) -> int:
+        """按commentId去重后保存评论
+
+        Args:
+            comments: 评论数据列表
+            poi_id: 景点ID
+            poi_name: 景点名称
+            file_path: CSV文件路径
+            dedupe: 共享去重状态 {'seen': set, 'index': int, 'duplicates': int, 'lock': Lock}
+
+        Returns:
+            int: 保存后的新序号
+        """
+        with dedupe['lock']:
+            unique = []
+            for comment in comments:
+                comment_id = str(comment['commentId'])
+                if comment_id in dedupe['seen']:
+                    dedupe['duplicates'] += 1
+                    continue
+                dedupe['seen'].add(comment_id)
+                unique.append(comment)
+            if unique:
+                dedupe['index'] = self._save_comments(unique, poi_id, poi_name, dedupe['index'], file_path)
+            return dedupe['index']
+
+    def crawl_multiple_pois(self, poi_list, max_pages: int = 100, report_file: str = None):
         """批量爬取多个景点的评论
 
+        每个景点的爬取报告爬完即追加写入报告文件，中途中断时已完成景点的报告不会丢失
+
         Args:
-            poi_list: 景点ID和名称的列表
+            poi_list: 景点ID和名称的列表，也可以是逐个产生 (景点ID, 名称) 的迭代器
             max_pages: 每个景点最大爬取页数
+            report_file: 爬取报告的JSON Lines文件，默认为输出目录下本次运行的 crawl_reports_<时间>.jsonl，
+                已存在时追加写入
 
         Returns:
-            dict: 爬取结果字典
+            dict: 爬取结果字典，值为每个景点的爬取报告（见 crawl_poi）
         """
-        total_pois = len(poi_list)
-        self.logger.info(f"开始批量爬取 {total_pois} 个景点的评论")
+        report_file = report_file or os.path.join(
+            self.output_dir, f"crawl_reports_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl")
+        self.report_file = report_file
+        total_pois = len(poi_list) if hasattr(poi_list, '__len__') else 0
+        self.logger.info(f"开始批量爬取 {total_pois or '若干'} 个景点的评论，报告文件: {report_file}")
         start_time = time.time()
 
         results = {}
+        succeeded, comment_count = 0, 0
         for i, (poi_id, poi_name) in enumerate(poi_list, 1):
-            self.logger.info(f"正在处理第 {i}/{total_pois} 个景点: {poi_name} (ID: {poi_id})")
-            success = self.crawl_comments(poi_id, poi_name, max_pages)
-            results[f"{poi_name}({poi_id})"] = success
+            self.logger.info(f"正在处理第 {i}/{total_pois or '?'} 个景点: {poi_name} (ID: {poi_id})")
+            report = self.crawl_poi(poi_id, poi_name, max_pages)
+            with open(report_file, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(dict(report, poi_id=str(poi_id), poi_name=poi_name), ensure_ascii=False) + '\n')
+            comment_count += report['comment_count']
+            if report['success'] and not report['truncated']:
+                succeeded += 1
+            results[f"{poi_name}({poi_id})"] = report
 
             # 记录当前进度
-            self.logger.log_progress(i, total_pois, "POI crawling")
+            self.logger.log_progress(i, total_pois or i, "POI crawling")
 
             # 景点间的延迟
-            time.sleep(2)
+            time.sleep(self.poi_delay)
 
         end_time = time.time()
         # 打印汇总结果
-        self.logger.info(f"批量爬取完成，总耗时: {end_time-start_time:.2f}秒")
+        self.logger.flush_summary()
+        self.logger.info(f"批量爬取完成，总耗时: {end_time-start_time:.2f}秒，成功 {succeeded} 个景点，"
+                         f"共 {comment_count} 条评论，内存峰值 {peak_rss_bytes() / 1024 / 1024:.1f}MB")
+        self.tracer.report()
+        self._log_results(results)
+        return results
+
+    def _log_results(self, results: dict):
+        """输出爬取结果汇总
+
+        Args:
+            results: 景点到爬取报告的字典
+        """
         self.logger.info("爬取结果汇总:")
-        for poi, success in results.items():
-            status = "成功" if success else "失败"
-            self.logger.info(f"{poi}: {status}")
-            if not success:
-                self.logger.warning(f"景点 {poi} 爬取失败")
+        for poi, report in results.items():
+            if report['success'] and report.get('truncated'):
+                self.logger.warning(f"景点 {poi} 超出可翻页深度，只获取到 {report['crawled_pages']}/{report['total_pages']} 页，"
+                                    f"共 {report['comment_count']} 条评论")
+            elif report['success']:
+                self.logger.info(f"景点 {poi} 爬取成功，共 {report['comment_count']} 条评论")
+            elif report['crawled_pages']:
+                self.logger.warning(f"景点 {poi} 部分完成，完整度 {report['completeness']:.2%}，"
+                                    f"失败页面: {report['failed_pages']}")
             else:
-                self.logger.info(f"景点 {poi} 爬取成功")
+                self.logger.warning(f"景点 {poi} 爬取失败")
+
+    def replay_dead_letters(self, max_pages: int = 100) -> dict:
+        """补爬死信文件中的失败页面，不重新爬取已成功的页面
+
+        Args:
+            max_pages: 整个景点失败时重新爬取的最大页数
+
+        Returns:
+            dict: {景点: {'recovered_pages': list, 'failed_pages': list}}，分片页面的键带有筛选条件
+        """
+        sweeps = self.dead_letters.group_by_sweep()
+        self.logger.info(f"开始补爬死信文件中的 {len(sweeps)} 个翻页序列: {self.dead_letters.file_path}")
 
+        still_failed = []
+        results = {}
+        for (poi_id, star_type, tag_id), group in sweeps.items():
+            poi_name, pages, page_size = group['poi_name'], group['pages'], group['page_size']
+            file_path = self._csv_path(poi_id, poi_name)
+            filtered = bool(star_type or tag_id)
+
+            if not filtered and (0 in pages or not os.path.exists(file_path)):
+                # 整个景点失败，重新爬取
+                report = self._crawl_poi(poi_id, poi_name, max_pages)
+                failed_pages, page_size = report['failed_pages'], report['page_size']
+                recovered_pages = [] if failed_pages == [0] else [p for p in range(1, report['total_pages'] + 1)
+                                                                  if p not in failed_pages]
+            else:
+                current_index = self._get_current_index(file_path)
+                recovered_pages, failed_pages = [], []
+                # 分片页面可能与已保存的评论重复，不筛选的页面也可能已经保存过（如页面在失败后又被爬到），按commentId去重
+                dedupe = {'seen': self._get_saved_comment_ids(file_path), 'index': current_index,
+                          'duplicates': 0, 'lock': threading.Lock()}
+                if filtered:
+                    if 0 in pages:
+                        # 整个分片失败，重新爬取该分片
+                        shard_report = self._crawl_shard(poi_id, poi_name, star_type, tag_id, max_pages, file_path,
+                                                         dedupe)
+                        failed_pages, page_size = shard_report['failed_pages'], shard_report['page_size']
+                        recovered_pages = [] if failed_pages == [0] else [
+                            p for p in range(1, shard_report['total_pages'] + 1) if p not in failed_pages]
+                        pages = []
+
+                for page in pages:
+                    current_index, fetched = self._crawl_page(poi_id, poi_name, page, current_index, file_path,
+                                                              page_size, star_type, tag_id, dedupe)
+                    (failed_pages if fetched is None else recovered_pages).append(page)
+                    time.sleep(self.page_delay)
+
+            still_failed.extend({'poi_id': poi_id, 'poi_name': poi_name, 'page': page, 'page_size': page_size,
+                                 'star_type': star_type, 'tag_id': tag_id, 'reason': "补爬后仍然失败",
+                                 'failed_at': time.time()} for page in failed_pages)
+            key = f"{poi_name}({poi_id})" + (f"[starType={star_type}, commentTagId={tag_id}]" if filtered else "")
+            results[key] = {'recovered_pages': recovered_pages, 'failed_pages': failed_pages}
+            self.logger.info(f"{key} 补爬完成，恢复 {len(recovered_pages)} 页，仍失败 {len(failed_pages)} 页")
+
+        self.dead_letters.rewrite(still_failed)
         return results
-    
-    def _get_total_pages(self, poi_id: str) -> int:
-        """获取评论总页数
+
+    def _get_saved_comment_ids(self, file_path: str, limit: int = None) -> set:
+        """读取CSV文件中已保存的评论ID
+
+        Args:
+            file_path: CSV文件路径
+            limit: 只读取前 limit 条评论，为None时读取全部
+
+        Returns:
+            set: 评论ID集合
+        """
+        try:
+            with open_input(file_path, encoding='utf-8-sig', newline='') as f:
+                reader = csv.reader(f)
+                next(reader, None)
+                if limit is not None:
+                    reader = itertools.islice(reader, limit)
+                return {row[3] for row in reader if len(row) > 3}
+        except OSError:
+            return set()
+
+    def _get_first_page(self, poi_id: str, star_type: int = 0, tag_id: int = 0):
+        """获取评论首页，得到总页数和实际每页数量，并复用首页数据
+
+        未指定 page_size 时依次用 PAGE_SIZE_CANDIDATES 中的值请求首页：接口返回的条数少于请求值
+        且少于总评论数时，说明接口只支持返回的条数。接口正常响应但拒绝该pageSize（没有返回评论数据）时
+        才改用更小的值；请求失败（网络错误、状态码错误、响应不是JSON）直接视为失败，不降低pageSize。
+        探测结果会用于之后的景点。
 
         Args:
             poi_id: 景点ID
+            star_type: 星级筛选，0表示不筛选
+            tag_id: 评论标签筛选，0表示不筛选
 
         Returns:
-            int: 总页数，获取失败时返回0
+            tuple: (总页数, 每页数量, 首页评论列表)，获取失败时返回 (None, None, None)
         """
-        data = self._make_request(poi_id, 1)
-        if not data or 'result' not in data:
-            self.logger.warning("无法获取总页数")
-            return 0
+        candidates = [self.page_size] if self.page_size else list(self.PAGE_SIZE_CANDIDATES)
+        for requested_size in candidates:
+            data = self._make_request(poi_id, 1, requested_size, star_type, tag_id)
+            if data is None:
+                self.logger.warning(f"评论首页请求失败（pageSize={requested_size}）")
+                return None, None, None
+            with self.tracer.span('parse', poi_id):
+                comments = self._parse_comments(data, poi_id, 1)
+            if comments is None:
+                self.logger.warning(f"接口不支持 pageSize={requested_size}，尝试更小的值")
+                continue
 
-        try:
-            total_count = data['result']['totalCount']
-            total_pages = int(total_count / 10)
+            try:
+                total_count = int(data['result']['totalCount'])
+            except (KeyError, TypeError, ValueError) as e:
+                self.logger.error(f"解析总页数时出错: {e}")
+                return None, None, None
+
+            page_size = requested_size
+            if len(comments) < min(requested_size, total_count):
+                page_size = max(len(comments), 1)
+            if not self.page_size and (len(comments) >= requested_size or page_size < requested_size):
+                self.page_size = page_size
+                self.logger.info(f"评论接口每页数量探测结果: {page_size}")
+
+            total_pages = math.ceil(total_count / page_size)
             self.logger.info(f"总评论数: {total_count}, 总页数: {total_pages}")
-            return total_pages
-        except (KeyError, TypeError) as e:
-            self.logger.error(f"解析总页数时出错: {e}")
-            return 0
+            return total_pages, page_size, comments
+
+        self.logger.warning("无法获取总页数")
+        return None, None, None
+
+    def _get_current_index(self, file_path: str) -> int:
+        """获取CSV文件中的当前序号
 
-    def _get_current_index(self) -> int:
-        """获取当前CSV文件中的序号
+        Args:
+            file_path: CSV文件路径
 
         Returns:
             int: 当前序号
         """
         try:
-            with open(self.output_file, 'r', encoding='utf-8-sig') as f:
+            with open_input(file_path, encoding='utf-8-sig', newline='') as f:
                 reader = csv.reader(f)
                 rows = list(reader)
                 return len(rows) - 1
         except:
             return 0
 
-    def _make_request(self, poi_id: str, page_index: int = 1):
-        """发送请求获取评论数据
+    def _make_request(self, poi_id: str, page_index: int = 1, page_size: int = 10, star_type: int = 0,
+                      tag_id: int = 0):
+        """发送请求获取评论数据并解码JSON
 
         Args:
             poi_id: 景点ID
             page_index: 页码索引
+            page_size: 每页数量
+            star_type: 星级筛选，0表示不筛选
+            tag_id: 评论标签筛选，0表示不筛选
 
         Returns:
             dict: 响应数据，请求失败时返回None
         """
+        try:
+            # 请求和解码由接口的熔断器保护，连续失败后直接返回None，不再请求
+            with self.retry_policy.circuit(self.post_url) as outcome:
+                content = self._fetch_page(poi_id, page_index, page_size, star_type, tag_id, outcome)
+                if content is None:
+                    return None
+                try:
+                    with self.tracer.span('decode', poi_id):
+                        data = json.loads(content)
+                except ValueError as e:
+                    self.logger.log_error(f"响应数据不是有效的JSON格式: {e}", self.post_url, "JSON_PARSE")
+                    outcome.fail()
+                    return None
+                if not isinstance(data, dict) or data.get('result') is None:
+                    outcome.fail()
+                return data
+        except CircuitOpenError as e:
+            self.logger.warning(str(e))
+            return None
+
+    def _fetch_page(self, poi_id: str, page_index: int = 1, page_size: int = 10, star_type: int = 0,
+                    tag_id: int = 0, outcome=None):
+        """发送请求获取评论接口的原始响应体
+
+        Args:
+            poi_id: 景点ID
+            page_index: 页码索引
+            page_size: 每页数量
+            star_type: 星级筛选，0表示不筛选
+            tag_id: 评论标签筛选，0表示不筛选
+            outcome: 熔断器的请求结果（见 RetryPolicy.circuit），请求失败时标记失败
+
+        Returns:
+            bytes: 原始响应体，请求失败时返回None
+        """
         try:
             request_data = {
                 "arg": {
                     "channelType": 2,
                     "collapseType": 0,
-                    "commentTagId": 0,
+                    "commentTagId": tag_id,
                     "pageIndex": page_index,
-                    "pageSize": 10,
+                    "pageSize": page_size,
                     "poiId": poi_id,
                     "sourceType": 1,
                     "sortType": 3,
-                    "starType": 0
+                    "starType": star_type
                 },
                 "head": {
                     "cid": "09031069112760102754",
@@ -319,39 +973,88 @@ class CtripCommentSpider:
             }
 
             start_time = time.time()
-            response = requests.post(
-                self.post_url, 
-                data=json.dumps(request_data), 
-                headers=self.headers, 
-                timeout=10
-            )
+            with self.tracer.span('fetch', poi_id):
+                response = self.retry_policy.call(lambda: self.session.post(
+                    self.post_url, 
+                    data=json.dumps(request_data), 
+                    headers=self.headers, 
+                    timeout=10
+                ), self.post_url)
             end_time = time.time()
             response_time = end_time - start_time
 
             if response.status_code != 200:
                 self.logger.log_error(f"请求失败，状态码：{response.status_code}", self.post_url, "POST")
+                if outcome:
+                    outcome.fail()
                 return None
 
             self.logger.log_request(self.post_url, response.status_code, response_time, "POST")
-            return response.json()
-
+            # 归档按 (景点, 页码, pageSize, 筛选条件) 索引，首页探测时不同 pageSize 的响应分别保存
+            if self.archive:
+                self.archive.append('comments', poi_id, page_index, response.content, page_size=page_size,
+                                    star_type=star_type, tag_id=tag_id)
+            return response.content
+
+        except RequestBudgetExhausted as e:
+            # 请求没有发送，不计入接口失败
+            self.logger.warning(str(e))
+            if outcome:
+                outcome.skip()
+            return None
         except Exception as e:
             self.logger.log_error(f"请求错误: {e}", self.post_url, "POST")
+            if outcome:
+                outcome.fail()
             return None
     
-    def _get_page_comments(self, poi_id: str, page: int):
+    def _get_page_comments(self, poi_id: str, page: int, page_size: int = 10, star_type: int = 0,
+                           tag_id: int = 0):
         """获取指定页面的评论数据
 
         Args:
             poi_id: 景点ID
             page: 页码
+            page_size: 每页数量
+            star_type: 星级筛选，0表示不筛选
+            tag_id: 评论标签筛选，0表示不筛选
 
         Returns:
-            list: 评论数据列表
+            list: 评论数据列表，获取失败时返回None
+        """
+        if self.parse_pool is None:
+            data = self._make_request(poi_id, page, page_size, star_type, tag_id)
+            with self.tracer.span('parse', poi_id):
+                return self._parse_comments(data, poi_id, page)
+
+        # 解码和解析交给进程池，当前线程只等待结果，不占用GIL
+        try:
+            with self.retry_policy.circuit(self.post_url) as outcome:
+                content = self._fetch_page(poi_id, page, page_size, star_type, tag_id, outcome)
+                if content is None:
+                    return None
+                with self.tracer.span('parse', poi_id):
+                    comments = self.parse_pool.parse_comment_page(content, poi_id, page)
+                if comments is None:
+                    outcome.fail()
+                return comments
+        except CircuitOpenError as e:
+            self.logger.warning(str(e))
+            return None
+
+    def _parse_comments(self, data, poi_id: str, page: int):
+        """解析评论接口返回的数据
+
+        Args:
+            data: 评论接口响应数据
+            poi_id: 景点ID
+            page: 页码
+
+        Returns:
+            list: 评论数据列表，请求失败或数据无法解析时返回None
         """
-        data = self._make_request(poi_id, page)
         if not data or 'result' not in data or 'items' not in data['result']:
-            return []
+            return None
 
         try:
             comments = []
@@ -411,7 +1114,7 @@ class CtripCommentSpider:
             self.logger.log_error(f"解析评论数据时出错: {e}", f"POI_ID: {poi_id}, Page: {page}", "PARSING")
             import traceback
             self.logger.error(traceback.format_exc())  # 记录详细错误信息
-            return []
+            return None
 
     def _save_comments(self, comments: list, poi_id: str, poi_name: str, start_index: int, file_path: str) -> int:
         """将评论保存到指定CSV文件
@@ -427,38 +1130,56 @@ class CtripCommentSpider:
             int: 保存后的新序号
         """
         try:
-            with open(file_path, 'a', newline='', encoding='utf-8-sig') as f:
-                writer = csv.writer(f)
-                current_index = start_index
-                for comment in comments:
-                    writer.writerow([
-                        current_index,
-                        poi_id,
-                        poi_name,
-                        comment['commentId'],
-                        comment['userNick'],
-                        comment['score'],
-                        comment['content'],
-                        comment['publishTime'],
-                        comment['usefulCount'],
-                        comment['replyCount'],
-                        comment['touristTypeDisplay'],
-                        comment['ipLocatedName'],
-                        comment['timeDuration'],
-                        comment['imageCount'],
-                        comment['imageUrls'],
-                        comment['sceneryScore'],
-                        comment['funScore'],
-                        comment['valueScore'],
-                        comment['recommendItems']
-                    ])
-                    current_index += 1
+            with self.tracer.span('write', poi_id), self._open_csv(file_path, 'a') as f:
+                current_index = self._write_comment_rows(f, comments, poi_id, poi_name, start_index)
+            if self.aggregates:
+                self.aggregates.add_comments(poi_id, comments)
             self.logger.log_data_extraction(len(comments), "comments")
             return current_index
         except Exception as e:
             self.logger.log_error(f"保存评论到CSV失败: {e}", file_path, "FILE_WRITE")
             return start_index
 
+    @staticmethod
+    def _write_comment_rows(f, comments: list, poi_id: str, poi_name: str, start_index: int) -> int:
+        """将评论按CSV格式写入已打开的文件
+
+        Args:
+            f: 以追加模式打开的文件对象
+            comments: 评论数据列表
+            poi_id: 景点ID
+            poi_name: 景点名称
+            start_index: 起始序号
+
+        Returns:
+            int: 写入后的新序号
+        """
+        writer = csv.writer(f)
+        current_index = start_index
+        for comment in comments:
+            writer.writerow([
+                current_index,
+                poi_id,
+                poi_name,
+                comment['commentId'],
+                comment['userNick'],
+                comment['score'],
+                comment['content'],
+                comment['publishTime'],
+                comment['usefulCount'],
+                comment['replyCount'],
+                comment['touristTypeDisplay'],
+                comment['ipLocatedName'],
+                comment['timeDuration'],
+                comment['imageCount'],
+                comment['imageUrls'],
+                comment['sceneryScore'],
+                comment['funScore'],
+                comment['valueScore'],
+                comment['recommendItems']
+            ])
+            current_index += 1
+        return current_index
 
 # 使用示例
 if __name__ == "__main__":
@@ -1,22 +1,52 @@
 import json
 import os
-from requests import post
-from bs4 import BeautifulSoup
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from log import CtripSpiderLogger
+from profiler import StageTracer
+from retry import RetryPolicy
+
+# 景点ID迭代结束标记，景点ID本身可能是None
+_END = object()
+
 
 class AttractionDetailFetcher:
     """景点详情获取器，用于获取指定景点的核心信息"""
 
-    def __init__(self, logger: CtripSpiderLogger = None):
+    def __init__(self, logger: CtripSpiderLogger = None, tracer: StageTracer = None, session=None,
+                 archive=None, retry_policy: RetryPolicy = None, parse_pool=None, max_workers: int = 8):
         """初始化景点详情获取器
 
         Args:
             logger: 日志记录器实例
+            tracer: 阶段计时器实例
+            session: 发送请求的会话（如 requests.Session 或录制/回放会话），默认创建连接池大小为 max_workers 的
+                     requests.Session，所有请求复用连接
+            archive: 原始响应归档库（RawArchive），为None时不归档
+            retry_policy: 请求重试策略
+            parse_pool: 解码和解析详情页的进程池（ParsePool），为None时在当前线程解析
+            max_workers: get_details 的默认并发数
         """
         self.detail_url = 'https://m.ctrip.com/restapi/soa2/18254/json/getPoiMoreDetail'
+        self.max_workers = max_workers
+        if session is None:
+            # 延迟导入 requests，导入模块本身不加载网络库
+            import requests
+            from requests.adapters import HTTPAdapter
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+        self.session = session
+        self.archive = archive
+        self.parse_pool = parse_pool
 
         # 初始化日志记录器
         self.logger = logger or CtripSpiderLogger("AttractionDetailFetcher", "logs")
+        self.retry_policy = retry_policy or RetryPolicy(logger=self.logger)
+        self.tracer = tracer or StageTracer(self.logger)
+        # 最近一次 get_details 的耗时统计
+        self.batch_stats = {}
 
     def get_detail(self, poi_id):
         """获取景点核心信息
@@ -42,44 +72,46 @@ class AttractionDetailFetcher:
         """
         # 准备请求数据
         request_data = self._build_request_data(poi_id)
-        self.logger.info(f"开始获取景点详情, poi_id: {poi_id}")
+        self.logger.log_detail(f"开始获取景点详情, poi_id: {poi_id}")
 
         try:
             # 发送请求
             import time
             start_time = time.time()
-            response = post(self.detail_url, json=request_data)
-            end_time = time.time()
-            response_time = end_time - start_time
-
-            # 检查响应状态码
-            if response.status_code != 200:
-                error_msg = f"请求失败，状态码: {response.status_code}"
-                self.logger.log_error(error_msg, self.detail_url, "POST")
-                return self._create_error_result(error_msg)
-
-            self.logger.log_request(self.detail_url, response.status_code, response_time, "POST")
-
-            # 解析响应数据
-            try:
-                response_json = response.json()
-            except json.JSONDecodeError:
-                error_msg = "响应数据不是有效的JSON格式"
-                self.logger.log_error(error_msg, self.detail_url, "JSON_PARSE")
-                return self._create_error_result(error_msg)
-
-            # 检查API错误
-            if 'error' in response_json or 'templateList' not in response_json:
-                error_msg = "API返回错误或缺少必要字段"
-                self.logger.log_error(error_msg, self.detail_url, "API_ERROR")
-                return self._create_error_result(error_msg)
-
-            # 解析景点详情数据
-            result = self._parse_core_data(response_json)
+            # 请求和解析都由接口的熔断器保护，连续失败后直接返回错误，不再请求
+            with self.retry_policy.circuit(self.detail_url) as outcome:
+                with self.tracer.span('fetch', poi_id):
+                    response = self.retry_policy.call(
+                        lambda: self.session.post(self.detail_url, json=request_data, timeout=10), self.detail_url)
+                end_time = time.time()
+                response_time = end_time - start_time
+
+                # 检查响应状态码
+                if response.status_code != 200:
+                    error_msg = f"请求失败，状态码: {response.status_code}"
+                    self.logger.log_error(error_msg, self.detail_url, "POST")
+                    outcome.fail()
+                    return self._create_error_result(error_msg)
+
+                self.logger.log_request(self.detail_url, response.status_code, response_time, "POST")
+                if self.archive:
+                    self.archive.append('detail', poi_id, 0, response.content)
+
+                # 解析响应数据，配置了进程池时交给进程池解码和解析
+                with self.tracer.span('parse', poi_id):
+                    if self.parse_pool is not None:
+                        result, error_msg, error_type = self.parse_pool.parse_detail(response.content)
+                    else:
+                        result, error_msg, error_type = self._parse_detail_content(response.content)
+                if error_msg:
+                    self.logger.log_error(error_msg, self.detail_url, error_type)
+                    outcome.fail()
+                    return self._create_error_result(error_msg)
+
             result['success'] = True
             result['error_message'] = ''
 
-            self.logger.info(f"成功获取景点详情, poi_id: {poi_id}")
+            self.logger.log_detail(f"成功获取景点详情, poi_id: {poi_id}")
             self.logger.log_data_extraction(1, "sight_detail")
             return result
 
@@ -88,6 +120,102 @@ class AttractionDetailFetcher:
             self.logger.log_error(error_msg, self.detail_url, "EXCEPTION")
             return self._create_error_result(error_msg)
 
+    def get_details(self, poi_ids, max_workers: int = None):
+        """并发获取多个景点的详情，先完成的先返回
+
+        在途请求数不超过并发数的两倍，poi_ids 可以是很长的迭代器。迭代结束后（包括提前停止）耗时统计保存在 batch_stats：
+        {'total', 'succeeded', 'failed', 'wall_time', 'details_per_sec', 'latency_mean', 'latency_p50',
+         'latency_p95', 'latency_max'}（秒）
+
+        Args:
+            poi_ids: 景点ID列表或迭代器
+            max_workers: 并发数，默认为初始化时的 max_workers
+
+        Yields:
+            tuple: (景点ID, 详情)，详情的结构与 get_detail 相同，失败时为错误结果
+        """
+        max_workers = max_workers or self.max_workers
+        start_time = time.perf_counter()
+        latencies, failed = [], 0
+
+        def fetch(poi_id):
+            fetch_start = time.perf_counter()
+            detail = self.get_detail(poi_id)
+            return poi_id, detail, time.perf_counter() - fetch_start
+
+        pool = ThreadPoolExecutor(max_workers, thread_name_prefix="DetailFetcher")
+        pending = set()
+        try:
+            poi_iter = iter(poi_ids)
+            exhausted = False
+            while pending or not exhausted:
+                while not exhausted and len(pending) < max_workers * 2:
+                    poi_id = next(poi_iter, _END)
+                    if poi_id is _END:
+                        exhausted = True
+                    else:
+                        pending.add(pool.submit(fetch, poi_id))
+                if not pending:
+                    break
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    poi_id, detail, latency = future.result()
+                    latencies.append(latency)
+                    failed += 0 if detail['success'] else 1
+                    yield poi_id, detail
+        finally:
+            # 调用方提前停止迭代时取消尚未开始的请求，统计已经返回的景点
+            for future in pending:
+                future.cancel()
+            pool.shutdown(wait=True)
+            self._record_batch_stats(latencies, failed, time.perf_counter() - start_time)
+
+    def _record_batch_stats(self, latencies: list, failed: int, wall_time: float):
+        """计算批量获取的耗时统计，保存到 batch_stats
+
+        Args:
+            latencies: 每个景点的请求耗时（秒）
+            failed: 失败的景点数
+            wall_time: 总耗时（秒）
+        """
+        latencies.sort()
+        total = len(latencies)
+        self.batch_stats = {
+            'total': total,
+            'succeeded': total - failed,
+            'failed': failed,
+            'wall_time': round(wall_time, 4),
+            'details_per_sec': round(total / wall_time, 2) if wall_time else 0,
+            'latency_mean': round(sum(latencies) / total, 4) if total else 0,
+            'latency_p50': round(latencies[total // 2], 4) if total else 0,
+            'latency_p95': round(latencies[min(total - 1, int(total * 0.95))], 4) if total else 0,
+            'latency_max': round(latencies[-1], 4) if total else 0,
+        }
+        self.logger.info(f"批量获取景点详情完成: 成功 {total - failed} 个，失败 {failed} 个，耗时 {wall_time:.2f}秒，"
+                         f"{self.batch_stats['details_per_sec']:.1f} 个/秒，"
+                         f"延迟 p50 {self.batch_stats['latency_p50']:.3f}秒 / p95 {self.batch_stats['latency_p95']:.3f}秒")
+
+    def _parse_detail_content(self, content: bytes):
+        """解码并解析景点详情接口的原始响应体
+
+        Args:
+            content: 原始响应体
+
+        Returns:
+            tuple: (解析结果, 错误信息, 错误类型)，成功时错误信息为空字符串
+        """
+        try:
+            response_json = json.loads(content)
+        except ValueError:
+            return None, "响应数据不是有效的JSON格式", "JSON_PARSE"
+
+        # 检查API错误
+        if 'error' in response_json or 'templateList' not in response_json:
+            return None, "API返回错误或缺少必要字段", "API_ERROR"
+
+        # 解析景点详情数据
+        return self._parse_core_data(response_json), '', ''
+
     def _create_error_result(self, error_message):
         """创建错误结果
 
@@ -250,7 +378,8 @@ class AttractionDetailFetcher:
                 # 清理HTML标签
                 if description:
                     try:
-                        # 使用更安全的方式解析HTML
+                        # 使用更安全的方式解析HTML，bs4 在第一次需要清理描述时才导入
+                        from bs4 import BeautifulSoup
                         soup = BeautifulSoup(description, 'html.parser')
 
                         # 获取纯文本并去除多余空白
@@ -301,17 +430,19 @@ class AttractionDetailFetcher:
 
         result['traffic'] = traffic_list
 
-    def get_formatted_detail(self, poi_id):
+    def get_formatted_detail(self, poi_id, detail: dict = None):
         """获取格式化的景点详情信息（便于阅读的字符串格式）
 
         Args:
             poi_id: 景点ID
+            detail: 已获取的详情（get_detail 或 get_details 的结果），为None时重新请求
 
         Returns:
             str: 格式化的景点详情信息
         """
         self.logger.info(f"获取格式化景点详情, poi_id: {poi_id}")
-        detail = self.get_detail(poi_id)
+        if detail is None:
+            detail = self.get_detail(poi_id)
 
         if not detail['success']:
             error_msg = f"获取景点详情失败: {detail['error_message']}"
@@ -371,7 +502,7 @@ if __name__ == "__main__":
     
     logger.info("\n" + "="*50 + "\n")
     
-    # 获取格式化文本
-    formatted_detail = detail_fetcher.get_formatted_detail(poi_id)
+    # 获取格式化文本，复用已获取的详情
+    formatted_detail = detail_fetcher.get_formatted_detail(poi_id, detail)
     logger.info("格式化文本:")
     logger.info(formatted_detail)
\ No newline at end of file
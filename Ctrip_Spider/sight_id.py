@@ -1,22 +1,32 @@
-import requests
 import json
 import time
 import os
 from typing import Tuple, Optional
 from log import CtripSpiderLogger
+from profiler import StageTracer
+from retry import RetryPolicy
 
 
 class SightId:
     """景点ID搜索器，用于根据关键词搜索景点ID"""
 
-    def __init__(self, delay_range: Tuple[float, float] = (1, 3), logger: CtripSpiderLogger = None):
+    def __init__(self, delay_range: Tuple[float, float] = (1, 3), logger: CtripSpiderLogger = None,
+                 tracer: StageTracer = None, session=None, retry_policy: RetryPolicy = None):
         """初始化景点ID搜索器
 
         Args:
             delay_range: 延迟范围
             logger: 日志记录器实例
+            tracer: 阶段计时器实例
+            session: 发送请求的会话（如 requests.Session 或录制/回放会话），默认为 requests 模块
+            retry_policy: 请求重试策略
         """
         self.delay_range = delay_range
+        if session is None:
+            # 延迟导入 requests，导入模块本身不加载网络库
+            import requests
+            session = requests
+        self.session = session
         self.search_url = "https://m.ctrip.com/restapi/soa2/26872/search"
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
@@ -25,6 +35,8 @@ class SightId:
             'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8'
         }
         self.logger = logger or CtripSpiderLogger("SightId", "logs")
+        self.retry_policy = retry_policy or RetryPolicy(logger=self.logger)
+        self.tracer = tracer or StageTracer(self.logger)
 
     def search_sight_id(self, keyword: str) -> Optional[str]:
         """根据关键词搜索景点ID
@@ -46,13 +58,18 @@ class SightId:
             }
 
             start_time = time.time()
-            response = requests.post(
-                self.search_url,
-                data=json.dumps(codedata), 
-                headers=self.headers
-            )
-            response.raise_for_status()
-            data_dict = response.json()
+            # 请求和解码由接口的熔断器保护，连续失败后直接返回None，不再请求
+            with self.retry_policy.circuit(self.search_url):
+                with self.tracer.span('fetch'):
+                    response = self.retry_policy.call(lambda: self.session.post(
+                        self.search_url,
+                        data=json.dumps(codedata), 
+                        headers=self.headers,
+                        timeout=10
+                    ), self.search_url)
+                response.raise_for_status()
+                with self.tracer.span('decode'):
+                    data_dict = response.json()
             end_time = time.time()
             response_time = end_time - start_time
 
@@ -1,23 +1,39 @@
-import requests
 import json
 import time
 import os
 from typing import List, Dict, Optional
 from log import CtripSpiderLogger
+from memory_budget import peak_rss_bytes
+from compressed_io import open_output
+from profiler import StageTracer
+from retry import RetryPolicy
 
 class CtripAttractionScraper:
     """携程景点数据爬取器，用于获取指定地区的景点信息"""
 
-    def __init__(self, timeout: int = 10, logger: CtripSpiderLogger = None):
+    def __init__(self, timeout: int = 10, logger: CtripSpiderLogger = None, tracer: StageTracer = None,
+                 session=None, archive=None, retry_policy: RetryPolicy = None):
         """初始化爬虫
 
         Args:
             timeout: 请求超时时间，默认为10秒
             logger: 日志记录器实例
+            tracer: 阶段计时器实例
+            session: 发送请求的会话（如 requests.Session 或录制/回放会话），默认为 requests 模块
+            archive: 原始响应归档库（RawArchive），为None时不归档
+            retry_policy: 请求重试策略
         """
         self.url = 'https://m.ctrip.com/restapi/soa2/13342/json/getSightRecreationList'
         self.timeout = timeout
+        if session is None:
+            # 延迟导入 requests，导入模块本身不加载网络库
+            import requests
+            session = requests
+        self.session = session
+        self.archive = archive
         self.logger = logger or CtripSpiderLogger("CtripAttractionScraper", "logs")
+        self.retry_policy = retry_policy or RetryPolicy(logger=self.logger)
+        self.tracer = tracer or StageTracer(self.logger)
     
     def get_attractions_list(self, district_id: int, page: int = 1, count: int = 20) -> List[Dict]:
         """获取某个地区的景点列表
@@ -28,27 +44,50 @@ class CtripAttractionScraper:
             count: 每页数量，默认为20
 
         Returns:
-            list: 景点信息列表，每个景点包含基本信息
+            list: 景点信息列表，每个景点包含基本信息；获取失败时为空列表
         """
-        self.logger.info(f"开始获取地区 {district_id} 的景点列表，第 {page} 页")
-        data = self._build_request_data(district_id, page, count)
+        return self.fetch_attractions_page(district_id, page, count) or []
 
-        try:
-            start_time = time.time()
-            response = requests.post(self.url, json=data, timeout=self.timeout)
-            end_time = time.time()
-            response_time = end_time - start_time
+    def fetch_attractions_page(self, district_id: int, page: int = 1, count: int = 20) -> Optional[List[Dict]]:
+        """获取某个地区的一页景点列表，区分获取失败和没有更多数据
 
-            if response.status_code != 200:
-                self.logger.log_error(f"请求失败，状态码: {response.status_code}", self.url, "POST")
-                return []
+        Args:
+            district_id: 地区ID
+            page: 页码，默认为1
+            count: 每页数量，默认为20
 
-            self.logger.log_request(self.url, response.status_code, response_time, "POST")
-            response_json = response.json()
+        Returns:
+            list: 景点信息列表，没有更多数据时为空列表；请求或解析失败时返回None
+        """
+        import requests
+        self.logger.log_detail(f"开始获取地区 {district_id} 的景点列表，第 {page} 页")
+        data = self._build_request_data(district_id, page, count)
 
-            if not response_json.get('result'):
-                self.logger.warning(f"第{page}页响应中未找到result字段")
-                return []
+        try:
+            start_time = time.time()
+            # 请求和解码由接口的熔断器保护，连续失败后直接返回None，不再请求
+            with self.retry_policy.circuit(self.url) as outcome:
+                with self.tracer.span('fetch'):
+                    response = self.retry_policy.call(
+                        lambda: self.session.post(self.url, json=data, timeout=self.timeout), self.url)
+                end_time = time.time()
+                response_time = end_time - start_time
+
+                if response.status_code != 200:
+                    self.logger.log_error(f"请求失败，状态码: {response.status_code}", self.url, "POST")
+                    outcome.fail()
+                    return None
+
+                self.logger.log_request(self.url, response.status_code, response_time, "POST")
+                if self.archive:
+                    self.archive.append('attractions', district_id, page, response.content, page_size=count)
+                with self.tracer.span('decode'):
+                    response_json = response.json()
+
+                if not response_json.get('result'):
+                    self.logger.warning(f"第{page}页响应中未找到result字段")
+                    outcome.fail()
+                    return None
 
             poi_list = response_json['result'].get('sightRecreationList', [])
 
@@ -57,24 +96,25 @@ class CtripAttractionScraper:
                 return []
 
             attractions = []
-            for poi in poi_list:
-                basic_info = self._parse_poi_basic_info(poi)
-                if basic_info:
-                    attractions.append(basic_info)
+            with self.tracer.span('parse'):
+                for poi in poi_list:
+                    basic_info = self._parse_poi_basic_info(poi)
+                    if basic_info:
+                        attractions.append(basic_info)
 
-            self.logger.info(f"第{page}页成功获取{len(attractions)}个景点")
+            self.logger.log_detail(f"第{page}页成功获取{len(attractions)}个景点")
             self.logger.log_data_extraction(len(attractions), "attractions")
             return attractions
 
         except requests.RequestException as e:
             self.logger.log_error(f"网络请求异常: {e}", self.url, "REQUEST_EXCEPTION")
-            return []
+            return None
         except json.JSONDecodeError as e:
             self.logger.log_error(f"JSON解析异常: {e}", self.url, "JSON_PARSE_ERROR")
-            return []
+            return None
         except Exception as e:
             self.logger.log_error(f"获取景点列表异常: {e}", self.url, "EXCEPTION")
-            return []
+            return None
     
     def _build_request_data(self, district_id: int, page: int, count: int) -> Dict:
         """构建请求数据
@@ -142,11 +182,11 @@ class CtripAttractionScraper:
                 'english_name': poi.get('eName', ''),
                 'id': poi.get('id', ''),
                 'poi_id': poi.get('poiId', ''),
-                'longitude': poi.get('coordInfo', {}).get('gDLat', ''),  # 经度
-                'latitude': poi.get('coordInfo', {}).get('gDLon', ''),   # 纬度
-                'tags': list(set(poi.get('resourceTags', []) + 
-                               poi.get('tagNameList', []) + 
-                               poi.get('themeTags', []))),
+                'longitude': poi.get('coordInfo', {}).get('gDLon', ''),  # 经度
+                'latitude': poi.get('coordInfo', {}).get('gDLat', ''),   # 纬度
+                'tags': sorted(set(poi.get('resourceTags', []) +
+                                   poi.get('tagNameList', []) +
+                                   poi.get('themeTags', []))),
                 'features': poi.get('shortFeatures', []),
                 'price': poi.get('price', 0),
                 'min_price': poi.get('displayMinPrice', 0),
@@ -170,37 +210,102 @@ class CtripAttractionScraper:
             self.logger.log_error(f"解析景点基本信息异常: {e}", "parse_poi_basic_info", "PARSING")
             return None
     
-    def get_attractions_with_pagination(self, district_id: int, pages: int = 1, 
-                                      count_per_page: int = 20) -> List[Dict]:
-        """获取多页景点数据
+    def iter_attractions(self, district_id: int, pages: int = 1, count_per_page: int = 20):
+        """逐页获取景点数据，以生成器方式逐条返回，内存中只保留当前页
 
         Args:
             district_id: 地区ID
             pages: 要获取的页数，默认为1
             count_per_page: 每页数量，默认为20
 
-        Returns:
-            list: 所有页的景点信息列表
+        Yields:
+            dict: 景点信息
         """
-        self.logger.info(f"开始获取地区 {district_id} 的多页景点数据，共 {pages} 页")
-        start_time = time.time()
-        all_attractions = []
-
         for page in range(1, pages + 1):
-            self.logger.info(f"正在获取第{page}页数据...")
-            attractions = self.get_attractions_list(district_id, page, count_per_page)
-
+            self.logger.log_detail(f"正在获取第{page}页数据...")
+            attractions = self.fetch_attractions_page(district_id, page, count_per_page)
             if not attractions:
                 self.logger.info(f"第{page}页没有数据，停止获取")
                 break
 
-            all_attractions.extend(attractions)
+            yield from attractions
             # 记录进度
             self.logger.log_progress(page, pages, "attraction list crawling")
 
+    def save_attractions_with_pagination(self, district_id: int, filename: str, pages: int = 1,
+                                         count_per_page: int = 20) -> int:
+        """获取多页景点数据并逐条写入JSON文件，内存中只保留当前页，适合全省等大规模爬取
+
+        Args:
+            district_id: 地区ID
+            filename: 保存的文件名
+            pages: 要获取的页数，默认为1
+            count_per_page: 每页数量，默认为20
+
+        Returns:
+            int: 写入的景点数
+        """
+        self.logger.info(f"开始获取地区 {district_id} 的多页景点数据并写入 {filename}，共 {pages} 页")
+        start_time = time.time()
+        count = self.save_to_json(self.iter_attractions(district_id, pages, count_per_page), filename)
+        self.logger.flush_summary()
+        self.logger.info(f"总共获取到{count}个景点，耗时: {time.time() - start_time:.2f}秒，"
+                         f"内存峰值 {peak_rss_bytes() / 1024 / 1024:.1f}MB")
+        self.tracer.report()
+        return count
+
+    def snapshot_attractions(self, district_id: int, store, pages: int = 1, count_per_page: int = 20):
+        """获取多页景点数据并记录到快照库，只写入相对上次的新增、修改和删除
+
+        任何一页获取失败时不记录快照，避免把没取到的景点误记为删除；只有取到空页（列表已经取完）时
+        才检测删除，页数用完而列表还没结束时，排在后面的景点不算删除。
+
+        Args:
+            district_id: 地区ID
+            store: 景点快照库（AttractionSnapshotStore）
+            pages: 要获取的页数，默认为1
+            count_per_page: 每页数量，默认为20
+
+        Returns:
+            dict: 快照统计（见 AttractionSnapshotStore.apply），失败时返回None
+        """
+        self.logger.info(f"开始获取地区 {district_id} 的景点列表快照，共 {pages} 页")
+        attractions, exhausted = [], False
+        for page in range(1, pages + 1):
+            page_attractions = self.fetch_attractions_page(district_id, page, count_per_page)
+            if page_attractions is None:
+                self.logger.error(f"景点列表快照未记录: 地区 {district_id} 第{page}页景点列表获取失败")
+                return None
+            if not page_attractions:
+                exhausted = True
+                break
+            attractions.extend(page_attractions)
+            self.logger.log_progress(page, pages, "attraction list crawling")
+        if not exhausted:
+            self.logger.info(f"地区 {district_id} 的景点列表在 {pages} 页内没有取完，本次不检测删除")
+        return store.apply(attractions, scope=str(district_id), detect_deletes=exhausted)
+
+    def get_attractions_with_pagination(self, district_id: int, pages: int = 1, 
+                                      count_per_page: int = 20) -> List[Dict]:
+        """获取多页景点数据，返回的列表包含所有景点；数据量大时使用 save_attractions_with_pagination 或 iter_attractions
+
+        Args:
+            district_id: 地区ID
+            pages: 要获取的页数，默认为1
+            count_per_page: 每页数量，默认为20
+
+        Returns:
+            list: 所有页的景点信息列表
+        """
+        self.logger.info(f"开始获取地区 {district_id} 的多页景点数据，共 {pages} 页")
+        start_time = time.time()
+        all_attractions = list(self.iter_attractions(district_id, pages, count_per_page))
+
         end_time = time.time()
+        self.logger.flush_summary()
         self.logger.info(f"总共获取到{len(all_attractions)}个景点，耗时: {end_time-start_time:.2f}秒")
         self.logger.log_data_extraction(len(all_attractions), "paginated_attractions")
+        self.tracer.report()
         return all_attractions
 
     def get_attraction_by_id(self, district_id: int, attraction_id: str, 
@@ -228,20 +333,62 @@ class CtripAttractionScraper:
         self.logger.warning(f"在地区{district_id}中未找到ID为{attraction_id}的景点")
         return None
 
-    def save_to_json(self, attractions: List[Dict], filename: str):
-        """将景点数据保存为JSON文件
+    def save_to_json(self, attractions, filename: str, compression_level: int = None):
+        """将景点数据保存为JSON文件，逐条写入，可直接传入 iter_attractions 的生成器而不必先收集成列表
 
         Args:
-            attractions: 景点数据列表
-            filename: 保存的文件名
+            attractions: 景点数据列表或可迭代对象
+            filename: 保存的文件名，以 .gz/.zst 结尾时流式压缩写入
+            compression_level: 压缩级别，默认见 compressed_io.DEFAULT_LEVELS
+
+        Returns:
+            int: 写入的记录数，失败时返回0
         """
         try:
-            with open(filename, 'w', encoding='utf-8') as f:
-                json.dump(attractions, f, ensure_ascii=False, indent=2)
-            self.logger.info(f"数据已保存到 {filename}，共 {len(attractions)} 条记录")
-            self.logger.log_data_extraction(len(attractions), "json_file")
+            with self.tracer.span('write'), JsonArrayWriter(filename, compression_level) as writer:
+                for attraction in attractions:
+                    writer.write(attraction)
+            self.logger.info(f"数据已保存到 {filename}，共 {writer.count} 条记录")
+            self.logger.log_data_extraction(writer.count, "json_file")
+            return writer.count
         except Exception as e:
             self.logger.log_error(f"保存文件失败: {e}", filename, "FILE_WRITE")
+            return 0
+
+
+class JsonArrayWriter:
+    """逐条写入JSON数组的文件写入器，输出格式与 json.dump(list, indent=2) 相同"""
+
+    def __init__(self, filename: str, compression_level: int = None):
+        """打开文件
+
+        Args:
+            filename: 文件名，以 .gz/.zst 结尾时流式压缩写入
+            compression_level: 压缩级别，默认见 compressed_io.DEFAULT_LEVELS
+        """
+        self.file = open_output(filename, 'w', level=compression_level)
+        self.count = 0
+
+    def write(self, record):
+        """写入一条记录
+
+        Args:
+            record: 可序列化为JSON的记录
+        """
+        text = json.dumps(record, ensure_ascii=False, indent=2).replace('\n', '\n  ')
+        self.file.write(('[\n  ' if self.count == 0 else ',\n  ') + text)
+        self.count += 1
+
+    def close(self):
+        """写入数组结尾并关闭文件"""
+        self.file.write('\n]' if self.count else '[]')
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
 
 
 # 使用示例
@@ -273,6 +420,8 @@ if __name__ == '__main__':
     
     # 示例3：保存数据到文件
     scraper.save_to_json(all_attractions, './attractions.json')
+    # 大规模爬取时边爬边写入文件，不在内存中保留全部景点
+    scraper.save_attractions_with_pagination(9, './attractions_stream.json', pages=2, count_per_page=3)
     
     # 示例4：根据ID查找景点
     if all_attractions:
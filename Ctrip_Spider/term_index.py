@@ -0,0 +1,349 @@
+import argparse
+import csv
+import hashlib
+import io
+import json
+import os
+import re
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from compressed_io import list_comment_files, open_binary_input
+from dataset_layout import SEGMENT_PREFIX
+from log import CtripSpiderLogger
+
+try:
+    import jieba
+except ImportError:
+    jieba = None
+
+# 不计入词频的常见虚词
+STOPWORDS = frozenset({
+    '的', '了', '是', '在', '我', '我们', '也', '都', '就', '和', '还', '有', '很', '这', '那', '一个', '没有',
+    '不', '去', '到', '说', '要', '会', '可以', '就是', '还是', '但是', '因为', '所以', '如果', '而且', '非常',
+    '比较', '一下', '一些', '这个', '那个', '什么', '自己', '他们', '你们', '时候', '感觉', '这里', '那里',
+})
+# 回退分词时，含有这些字的二元组不计入词频
+STOP_CHARS = frozenset('的了是在我也都就和还有很这那个们吧吗呢啊呀哦嗯着过被把给')
+_CJK_RUN = re.compile(r'[一-鿿]+|[A-Za-z][A-Za-z0-9]+')
+# 文件指纹取开头和已处理偏移之前各多少字节
+FINGERPRINT_BYTES = 256
+
+
+def tokenize(text: str) -> list:
+    """对评论分词：安装了 jieba 时使用 jieba 精确模式，否则对连续汉字取二元组
+
+    Args:
+        text: 评论内容
+
+    Returns:
+        list: 词语列表，已去除停用词和单字
+    """
+    if jieba is not None:
+        return [word for word in jieba.lcut(text) if len(word) > 1 and word not in STOPWORDS
+                and not word.isspace() and not word.isdigit()]
+    tokens = []
+    for run in _CJK_RUN.findall(text):
+        if run.isascii():
+            tokens.append(run.lower())
+            continue
+        for i in range(len(run) - 1):
+            gram = run[i:i + 2]
+            if gram not in STOPWORDS and not STOP_CHARS.intersection(gram):
+                tokens.append(gram)
+    return tokens
+
+
+def count_terms_batch(batch: list) -> dict:
+    """统计一批评论的词频，在工作进程中执行
+
+    Args:
+        batch: [(景点ID, 评论内容)]
+
+    Returns:
+        dict: {景点ID: Counter}
+    """
+    counts = {}
+    for poi_id, text in batch:
+        counts.setdefault(poi_id, Counter()).update(tokenize(text))
+    return counts
+
+
+class TermFrequencyIndex:
+    """增量词频索引：按 景点 → 城市 → 全局 三级维护可合并的词频计数，用于生成词云
+
+    评论CSV文件只追加写入，索引记录每个文件已处理到的（解压后的）字节偏移和指纹（文件开头及偏移前一段内容的哈希），
+    更新时只读取新追加的评论；文件变短或指纹变化（被重新爬取）时先从城市和全局计数中减去该景点的旧计数再重新统计。
+    评论目录可以是分区数据集（DatasetLayout），同一景点在更晚的日期分区出现新文件时同样视为重新爬取；
+    合并后的分段由已统计过的单景点文件组成，不再重复统计。压缩文件（.csv.gz/.csv.zst）不能按偏移跳转，
+    每次更新都要解压已处理的部分。
+    查询 top_terms 直接读取内存中的计数，不需要重新扫描语料。
+
+    目录结构:
+        state.json          文件偏移、指纹和景点所属城市
+        poi/<景点ID>.json    景点词频
+        city/<城市>.json     城市词频
+        global.json         全局词频
+    """
+
+    def __init__(self, index_dir: str, max_workers: int = 0, batch_size: int = 500,
+                 logger: CtripSpiderLogger = None):
+        """初始化索引，已存在的索引从目录加载
+
+        Args:
+            index_dir: 索引目录
+            max_workers: 分词进程数，0或1时在当前进程中分词
+            batch_size: 每批分词的评论数
+            logger: 日志记录器实例
+        """
+        self.index_dir = index_dir
+        self.max_workers = max_workers
+        self.batch_size = batch_size
+        self.logger = logger or CtripSpiderLogger("TermFrequencyIndex", "logs")
+        for sub_dir in ('poi', 'city'):
+            os.makedirs(os.path.join(index_dir, sub_dir), exist_ok=True)
+
+        state_path = os.path.join(index_dir, 'state.json')
+        state = {}
+        if os.path.exists(state_path):
+            with open(state_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        self.files = state.get('files', {})
+        self.poi_cities = state.get('poi_cities', {})
+        self.poi_terms = {name[:-5]: self._load_counter(os.path.join(index_dir, 'poi', name))
+                          for name in os.listdir(os.path.join(index_dir, 'poi')) if name.endswith('.json')}
+        self.city_terms = {name[:-5]: self._load_counter(os.path.join(index_dir, 'city', name))
+                           for name in os.listdir(os.path.join(index_dir, 'city')) if name.endswith('.json')}
+        self.global_terms = self._load_counter(os.path.join(index_dir, 'global.json'))
+        self._dirty = set()
+
+    @staticmethod
+    def _load_counter(path: str) -> Counter:
+        """从JSON文件加载词频"""
+        if not os.path.exists(path):
+            return Counter()
+        with open(path, 'r', encoding='utf-8') as f:
+            return Counter(json.load(f))
+
+    def observe_attractions(self, attractions: list):
+        """记录景点所属城市（景点列表爬虫的输出），已统计的景点词频同时计入城市词频
+
+        Args:
+            attractions: 景点信息列表，需包含 poi_id 和 city_name
+        """
+        for attraction in attractions:
+            poi_id, city = str(attraction.get('poi_id', '')), attraction.get('city_name')
+            if not poi_id or not city or self.poi_cities.get(poi_id) == city:
+                continue
+            terms = self.poi_terms.get(poi_id)
+            if terms:
+                old_city = self.poi_cities.get(poi_id)
+                if old_city:
+                    self._city(old_city).subtract(terms)
+                    self._dirty.add(('city', old_city))
+                self._city(city).update(terms)
+                self._dirty.add(('city', city))
+            self.poi_cities[poi_id] = city
+
+    def _city(self, city: str) -> Counter:
+        """获取城市词频"""
+        return self.city_terms.setdefault(city, Counter())
+
+    def update(self, comments_dir: str) -> int:
+        """统计评论目录中新追加的评论
+
+        Args:
+            comments_dir: 评论CSV目录（CtripCommentSpider 的输出目录，或分区数据集的根目录）
+
+        Returns:
+            int: 本次统计的评论数
+        """
+        start_time = time.time()
+        pending = []
+        for file_path in list_comment_files(comments_dir):
+            if not os.path.basename(file_path).startswith(SEGMENT_PREFIX):
+                pending.extend(self._read_new_comments(file_path, comments_dir))
+
+        batches = [pending[start:start + self.batch_size] for start in range(0, len(pending), self.batch_size)]
+        if self.max_workers and self.max_workers > 1 and len(batches) > 1:
+            with ProcessPoolExecutor(self.max_workers) as pool:
+                results = list(pool.map(count_terms_batch, batches))
+        else:
+            results = [count_terms_batch(batch) for batch in batches]
+        for counts in results:
+            for poi_id, terms in counts.items():
+                self._add(poi_id, terms)
+
+        self.save()
+        self.logger.info(f"词频索引更新完成: 新增 {len(pending)} 条评论，耗时 {time.time() - start_time:.2f}秒")
+        return len(pending)
+
+    @staticmethod
+    def _read_after(file_path: str, offset: int):
+        """读取文件偏移之后的内容，同时计算偏移之前内容的指纹
+
+        指纹为文件开头和偏移之前各 FINGERPRINT_BYTES 字节的哈希：只追加写入时这两段内容不变；
+        文件被重新爬取后，即使比原来更长，表头后的第一条评论和偏移处的评论也会不同。
+
+        Args:
+            file_path: 评论CSV文件路径（可以是压缩文件）
+            offset: 已处理到的字节偏移
+
+        Returns:
+            tuple: (开头, 偏移之前的一段, 偏移之后的数据)，文件比偏移短时返回 None
+        """
+        with open_binary_input(file_path) as f:
+            head = f.read(min(FINGERPRINT_BYTES, offset))
+            position = len(head)
+            tail_start = max(0, offset - FINGERPRINT_BYTES)
+            if tail_start > position:
+                if f.seekable():
+                    f.seek(tail_start)
+                else:
+                    while position < tail_start:
+                        chunk = f.read(min(tail_start - position, 1024 * 1024))
+                        if not chunk:
+                            return None
+                        position += len(chunk)
+                position = tail_start
+            tail = head[tail_start:] + f.read(offset - max(position, tail_start))
+            if len(tail) < offset - tail_start:
+                return None
+            return head, tail, f.read()
+
+    @staticmethod
+    def _fingerprint(head: bytes, tail: bytes) -> str:
+        """由文件开头和偏移之前的一段计算指纹"""
+        return hashlib.sha1(head + tail).hexdigest()
+
+    def _read_new_comments(self, file_path: str, comments_dir: str) -> list:
+        """读取评论文件中上次更新后追加的完整行
+
+        Args:
+            file_path: 评论CSV文件路径
+            comments_dir: 评论目录，文件按相对该目录的路径记录
+
+        Returns:
+            list: [(景点ID, 评论内容)]
+        """
+        key = os.path.relpath(file_path, comments_dir).replace(os.sep, '/')
+        record = self.files.get(key)
+        if record is None:
+            record = {'offset': 0, 'poi_id': None}
+            poi_id = os.path.basename(file_path).split('_', 1)[0]
+            for other_key, other in self.files.items():
+                if other['poi_id'] == poi_id and not other.get('superseded'):
+                    # 同一景点的新文件（更晚的日期分区）代替旧文件
+                    self.logger.info(f"{key} 代替了 {other_key}，重新统计景点 {poi_id}")
+                    self._reset(poi_id)
+                    other['superseded'] = True
+        elif record.get('superseded'):
+            return []
+
+        result = self._read_after(file_path, record['offset'])
+        if result is None or (record.get('fingerprint') and
+                              self._fingerprint(result[0], result[1]) != record['fingerprint']):
+            # 文件被重新初始化，撤销该景点的旧计数
+            self.logger.info(f"{key} 已被重新爬取，重新统计")
+            if record['poi_id']:
+                self._reset(record['poi_id'])
+            record = {'offset': 0, 'poi_id': None}
+            result = self._read_after(file_path, 0)
+        head, tail, data = result
+        self.files[key] = record
+
+        # 只处理完整的行，正在写入的半行留到下次
+        end = data.rfind(b'\n') + 1
+        if end == 0:
+            return []
+        text = data[:end].decode('utf-8-sig' if record['offset'] == 0 else 'utf-8', errors='replace')
+        rows = list(csv.reader(io.StringIO(text)))
+        if record['offset'] == 0 and rows:
+            rows = rows[1:]
+
+        comments = []
+        for row in rows:
+            if len(row) > 6:
+                record['poi_id'] = row[1]
+                comments.append((row[1], row[6]))
+        record['offset'] += end
+        record['fingerprint'] = self._fingerprint((head + data[:end])[:FINGERPRINT_BYTES],
+                                                  (tail + data[:end])[-FINGERPRINT_BYTES:])
+        return comments
+
+    def _add(self, poi_id: str, terms: Counter):
+        """把景点的新增词频合并到三级计数"""
+        self.poi_terms.setdefault(poi_id, Counter()).update(terms)
+        self.global_terms.update(terms)
+        self._dirty.add(('poi', poi_id))
+        city = self.poi_cities.get(poi_id)
+        if city:
+            self._city(city).update(terms)
+            self._dirty.add(('city', city))
+
+    def _reset(self, poi_id: str):
+        """从城市和全局计数中减去景点的词频并清空该景点"""
+        terms = self.poi_terms.pop(poi_id, Counter())
+        self.global_terms.subtract(terms)
+        city = self.poi_cities.get(poi_id)
+        if city:
+            self._city(city).subtract(terms)
+            self._dirty.add(('city', city))
+        self.poi_terms[poi_id] = Counter()
+        self._dirty.add(('poi', poi_id))
+
+    def top_terms(self, k: int = 50, poi_id=None, city: str = None) -> list:
+        """查询高频词，用于生成词云
+
+        Args:
+            k: 返回的词数
+            poi_id: 景点ID，指定时查询该景点
+            city: 城市名称，指定时查询该城市；都不指定时查询全局
+
+        Returns:
+            list: [(词语, 次数)]，按次数从高到低排列
+        """
+        if poi_id is not None:
+            terms = self.poi_terms.get(str(poi_id), Counter())
+        elif city is not None:
+            terms = self.city_terms.get(city, Counter())
+        else:
+            terms = self.global_terms
+        return [(term, count) for term, count in terms.most_common(k) if count > 0]
+
+    def save(self):
+        """保存状态和有变化的词频"""
+        for level, name in self._dirty:
+            counter = self.poi_terms[name] if level == 'poi' else self.city_terms[name]
+            self._write_counter(os.path.join(self.index_dir, level, f'{name}.json'), counter)
+        self._write_counter(os.path.join(self.index_dir, 'global.json'), self.global_terms)
+        self._dirty.clear()
+        with open(os.path.join(self.index_dir, 'state.json'), 'w', encoding='utf-8') as f:
+            json.dump({'files': self.files, 'poi_cities': self.poi_cities}, f, ensure_ascii=False)
+
+    @staticmethod
+    def _write_counter(path: str, counter: Counter):
+        """写入词频，去除计数为0的词"""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({term: count for term, count in counter.items() if count > 0}, f, ensure_ascii=False)
+
+
+# 使用示例：python term_index.py --comments ./Datasets --index ./Datasets/term_index --top 30
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="增量评论词频索引")
+    parser.add_argument('--comments', default='./Datasets', help="评论CSV目录")
+    parser.add_argument('--index', default='./Datasets/term_index', help="索引目录")
+    parser.add_argument('--attractions', help="景点列表JSON文件（save_to_json 的输出），用于按城市汇总")
+    parser.add_argument('--workers', type=int, default=0, help="分词进程数")
+    parser.add_argument('--top', type=int, default=30, help="输出的高频词数")
+    parser.add_argument('--poi', help="只输出该景点的高频词")
+    parser.add_argument('--city', help="只输出该城市的高频词")
+    options = parser.parse_args()
+
+    index = TermFrequencyIndex(options.index, max_workers=options.workers,
+                               logger=CtripSpiderLogger("TermIndexMain", "logs"))
+    if options.attractions:
+        with open(options.attractions, 'r', encoding='utf-8') as attractions_file:
+            index.observe_attractions(json.load(attractions_file))
+    index.update(options.comments)
+    print(json.dumps(index.top_terms(options.top, options.poi, options.city), ensure_ascii=False))
@@ -0,0 +1,9 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def _isolated_cwd(tmp_path, monkeypatch):
+    """
+    测试在临时目录中运行，组件默认写入的 logs 目录不会落到仓库中
+    """
+    monkeypatch.chdir(tmp_path)
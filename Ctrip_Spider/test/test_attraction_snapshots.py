@@ -0,0 +1,81 @@
+import sys
+import os
+import copy
+
+# 添加爬虫模块目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from attraction_snapshots import AttractionSnapshotStore, record_hash
+from mock_server import MockCtripServer
+from retry import RetryPolicy
+from sight_list import CtripAttractionScraper
+
+
+def test_snapshots_record_only_changes(tmp_path):
+    """
+    测试景点快照只记录新增、修改和删除，当前状态与最新抓取结果一致
+    """
+    store = AttractionSnapshotStore(str(tmp_path / 'attractions.db'))
+    with MockCtripServer(total_attractions=45) as server:
+        scraper = CtripAttractionScraper()
+        scraper.url = server.url('getSightRecreationList')
+        first = scraper.snapshot_attractions(9, store, pages=5, count_per_page=20)
+        attractions = scraper.get_attractions_with_pagination(9, pages=5, count_per_page=20)
+        assert scraper.snapshot_attractions(9, store, pages=5, count_per_page=20)['unchanged'] == 45
+    assert first['inserted'] == 45
+
+    changed = copy.deepcopy(attractions)
+    changed[0]['price'] = 99.0
+    changed[1]['review_count'] = changed[1]['review_count'] + 1
+    # 规范化后相同的记录不算修改
+    changed[2]['name'] = ' ' + changed[2]['name'] + ' '
+    removed = changed.pop()
+    changed.append(dict(changed[3], poi_id=123456789, name='新景点'))
+    stats = store.apply(changed, scope='9')
+    assert (stats['inserted'], stats['updated'], stats['deleted'], stats['unchanged']) == (1, 2, 1, 42)
+
+    changes = list(store.changes_since(first['snapshot_id']))
+    assert {(change['op'], change['poi_id']) for change in changes} == {
+        ('update', str(changed[0]['poi_id'])), ('update', str(changed[1]['poi_id'])),
+        ('insert', '123456789'), ('delete', str(removed['poi_id']))}
+    assert next(change for change in changes if change['op'] == 'delete')['record'] == removed
+
+    current = {str(record['poi_id']): record for record in store.current(scope='9')}
+    assert len(current) == 45 and str(removed['poi_id']) not in current
+    assert current[str(changed[0]['poi_id'])]['price'] == 99.0
+    assert [snapshot['inserted'] for snapshot in store.snapshots()] == [45, 0, 1]
+
+    # 抓取失败时不记录快照，景点不会被误记为删除
+    with MockCtripServer(total_attractions=45, error_rate=1.0) as server:
+        scraper = CtripAttractionScraper(retry_policy=RetryPolicy(max_attempts=1))
+        scraper.url = server.url('getSightRecreationList')
+        assert scraper.snapshot_attractions(9, store, pages=5, count_per_page=20) is None
+    assert len(store.snapshots()) == 3
+    assert len(list(store.current())) == 45
+
+
+def test_snapshot_stability_and_partial_lists(tmp_path):
+    """
+    测试标签顺序不影响哈希、抓取期间不占用写锁，页数用完而列表未取完时不检测删除
+    """
+    store = AttractionSnapshotStore(str(tmp_path / 'attractions.db'))
+    assert record_hash({'poi_id': 1, 'tags': ['海滨', '公园']}) == record_hash({'poi_id': 1, 'tags': ['公园', '海滨']})
+
+    other = AttractionSnapshotStore(str(tmp_path / 'attractions.db'))
+
+    def attractions():
+        yield {'poi_id': 1, 'name': '星海广场'}
+        # 抓取过程中其他写入方可以写入
+        other.apply([{'poi_id': 2, 'name': '老虎滩'}], scope='other')
+        yield {'poi_id': 3, 'name': '棒棰岛'}
+    assert store.apply(attractions(), scope='9')['inserted'] == 2
+
+    with MockCtripServer(total_attractions=45) as server:
+        scraper = CtripAttractionScraper()
+        scraper.url = server.url('getSightRecreationList')
+        full = scraper.snapshot_attractions(9, store, pages=5, count_per_page=20)
+        assert full['deleted'] == 2 and full['inserted'] == 45
+        assert all(record['tags'] == sorted(record['tags']) for record in store.current(scope='9'))
+        partial = scraper.snapshot_attractions(9, store, pages=2, count_per_page=20)
+    assert (partial['deleted'], partial['unchanged']) == (0, 45)
+    assert len(list(store.current(scope='9'))) == 45
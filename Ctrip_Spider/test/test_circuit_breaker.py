@@ -0,0 +1,154 @@
+import sys
+import os
+import threading
+
+# 添加爬虫模块目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import pytest
+
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitBreakerRegistry, CircuitOpenError
+from mock_server import MockCtripServer
+from retry import RequestBudgetExhausted, RetryPolicy
+from sight_comments import CtripCommentSpider
+from sight_detail import AttractionDetailFetcher
+from sight_list import CtripAttractionScraper
+
+
+class HtmlResponse:
+    status_code = 200
+    content = b'<html>busy</html>'
+
+
+class HtmlSession:
+    """返回200但不是JSON的响应（如限流页面）"""
+
+    def __init__(self):
+        self.post_count = 0
+
+    def post(self, *args, **kwargs):
+        self.post_count += 1
+        return HtmlResponse()
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_breaker_state_transitions():
+    """
+    测试连续失败后熔断，冷却后只放行限定数量的探测请求，探测成功恢复、失败重新熔断
+    """
+    clock = FakeClock()
+    breaker = CircuitBreaker('api', failure_threshold=3, cooldown=10, half_open_max_calls=1, clock=clock)
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    clock.now = 10
+    assert breaker.state == HALF_OPEN
+    breaker.before_call()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+
+    clock.now = 20
+    breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    breaker.before_call()
+    assert breaker.stats() == {'state': CLOSED, 'failures': 0, 'open_count': 2, 'rejected_count': 2}
+
+
+def test_breaker_shared_across_threads():
+    """
+    测试多个线程共享熔断器时失败计数不丢失
+    """
+    breaker = CircuitBreaker('api', failure_threshold=400)
+    threads = [threading.Thread(target=lambda: [breaker.record_failure() for _ in range(100)]) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert breaker.state == OPEN and breaker.open_count == 1
+
+
+def test_open_circuit_fails_fast_and_recovers():
+    """
+    测试接口持续出错时熔断后不再发送请求，其他接口不受影响，冷却后探测成功即恢复
+    """
+    clock = FakeClock()
+    registry = CircuitBreakerRegistry(failure_threshold=3, cooldown=30, clock=clock)
+    policy = RetryPolicy(max_attempts=3, base_delay=0, circuit_breakers=registry)
+    with MockCtripServer(total_attractions=45, error_rate=1.0) as server:
+        fetcher = AttractionDetailFetcher(retry_policy=policy, max_workers=4)
+        fetcher.detail_url = server.url('getPoiMoreDetail')
+        scraper = CtripAttractionScraper(retry_policy=policy)
+        scraper.url = server.url('getSightRecreationList')
+
+        results = dict(fetcher.get_details(range(1, 21)))
+        assert not any(detail['success'] for detail in results.values())
+        # 熔断后剩余的景点直接失败，不再请求（并发中的请求最多各自完成重试）
+        sent = server.request_counts['getPoiMoreDetail']
+        assert sent < 20
+        assert registry.for_url(fetcher.detail_url).state == OPEN
+        assert fetcher.get_detail(21)['success'] is False
+        assert server.request_counts['getPoiMoreDetail'] == sent
+
+        # 列表接口有独立的熔断器
+        assert registry.for_url(scraper.url).state == CLOSED
+        server.error_rate = 0
+        assert len(scraper.fetch_attractions_page(9, 1, 20)) == 20
+
+        clock.now = 30
+        assert fetcher.get_detail(1)['success'] is True
+        assert registry.for_url(fetcher.detail_url).state == CLOSED
+        assert server.request_counts['getPoiMoreDetail'] == sent + 1
+    stats = registry.stats()[registry.endpoint(fetcher.detail_url)]
+    assert stats['open_count'] == 1 and stats['rejected_count'] >= 1
+
+
+def test_non_json_comment_pages_open_circuit(tmp_path):
+    """
+    测试评论接口返回200但不是JSON时计为失败，熔断后不再请求
+    """
+    registry = CircuitBreakerRegistry(failure_threshold=3, cooldown=30, clock=FakeClock())
+    session = HtmlSession()
+    spider = CtripCommentSpider(str(tmp_path), page_delay=0, session=session,
+                                retry_policy=RetryPolicy(max_attempts=1, circuit_breakers=registry))
+    for page in range(1, 6):
+        assert spider._get_page_comments('76865', page) is None
+    assert registry.for_url(spider.post_url).state == OPEN
+    assert session.post_count == 3
+
+
+def test_control_flow_exceptions_are_not_failures():
+    """
+    测试请求预算用完不计入接口失败，half_open 状态的探测名额会归还
+    """
+    clock = FakeClock()
+    registry = CircuitBreakerRegistry(failure_threshold=1, cooldown=10, clock=clock)
+    policy = RetryPolicy(max_attempts=1, circuit_breakers=registry)
+    breaker = registry.for_url('http://api/x')
+    breaker.record_failure()
+    clock.now = 10
+    for _ in range(3):
+        with pytest.raises(RequestBudgetExhausted):
+            with policy.request_budget(0), policy.circuit('http://api/x'):
+                policy.call(lambda: None, 'http://api/x')
+    assert breaker.state == HALF_OPEN
+    with policy.circuit('http://api/x'):
+        pass
+    assert breaker.state == CLOSED
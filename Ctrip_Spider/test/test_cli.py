@@ -0,0 +1,58 @@
+import sys
+import os
+import subprocess
+
+# 添加爬虫模块目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from cli import build_parser, main
+
+SPIDER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+# 导入命令行入口的时间预算（微秒），由 -X importtime 测量
+IMPORT_BUDGET_US = 50000
+
+
+def import_times(code: str) -> dict:
+    """在新的解释器中用 -X importtime 运行代码，返回 {模块名: 累计导入耗时（微秒）}"""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=SPIDER_DIR,
+                            capture_output=True, text=True, check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if line.startswith('import time:') and '|' in line:
+            _, cumulative, name = line.split('|')
+            if cumulative.strip().isdigit():
+                times[name.strip()] = int(cumulative)
+    return times
+
+
+def test_cli_import_budget():
+    """
+    测试命令行入口在导入时间预算内，并且不加载 requests 和 bs4
+    """
+    times = import_times("import cli")
+    assert times['cli'] < IMPORT_BUDGET_US
+    assert 'requests' not in times and 'bs4' not in times
+
+    # 子命令的 --help 不需要导入任何爬虫模块
+    times = import_times("import cli\ntry:\n    cli.main(['pipeline', '--help'])\nexcept SystemExit:\n    pass")
+    assert not {'requests', 'bs4', 'log', 'pipeline', 'sight_comments'} & times.keys()
+
+
+def test_spider_modules_import_network_lazily():
+    """
+    测试导入爬虫模块时不加载 requests 和 bs4，创建实例时才加载
+    """
+    times = import_times("import retry, sight_id, sight_list, sight_detail, sight_comments, pipeline")
+    assert 'requests' not in times and 'bs4' not in times
+
+
+def test_cli_arguments():
+    """
+    测试子命令参数解析
+    """
+    options = build_parser().parse_args(['comments', '--poi', '76865', '星海广场', '--poi', '75628', '棒棰岛',
+                                         '--compression', 'gzip'])
+    assert options.poi == [['76865', '星海广场'], ['75628', '棒棰岛']]
+    assert options.compression == 'gzip' and options.max_pages == 100
+    assert build_parser().parse_args(['detail', '1', '2']).poi_ids == [1, 2]
+    assert main(['comments']) == 2
@@ -0,0 +1,110 @@
+import sys
+import os
+import csv
+import gzip
+import json
+
+# 添加爬虫模块目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from compressed_io import is_comment_file, list_comment_files, open_input, open_output
+from dataset_layout import DatasetLayout
+from mock_server import MockCtripServer
+from rating_aggregates import RatingAggregateStore
+from sentiment import SentimentAnalyzer
+from sight_comments import CtripCommentSpider
+from sight_list import CtripAttractionScraper
+from term_index import TermFrequencyIndex
+
+
+def test_gzip_comment_csv_against_mock_server(tmp_path):
+    """
+    测试评论CSV压缩写入后可用 gzip 直接解压，且断点续爬能读出已保存的评论
+    """
+    with MockCtripServer(total_comments=30) as server:
+        spider = CtripCommentSpider(str(tmp_path), page_delay=0, poi_delay=0, compression='gzip')
+        spider.post_url = server.url('getCommentCollapseList')
+        assert spider.crawl_comments('76865', '星海广场', max_pages=3)
+
+        file_path = tmp_path / '76865_星海广场.csv.gz'
+        with gzip.open(file_path, 'rt', encoding='utf-8-sig', newline='') as f:
+            rows = list(csv.reader(f))
+        assert rows[0] == CtripCommentSpider.CSV_HEADER
+        assert len(rows) == 31 and len({row[3] for row in rows[1:]}) == 30
+        # 追加的成员不能带BOM
+        assert not any(row[0].startswith('﻿') for row in rows[1:])
+        assert len(spider._get_saved_comment_ids(str(file_path))) == 30
+        assert spider._get_current_index(str(file_path)) == 30
+
+
+def test_truncated_gzip_file_stays_readable(tmp_path):
+    """
+    测试压缩块刷新后，文件被截断（进程中途退出）时刷新前写入的数据仍可读出
+    """
+    path = str(tmp_path / 'lines.txt.gz')
+    lines = [f"第{i}行：景色很美，值得一去\n" for i in range(1000)]
+    with open_output(path, flush_bytes=4096) as f:
+        f.writelines(lines[:500])
+        f.flush()
+        f.buffer.raw.flush_block()
+        flushed_size = os.path.getsize(path)
+        f.writelines(lines[500:])
+
+    with open(path, 'rb') as f:
+        data = f.read()
+    with open(path, 'wb') as f:
+        f.write(data[:flushed_size])
+    with open_input(path) as f:
+        assert f.readlines() == lines[:500]
+
+
+def test_save_to_json_compressed(tmp_path):
+    """
+    测试 save_to_json 按扩展名压缩写入，内容与未压缩时相同
+    """
+    scraper = CtripAttractionScraper()
+    records = [{'poi_id': i, 'name': f'景点{i}'} for i in range(100)]
+    assert scraper.save_to_json(iter(records), str(tmp_path / 'attractions.json.gz'), compression_level=9) == 100
+    with gzip.open(tmp_path / 'attractions.json.gz', 'rt', encoding='utf-8') as f:
+        assert json.load(f) == records
+
+
+def test_compressed_partitioned_files_are_readable(tmp_path):
+    """
+    测试压缩的分区评论文件能被数据集裁剪、合并、词频索引、情感分析和评分汇总读取
+    """
+    assert is_comment_file('1_海滩.csv.gz') and is_comment_file('1_海滩.csv.zst')
+    assert not is_comment_file('sentiment_scores.csv') and not is_comment_file('crawl_reports.jsonl')
+    root = tmp_path / 'comments'
+    layout = DatasetLayout(str(root), crawl_date='2024-05-01')
+    layout.observe_attractions([{'poi_id': 1, 'province_name': '辽宁', 'city_name': '大连'},
+                                {'poi_id': 2, 'province_name': '辽宁', 'city_name': '大连'}])
+    with MockCtripServer(total_comments=25) as server:
+        spider = CtripCommentSpider(str(tmp_path / 'output'), page_delay=0, poi_delay=0, layout=layout,
+                                    compression='gzip')
+        spider.post_url = server.url('getCommentCollapseList')
+        spider.crawl_multiple_pois([('1', '星海广场'), ('2', '棒棰岛')])
+
+    files = layout.select_files(poi_ids=['1'])
+    assert [os.path.basename(path) for path in files] == ['1_星海广场.csv.gz']
+    assert len(list_comment_files(str(root))) == 2
+
+    index = TermFrequencyIndex(str(tmp_path / 'index'))
+    assert index.update(str(root)) == 50
+    assert index.update(str(root)) == 0
+    # 追加的压缩成员只统计新增部分
+    with open_output(files[0], 'a', encoding='utf-8-sig', newline='') as f:
+        comment = {'commentId': 999, 'userNick': '游客', 'score': 5, 'content': '日落很美', 'publishTime': '2024-01-01',
+                   'usefulCount': 0, 'replyCount': 0, 'touristTypeDisplay': '', 'ipLocatedName': '',
+                   'timeDuration': '', 'imageCount': 0, 'imageUrls': [], 'sceneryScore': '', 'funScore': '',
+                   'valueScore': '', 'recommendItems': []}
+        CtripCommentSpider._write_comment_rows(f, [comment], '1', '星海广场', 25)
+    assert index.update(str(root)) == 1
+
+    summary = SentimentAnalyzer(str(tmp_path / 'cache.jsonl')).analyze_directory(str(root), str(tmp_path / 'out'))
+    assert summary['1']['count'] == 26 and summary['2']['count'] == 25
+    store = RatingAggregateStore(str(tmp_path / 'ratings.db'))
+    assert store.backfill(list_comment_files(str(root))) == 51
+
+    assert layout.compact(min_age=0) == {'segments': 1, 'files': 2, 'rows': 51}
+    assert len(layout.select_files(poi_ids=['2'])) == 1
@@ -0,0 +1,86 @@
+import sys
+import os
+import csv
+
+# 添加爬虫模块目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from dataset_layout import DatasetLayout
+from mock_server import MockCtripServer
+from sight_comments import CtripCommentSpider
+
+
+def count_rows(files, poi_id=None):
+    """统计CSV文件中的评论行数"""
+    total = 0
+    for path in files:
+        with open(path, newline='', encoding='utf-8-sig') as f:
+            total += sum(1 for row in list(csv.reader(f))[1:] if poi_id is None or row[1] == poi_id)
+    return total
+
+
+def test_partitioned_crawl_and_compaction(tmp_path):
+    """
+    测试评论按城市和日期分区写入，合并小文件后清单可用于裁剪且评论不丢失
+    """
+    layout = DatasetLayout(str(tmp_path / 'comments'), crawl_date='2024-05-01')
+    layout.observe_attractions([
+        {'poi_id': 1, 'province_name': '辽宁', 'city_name': '大连'},
+        {'poi_id': 2, 'province_name': '辽宁', 'city_name': '大连'},
+        {'poi_id': 3, 'province_name': '辽宁', 'city_name': '大连'},
+        {'poi_id': 4, 'province_name': '海南', 'city_name': '三亚'},
+    ])
+    with MockCtripServer(total_comments=25) as server:
+        spider = CtripCommentSpider(str(tmp_path / 'output'), page_delay=0, poi_delay=0, layout=layout)
+        spider.post_url = server.url('getCommentCollapseList')
+        spider.crawl_multiple_pois([('1', '星海广场'), ('2', '棒棰岛'), ('3', '老虎滩'), ('4', '天涯海角')])
+
+    dalian = tmp_path / 'comments' / 'province=辽宁' / 'city=大连' / 'date=2024-05-01'
+    assert sorted(os.listdir(dalian)) == ['1_星海广场.csv', '2_棒棰岛.csv', '3_老虎滩.csv']
+    assert count_rows(layout.select_files()) == 100
+
+    stats = layout.compact(min_age=0)
+    assert stats == {'segments': 1, 'files': 3, 'rows': 75}
+    assert os.listdir(dalian) == ['segment-00000.csv']
+    # 三亚只有一个文件，不需要合并
+    assert len(layout.select_files(city='三亚')) == 1
+
+    reopened = DatasetLayout(str(tmp_path / 'comments'))
+    segment = reopened.manifest['segments'][0]
+    assert segment['pois'] == ['1', '2', '3'] and segment['rows'] == 75
+    assert reopened.select_files(poi_ids=['2']) == [str(dalian / 'segment-00000.csv')]
+    assert count_rows(reopened.select_files(poi_ids=['2']), '2') == 25
+    assert reopened.select_files(date_from='2024-06-01') == []
+    assert count_rows(reopened.select_files(province='辽宁')) == 75
+    assert reopened.compact(min_age=0)['segments'] == 0
+
+
+def test_recrawl_replaces_compacted_comments(tmp_path):
+    """
+    测试合并后重新爬取景点不会丢失新文件，也不会与分段中的旧评论重复，跨日期分区同样适用
+    """
+    layout = DatasetLayout(str(tmp_path / 'comments'), crawl_date='2024-05-01')
+    layout.observe_attractions([{'poi_id': 1, 'province_name': '辽宁', 'city_name': '大连'},
+                                {'poi_id': 2, 'province_name': '辽宁', 'city_name': '大连'}])
+    dalian = tmp_path / 'comments' / 'province=辽宁' / 'city=大连'
+    with MockCtripServer(total_comments=25) as server:
+        spider = CtripCommentSpider(str(tmp_path / 'output'), page_delay=0, poi_delay=0, layout=layout)
+        spider.post_url = server.url('getCommentCollapseList')
+        spider.crawl_multiple_pois([('1', '星海广场'), ('2', '棒棰岛')])
+        assert layout.compact(min_age=0)['segments'] == 1
+
+        # 同一天重新爬取：分段中的旧评论被移除，新文件不会被当作已合并的源文件删除
+        server.total_comments = 30
+        spider.crawl_multiple_pois([('1', '星海广场')])
+        assert count_rows(layout.select_files()) == 55
+        assert layout.compact(min_age=0, small_file_bytes=0)['segments'] == 0
+        assert os.path.exists(dalian / 'date=2024-05-01' / '1_星海广场.csv')
+        assert count_rows(layout.select_files(), '1') == 30
+
+        # 之后的日期重新爬取：旧日期分区中的文件和分段中的评论都被代替
+        later = DatasetLayout(str(tmp_path / 'comments'), crawl_date='2024-06-01')
+        spider.layout = later
+        spider.crawl_multiple_pois([('1', '星海广场'), ('2', '棒棰岛')])
+    assert count_rows(later.select_files()) == 60
+    assert os.listdir(dalian / 'date=2024-05-01') == []
+    assert later.manifest['segments'] == []
@@ -0,0 +1,65 @@
+import sys
+import os
+import csv
+
+# 添加爬虫模块目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from mock_server import MockCtripServer
+from retry import RetryPolicy
+from sight_comments import CtripCommentSpider
+
+
+def read_comment_ids(file_path):
+    with open(file_path, encoding='utf-8-sig') as f:
+        return [row[3] for row in list(csv.reader(f))[1:]]
+
+
+def test_failed_pages_go_to_dead_letter_and_replay(tmp_path):
+    """
+    测试失败页面重新排队后仍失败时写入死信文件，并可在之后只补爬这些页面
+    """
+    with MockCtripServer(total_comments=200, error_rate=0.4, seed=0) as server:
+        spider = CtripCommentSpider(str(tmp_path), page_delay=0, poi_delay=0, requeue_rounds=1, page_size=10,
+                                    retry_policy=RetryPolicy(max_attempts=1))
+        spider.post_url = server.url('getCommentCollapseList')
+        results = spider.crawl_multiple_pois([['76865', '星海广场']], max_pages=20)
+
+        report = results['星海广场(76865)']
+        assert not report['success']
+        assert report['failed_pages']
+        assert report['completeness'] == report['crawled_pages'] / report['total_pages']
+        dead_pages = spider.dead_letters.group_by_poi()['76865']['pages']
+        assert dead_pages == sorted(report['failed_pages'])
+
+        # 服务恢复后只补爬死信中的页面
+        server.error_rate = 0
+        requests_before = server.request_counts['getCommentCollapseList']
+        replayed = spider.replay_dead_letters()
+        assert server.request_counts['getCommentCollapseList'] - requests_before == len(dead_pages)
+        assert replayed['星海广场(76865)']['failed_pages'] == []
+
+    assert len(spider.dead_letters) == 0
+    comment_ids = read_comment_ids(tmp_path / '76865_星海广场.csv')
+    assert len(comment_ids) == len(set(comment_ids)) == 200
+
+
+def test_recrawl_purges_stale_dead_letters(tmp_path):
+    """
+    测试重新爬取景点时删除过期的死信记录，补爬不筛选的页面时也按commentId去重
+    """
+    with MockCtripServer(total_comments=30) as server:
+        spider = CtripCommentSpider(str(tmp_path), page_delay=0, poi_delay=0, page_size=10)
+        spider.post_url = server.url('getCommentCollapseList')
+        spider.dead_letters.add('76865', '星海广场', 2, "超时", page_size=10)
+        spider.dead_letters.add('75628', '棒棰岛', 3, "超时", page_size=10)
+        assert spider.crawl_poi('76865', '星海广场')['success']
+        assert list(spider.dead_letters.group_by_poi()) == ['75628']
+
+        # 其他进程留下的死信（页面实际已保存）补爬时不会重复写入
+        spider.dead_letters.rewrite([])
+        spider.dead_letters.add('76865', '星海广场', 2, "超时", page_size=10)
+        assert spider.replay_dead_letters()['星海广场(76865)']['recovered_pages'] == [2]
+
+    comment_ids = read_comment_ids(tmp_path / '76865_星海广场.csv')
+    assert len(comment_ids) == len(set(comment_ids)) == 30
@@ -0,0 +1,131 @@
+import sys
+import os
+import csv
+import json
+import threading
+import time
+
+# 添加爬虫模块目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from frontier import CrawlFrontier, FrontierWorker, build_ctrip_handlers
+from mock_server import MockCtripServer
+from sight_comments import CtripCommentSpider
+from sight_detail import AttractionDetailFetcher
+from sight_list import CtripAttractionScraper
+
+
+def test_frontier_leases(tmp_path):
+    """
+    测试任务领取、租约过期后重新分配、心跳续租和失败重试
+    """
+    frontier = CrawlFrontier(str(tmp_path / 'frontier.db'), lease_seconds=0.2, max_attempts=2)
+    assert frontier.add('detail', '1', {'poi_id': 1})
+    assert not frontier.add('detail', '1', {'poi_id': 1})
+    assert frontier.add_many([('detail', '2', {'poi_id': 2}), ('detail', '3', {'poi_id': 3}, 10)]) == 2
+
+    # 优先级高的任务先被领取，已领取的任务不会被重复领取
+    first = frontier.claim('worker-a', limit=2)
+    assert [task['task_key'] for task in first] == ['3', '1']
+    second = frontier.claim('worker-b', limit=5)
+    assert [task['task_key'] for task in second] == ['2']
+
+    # worker-a 持续续租任务3，任务1的租约过期后被 worker-b 接管
+    time.sleep(0.1)
+    assert frontier.heartbeat('worker-a', [first[0]['id']]) == [first[0]['id']]
+    assert frontier.heartbeat('worker-b', [second[0]['id']]) == [second[0]['id']]
+    time.sleep(0.15)
+    taken = frontier.claim('worker-b', limit=5)
+    assert [task['task_key'] for task in taken] == ['1']
+    assert not frontier.complete('worker-a', first[1]['id'])
+    assert frontier.complete('worker-b', taken[0]['id'])
+    assert frontier.complete('worker-a', first[0]['id'])
+
+    # 任务2第一次失败后放回队列，第二次失败后尝试次数用尽
+    assert frontier.fail('worker-b', second[0]['id'], '超时')
+    assert frontier.fail('worker-b', frontier.claim('worker-b')[0]['id'], '超时')
+    assert frontier.claim('worker-b') == []
+    assert frontier.stats() == {'detail': {'done': 2, 'dead': 1}}
+    assert frontier.dead_tasks()[0]['last_error'] == '超时'
+    assert not frontier.has_unfinished()
+
+
+def test_frontier_workers_against_mock_server(tmp_path):
+    """
+    测试多个工作者从地区列表任务出发，派生并完成详情和评论页任务
+    """
+    frontier = CrawlFrontier(str(tmp_path / 'frontier.db'), lease_seconds=5)
+    frontier.add('district_page', '9:1', {'district_id': 9, 'page': 1, 'count': 2, 'max_pages': 2})
+
+    with MockCtripServer(total_attractions=3, total_comments=25) as server:
+        workers = []
+        for index in range(3):
+            scraper = CtripAttractionScraper()
+            scraper.url = server.url('getSightRecreationList')
+            fetcher = AttractionDetailFetcher()
+            fetcher.detail_url = server.url('getPoiMoreDetail')
+            spider = CtripCommentSpider(str(tmp_path / 'comments'), page_delay=0, poi_delay=0, page_size=10)
+            spider.post_url = server.url('getCommentCollapseList')
+            handlers = build_ctrip_handlers(str(tmp_path), scraper=scraper, detail_fetcher=fetcher,
+                                            comment_spider=spider)
+            workers.append(FrontierWorker(frontier, handlers, worker_id=f"worker-{index}", idle_sleep=0.05))
+
+        threads = [threading.Thread(target=worker.run) for worker in workers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=60)
+
+    stats = frontier.stats()
+    assert stats['district_page'] == {'done': 2}
+    assert stats['detail'] == {'done': 3}
+    assert stats['comment_page'] == {'done': 9}
+    assert sum(worker.processed for worker in workers) == 14
+
+    with open(tmp_path / 'details.jsonl', encoding='utf-8') as f:
+        assert len([json.loads(line) for line in f]) == 3
+    csv_files = [name for name in os.listdir(tmp_path / 'comments') if name.endswith('.csv')]
+    assert len(csv_files) == 3
+    for name in csv_files:
+        with open(tmp_path / 'comments' / name, encoding='utf-8-sig') as f:
+            rows = list(csv.reader(f))
+        assert len(rows) == 26
+        assert sorted(int(row[0]) for row in rows[1:]) == list(range(25))
+
+
+def test_comment_first_page_does_not_truncate(tmp_path):
+    """
+    测试评论首页任务重新执行时不会截断其他页面已写入的评论，也不会重复写入
+    """
+    frontier = CrawlFrontier(str(tmp_path / 'frontier.db'))
+    with MockCtripServer(total_comments=25) as server:
+        spider = CtripCommentSpider(str(tmp_path / 'comments'), page_delay=0, poi_delay=0, page_size=10)
+        spider.post_url = server.url('getCommentCollapseList')
+        handlers = build_ctrip_handlers(str(tmp_path), comment_spider=spider)
+        payload = {'poi_id': 76865, 'poi_name': '星海广场', 'page': 1, 'page_size': None}
+        handlers['comment_page'](payload, frontier)
+        assert frontier.stats()['comment_page'] == {'pending': 2}
+        handlers['comment_page'](dict(payload, page=2, page_size=10), frontier)
+        # 首页任务租约过期后被其他工作者重新执行
+        handlers['comment_page'](payload, frontier)
+
+    file_path = spider._csv_path('76865', '星海广场')
+    with open(file_path, 'rb') as f:
+        assert f.read().count(b'\xef\xbb\xbf') == 1
+    with open(file_path, encoding='utf-8-sig') as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == CtripCommentSpider.CSV_HEADER
+    assert [int(row[0]) for row in rows[1:]] == list(range(20))
+    assert len({row[3] for row in rows[1:]}) == 20
+
+
+def test_delete_journal_mode(tmp_path):
+    """
+    测试多台机器共享时使用的 DELETE 日志模式
+    """
+    frontier = CrawlFrontier(str(tmp_path / 'frontier.db'), journal_mode='delete')
+    assert frontier.add('detail', '1', {'poi_id': 1})
+    assert [task['task_key'] for task in frontier.claim('worker-1')] == ['1']
+    with frontier._connect() as conn:
+        assert conn.execute('PRAGMA journal_mode').fetchone()[0] == 'delete'
+    assert not os.path.exists(str(tmp_path / 'frontier.db-wal'))
@@ -0,0 +1,60 @@
+import sys
+import os
+import time
+
+import numpy as np
+
+# 添加爬虫模块目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from geo import GeoIndex, extract_coordinates, haversine_km
+from mock_server import MockCtripServer
+from sight_list import CtripAttractionScraper
+
+
+def test_radius_and_nearest_match_brute_force():
+    """
+    测试10万个景点上的范围查询和最近邻查询与逐点计算的结果一致，且单次查询在毫秒级
+    """
+    rng = np.random.default_rng(7)
+    lats = rng.uniform(38.5, 39.5, 100000)
+    lons = rng.uniform(121.0, 122.5, 100000)
+    index = GeoIndex(list(range(100000)), lats, lons, cell_km=2.0)
+
+    centers = [(38.9, 121.6), (39.45, 122.45), (38.5, 121.0)]
+    for lat, lon in centers:
+        distances = haversine_km(lat, lon, lats, lons)
+        expected = set(np.nonzero(distances <= 3.0)[0])
+        result = index.radius(lat, lon, 3.0)
+        assert {poi_id for poi_id, _ in result} == expected
+        assert [d for _, d in result] == sorted(d for _, d in result)
+        assert [poi_id for poi_id, _ in index.nearest(lat, lon, 20)] == list(np.argsort(distances, kind='stable')[:20])
+
+    start_time = time.perf_counter()
+    for i in range(100):
+        index.radius(38.6 + i * 0.008, 121.6, 3.0)
+        index.nearest(38.6 + i * 0.008, 121.6, 10)
+    assert (time.perf_counter() - start_time) / 100 < 0.05
+
+
+def test_density_grid_and_records():
+    """
+    测试从景点列表记录建立索引（纬度取 gDLat，经度取 gDLon）并生成密度网格
+    """
+    with MockCtripServer(total_attractions=5) as server:
+        scraper = CtripAttractionScraper()
+        scraper.url = server.url('getSightRecreationList')
+        attractions = scraper.get_attractions_list(9, 1, 5)
+    assert extract_coordinates(attractions[0]) == (38.9, 121.6)
+    assert extract_coordinates({'coordinates': {'latitude': None, 'longitude': None}}) is None
+
+    index = GeoIndex.from_records(attractions + [{'poi_id': 1, 'latitude': '', 'longitude': ''}],
+                                  weight_field='review_count')
+    assert len(index) == 5
+    assert index.nearest(38.9, 121.6, 1)[0][0] == attractions[0]['poi_id']
+
+    grid = index.density_grid(cell_km=0.2)
+    assert grid['counts'].sum() == 5
+    assert grid['counts'].shape == (len(grid['lat_edges']) - 1, len(grid['lon_edges']) - 1)
+    weighted = index.density_grid(cell_km=0.2, weighted=True)
+    assert weighted['counts'].sum() == sum(item['review_count'] for item in attractions)
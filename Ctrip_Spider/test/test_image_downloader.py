@@ -0,0 +1,41 @@
+import sys
+import os
+
+# 添加爬虫模块目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from image_downloader import ImageDownloader, iter_image_urls
+from mock_server import MockCtripServer
+from sight_comments import CtripCommentSpider
+
+
+def test_image_downloader_dedupes_and_resumes(tmp_path):
+    """
+    测试评论图片并发下载时按内容去重，中断后重新运行只下载缺少的图片
+    """
+    with MockCtripServer(total_comments=30) as server:
+        spider = CtripCommentSpider(str(tmp_path / 'comments'), page_delay=0, poi_delay=0)
+        spider.post_url = server.url('getCommentCollapseList')
+        assert spider.crawl_comments('76865', '星海广场', max_pages=3)
+        comment_files = [str(tmp_path / 'comments' / '76865_星海广场.csv')]
+        urls = list(iter_image_urls(comment_files))
+        # 第i条评论有 i % 3 张图片，第n张图片的内容都相同
+        assert len(urls) == 30
+
+        store = tmp_path / 'images'
+        stats = ImageDownloader(str(store), max_workers=4).download(urls + urls[:5])
+        assert stats['downloaded'] == 30 and stats['failed'] == 0
+        assert stats['duplicates'] == 28
+        assert server.request_counts['images'] == 30
+        objects = [name for _, _, names in os.walk(store / 'objects') for name in names]
+        assert len(objects) == 2 and all(name.endswith('.jpg') for name in objects)
+
+        # 模拟中断：索引只保留前10条，最后一行写了一半
+        lines = (store / 'index.jsonl').read_text(encoding='utf-8').splitlines(keepends=True)
+        (store / 'index.jsonl').write_text(''.join(lines[:10]) + lines[10][:20], encoding='utf-8')
+        downloader = ImageDownloader(str(store), max_workers=4)
+        stats = downloader.download(iter_image_urls(comment_files))
+        assert stats['skipped'] == 10 and stats['downloaded'] == 20 and stats['bytes'] == 0
+        assert server.request_counts['images'] == 50
+        assert all(os.path.exists(downloader.path_for(url)) for url in urls)
+        assert len(ImageDownloader(str(store)).index) == 30
@@ -30,5 +30,51 @@ def test_logger():
     print("日志测试完成，请查看 logs 目录下的日志文件")
 
 
+def test_summary_logger(caplog):
+    """
+    测试汇总日志模式：高频日志聚合输出，警告和错误逐条输出
+    """
+    logger = CtripSpiderLogger("TestSummarySpider", "logs", summary_interval=3600)
+
+    with caplog.at_level("INFO", logger="TestSummarySpider"):
+        for page in range(1, 101):
+            logger.log_request("https://example.com", 200, 0.1, "POST")
+            logger.log_detail(f"第 {page} 页爬取完成")
+            logger.log_data_extraction(10, "comments")
+            logger.log_progress(page, 200, "comment crawling 76865")
+        logger.warning("第 7 页数据获取失败，跳过")
+        logger.flush_summary()
+
+    messages = [record.getMessage() for record in caplog.records]
+    assert len(messages) == 2
+    assert messages[0] == "第 7 页数据获取失败，跳过"
+    assert "请求: 100" in messages[1]
+    assert "警告: 1" in messages[1]
+    assert "comments=1000" in messages[1]
+    assert "comment crawling 76865 100/200 ETA" in messages[1]
+
+
+def test_summary_progress_eviction(caplog):
+    """
+    测试提前结束或不再更新的阶段不会一直保留在汇总中
+    """
+    logger = CtripSpiderLogger("TestSummaryEviction", "logs", summary_interval=3600)
+
+    with caplog.at_level("INFO", logger="TestSummaryEviction"):
+        logger.log_progress(3, 100, "comment crawling 1")
+        logger.log_progress(5, 100, "comment crawling 2")
+        logger.end_progress("comment crawling 1")
+        logger.flush_summary()
+        logger.flush_summary()
+        logger.flush_summary()
+
+    messages = [record.getMessage() for record in caplog.records]
+    assert "comment crawling 1" not in messages[0]
+    assert "comment crawling 2 5/100" in messages[0]
+    # 停滞的阶段在下一个窗口汇报一次后移除
+    assert "comment crawling 2 5/100" in messages[1]
+    assert "comment crawling 2" not in messages[2]
+
+
 if __name__ == "__main__":
-    test_logger()
\ No newline at end of file
+    test_logger()
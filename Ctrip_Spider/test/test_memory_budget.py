@@ -0,0 +1,58 @@
+import sys
+import os
+import json
+import threading
+import time
+
+# 添加爬虫模块目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from memory_budget import BoundedQueue, MemoryBudget, estimate_size
+from sight_list import JsonArrayWriter
+
+
+def test_bounded_queue_blocks_producer():
+    """
+    测试超出字节预算时生产者阻塞，消费者取出后继续
+    """
+    records = [{'name': '星海广场', 'tags': ['广场'] * 10, 'index': i} for i in range(5)]
+    queue = BoundedQueue(max_rows=100, max_bytes=estimate_size(records[0]) * 2)
+    produced = []
+
+    def producer():
+        for record in records:
+            queue.put(record)
+            produced.append(record['index'])
+
+    thread = threading.Thread(target=producer, daemon=True)
+    thread.start()
+    received = []
+    try:
+        time.sleep(0.1)
+        assert len(produced) == 2
+        assert queue.budget.blocked_count == 1
+    finally:
+        # 无论断言是否通过都取空队列，避免生产者线程永久阻塞
+        for _ in records:
+            received.append(queue.get()['index'])
+        thread.join(timeout=5)
+    assert received == list(range(5))
+    assert queue.budget.peak_rows == 2
+    assert queue.budget.rows == 0 and queue.budget.bytes == 0
+
+    # 没有在途数据时超大记录也能通过，避免死锁
+    budget = MemoryBudget(max_rows=1, max_bytes=10)
+    assert budget.acquire(1, 1000)
+    assert not budget.acquire(1, 1, timeout=0.01)
+
+
+def test_json_array_writer_matches_json_dump(tmp_path):
+    """
+    测试逐条写入的JSON数组与一次性 json.dump 的输出一致
+    """
+    for records in ([], [{'name': '星海广场', 'tags': ['广场', '夜景'], 'coord': {}}, [], 3]):
+        path = tmp_path / 'attractions.json'
+        with JsonArrayWriter(str(path)) as writer:
+            for record in records:
+                writer.write(record)
+        assert path.read_text(encoding='utf-8') == json.dumps(records, ensure_ascii=False, indent=2)
@@ -0,0 +1,144 @@
+import sys
+import os
+import csv
+
+# 添加爬虫模块目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from mock_server import MockCtripServer
+from retry import RetryPolicy
+from sight_comments import CtripCommentSpider
+from sight_detail import AttractionDetailFetcher
+from sight_list import CtripAttractionScraper
+
+
+def test_comment_spider_against_mock_server(tmp_path):
+    """
+    测试评论爬虫在本地模拟服务器上的完整爬取流程
+    """
+    with MockCtripServer(total_comments=30) as server:
+        spider = CtripCommentSpider(str(tmp_path), page_delay=0, poi_delay=0)
+        spider.post_url = server.url('getCommentCollapseList')
+        assert spider.crawl_comments('76865', '星海广场', max_pages=3)
+
+    with open(tmp_path / '76865_星海广场.csv', encoding='utf-8-sig') as f:
+        rows = list(csv.reader(f))
+    assert len(rows) == 31
+    assert len({row[3] for row in rows[1:]}) == 30
+
+
+def test_list_and_detail_against_mock_server():
+    """
+    测试景点列表和景点详情在本地模拟服务器上的解析
+    """
+    with MockCtripServer(total_attractions=45) as server:
+        scraper = CtripAttractionScraper()
+        scraper.url = server.url('getSightRecreationList')
+        attractions = scraper.get_attractions_with_pagination(9, pages=5, count_per_page=20)
+        assert len(attractions) == 45
+
+        fetcher = AttractionDetailFetcher()
+        fetcher.detail_url = server.url('getPoiMoreDetail')
+        detail = fetcher.get_detail(87211)
+        assert detail['success']
+        assert detail['ticket_price'] == '45.5'
+        assert '<' not in detail['description']
+
+
+def test_comment_spider_request_count(tmp_path):
+    """
+    测试首页复用、向上取整的页数计算和pageSize自动探测
+    """
+    with MockCtripServer(total_comments=1005, max_page_size=20) as server:
+        spider = CtripCommentSpider(str(tmp_path), page_delay=0, poi_delay=0)
+        spider.post_url = server.url('getCommentCollapseList')
+        report = spider.crawl_poi('76865', '星海广场')
+
+        # 首次以50请求首页，接口只返回20条，其余页面按20分页，最后不足一页的评论不丢失
+        assert report['page_size'] == 20 and spider.page_size == 20
+        assert report['total_pages'] == 51
+        assert report['comment_count'] == 1005
+        assert server.request_counts['getCommentCollapseList'] == 51
+
+        # 没有评论的景点视为完整
+        server.total_comments = 0
+        assert spider.crawl_poi('75628', '棒棰岛')['success']
+
+    # 首页请求失败时不降低pageSize，也不逐个尝试更小的值
+    with MockCtripServer(total_comments=100, error_rate=1.0) as server:
+        spider = CtripCommentSpider(str(tmp_path), page_delay=0, poi_delay=0,
+                                    retry_policy=RetryPolicy(max_attempts=1))
+        spider.post_url = server.url('getCommentCollapseList')
+        assert not spider.crawl_poi('76865', '星海广场')['success']
+        assert spider.page_size is None
+        assert server.request_counts['getCommentCollapseList'] == 1
+
+
+def test_sharded_comment_crawl(tmp_path):
+    """
+    测试按星级分片爬取能覆盖超过翻页深度的评论并按commentId去重
+    """
+    with MockCtripServer(total_comments=500, max_page_size=10, max_comment_pages=10) as server:
+        spider = CtripCommentSpider(str(tmp_path / 'single'), page_delay=0, poi_delay=0)
+        spider.post_url = server.url('getCommentCollapseList')
+        single = spider.crawl_poi('76865', '星海广场')
+        # 第11页起为空页，遇到第一个空页即停止并在报告中标记
+        assert single['comment_count'] == 100
+        assert server.request_counts['getCommentCollapseList'] == 11
+        assert single['truncated'] and single['crawled_pages'] == 10
+        assert single['completeness'] == 10 / 50
+
+        spider = CtripCommentSpider(str(tmp_path / 'sharded'), page_delay=0, poi_delay=0)
+        spider.post_url = server.url('getCommentCollapseList')
+        report = spider.crawl_comments_sharded('76865', '星海广场', shard_by='star', max_pages=10)
+
+    assert report['success']
+    assert not report['truncated']
+    assert len(report['shards']) == 6
+    assert report['comment_count'] == 500
+    assert report['duplicate_count'] == 100
+    with open(report['file_path'], encoding='utf-8-sig') as f:
+        rows = list(csv.reader(f))[1:]
+    assert len({row[3] for row in rows}) == len(rows) == 500
+    assert [int(row[0]) for row in rows] == list(range(500))
+
+
+def test_get_details_concurrent(tmp_path):
+    """
+    测试批量获取景点详情：并发请求、先完成先返回，失败的景点保留错误结果的结构
+    """
+    with MockCtripServer(latency=0.05) as server:
+        fetcher = AttractionDetailFetcher(max_workers=8)
+        fetcher.detail_url = server.url('getPoiMoreDetail')
+        results = dict(fetcher.get_details(range(1, 41)))
+        assert sorted(results) == list(range(1, 41))
+        assert all(detail['success'] for detail in results.values())
+        assert results[7]['poi_id'] == 7
+        assert server.request_counts['getPoiMoreDetail'] == 40
+        stats = fetcher.batch_stats
+        assert stats['total'] == 40 and stats['failed'] == 0
+        # 串行需要至少 40 × 0.05 = 2 秒
+        assert stats['wall_time'] < 1.5
+        assert stats['latency_p50'] >= 0.05
+        assert fetcher.get_formatted_detail(7, results[7]).startswith("景点名称")
+        assert server.request_counts['getPoiMoreDetail'] == 40
+
+    with MockCtripServer(error_rate=1.0, error_status=404) as server:
+        fetcher = AttractionDetailFetcher(max_workers=4)
+        fetcher.detail_url = server.url('getPoiMoreDetail')
+        results = list(fetcher.get_details([1, 2, 3]))
+        assert sorted(poi_id for poi_id, _ in results) == [1, 2, 3]
+        assert all(not detail['success'] and detail['error_message'] for _, detail in results)
+        assert fetcher.batch_stats['failed'] == 3
+
+    # None 不会被当作迭代结束；提前停止迭代时也会记录统计
+    with MockCtripServer() as server:
+        fetcher = AttractionDetailFetcher(max_workers=2)
+        fetcher.detail_url = server.url('getPoiMoreDetail')
+        assert len(list(fetcher.get_details([None, 1, 2]))) == 3
+        details = fetcher.get_details(range(1, 101))
+        next(details)
+        details.close()
+        assert fetcher.batch_stats['total'] >= 1
+        # 未开始的请求被取消，不会请求剩余的景点
+        assert server.request_counts['getPoiMoreDetail'] < 3 + 10
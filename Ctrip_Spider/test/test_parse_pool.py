@@ -0,0 +1,49 @@
+import sys
+import os
+import csv
+import json
+
+# 添加爬虫模块目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from mock_server import MockCtripServer, build_comment_page
+from parse_pool import ParsePool
+from sight_comments import CtripCommentSpider
+from sight_detail import AttractionDetailFetcher
+
+
+def test_parse_pool_matches_inline_parsing(tmp_path):
+    """
+    测试进程池的批量解析结果与当前线程解析一致，无法解码的页面返回None
+    """
+    spider = CtripCommentSpider(str(tmp_path), page_delay=0, poi_delay=0)
+    pages = [(json.dumps(build_comment_page(76865, page, 10, 100)).encode('utf-8'), '76865', page)
+             for page in range(1, 8)]
+    pages.append((b'not json', '76865', 8))
+    expected = [spider._parse_comments(json.loads(content), poi_id, page) for content, poi_id, page in pages[:-1]]
+
+    with ParsePool(max_workers=2, batch_size=3) as pool:
+        assert pool.parse_comments(pages) == expected + [None]
+        assert pool.parse_comment_page(pages[0][0], '76865', 1) == expected[0]
+        assert pool.batch_count == 4
+
+
+def test_spiders_with_parse_pool_against_mock_server(tmp_path):
+    """
+    测试评论爬虫和详情获取器使用进程池解析时的完整流程
+    """
+    with MockCtripServer(total_comments=30) as server, ParsePool(max_workers=2, batch_size=4) as pool:
+        spider = CtripCommentSpider(str(tmp_path), page_delay=0, poi_delay=0, page_size=10, parse_pool=pool)
+        spider.post_url = server.url('getCommentCollapseList')
+        report = spider.crawl_comments_sharded('76865', '星海广场', max_workers=4)
+        assert report['success']
+
+        fetcher = AttractionDetailFetcher(parse_pool=pool)
+        fetcher.detail_url = server.url('getPoiMoreDetail')
+        detail = fetcher.get_detail(87211)
+        assert detail['success'] and detail['ticket_price'] == '45.5'
+        assert '<' not in detail['description']
+
+    with open(tmp_path / '76865_星海广场.csv', encoding='utf-8-sig') as f:
+        rows = list(csv.reader(f))
+    assert len({row[3] for row in rows[1:]}) == 30
@@ -0,0 +1,77 @@
+import sys
+import os
+import json
+
+# 添加爬虫模块目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from mock_server import MockCtripServer
+from pipeline import CrawlPipeline
+from sight_comments import CtripCommentSpider
+from sight_detail import AttractionDetailFetcher
+from sight_list import CtripAttractionScraper
+
+
+def test_pipeline_against_mock_server(tmp_path):
+    """
+    测试流水线在小队列（背压）下完成列表、详情和评论三个阶段
+    """
+    with MockCtripServer(total_attractions=7, total_comments=15) as server:
+        scraper = CtripAttractionScraper()
+        scraper.url = server.url('getSightRecreationList')
+        fetcher = AttractionDetailFetcher()
+        fetcher.detail_url = server.url('getPoiMoreDetail')
+        spider = CtripCommentSpider(str(tmp_path / 'comments'), page_delay=0, poi_delay=0)
+        spider.post_url = server.url('getCommentCollapseList')
+
+        pipeline = CrawlPipeline(str(tmp_path), list_workers=2, detail_workers=3, comment_workers=2,
+                                 queue_size=2, max_inflight_bytes=1, scraper=scraper, detail_fetcher=fetcher,
+                                 comment_spider=spider)
+        summary = pipeline.run(9, pages=10, count_per_page=3)
+
+    assert summary['attractions'] == 7
+    assert summary['details_ok'] == 7
+    assert summary['comment_pois_ok'] == 7
+    assert summary['comments'] == 7 * 15
+    assert summary['errors'] == 0
+    # 字节预算小于单条记录时，队列中最多只有一条记录
+    assert summary['queue_peak']['detail'] == 1
+    assert summary['peak_rss_mb'] > 0
+
+    with open(summary['attractions_file'], encoding='utf-8') as f:
+        attractions = json.load(f)
+    # 多个列表线程并发时景点文件仍按页码顺序写入
+    assert [item['poi_id'] for item in attractions] == [9000000 + i for i in range(7)]
+    with open(summary['details_file'], encoding='utf-8') as f:
+        assert len(f.readlines()) == 7
+    assert len([name for name in os.listdir(summary['comments_dir']) if name.endswith('.csv')]) == 7
+
+
+class FlakyScraper(CtripAttractionScraper):
+    """第1页获取失败的景点列表爬虫"""
+
+    def fetch_attractions_page(self, district_id, page=1, count=20):
+        if page == 1:
+            return None
+        return super().fetch_attractions_page(district_id, page, count)
+
+
+def test_pipeline_list_failure_is_not_end_of_list(tmp_path):
+    """
+    测试景点列表页获取失败时记为错误，后续页面继续爬取
+    """
+    with MockCtripServer(total_attractions=7, total_comments=5) as server:
+        scraper = FlakyScraper()
+        scraper.url = server.url('getSightRecreationList')
+        fetcher = AttractionDetailFetcher()
+        fetcher.detail_url = server.url('getPoiMoreDetail')
+        spider = CtripCommentSpider(str(tmp_path / 'comments'), page_delay=0, poi_delay=0)
+        spider.post_url = server.url('getCommentCollapseList')
+
+        pipeline = CrawlPipeline(str(tmp_path), scraper=scraper, detail_fetcher=fetcher, comment_spider=spider)
+        summary = pipeline.run(9, pages=10, count_per_page=3)
+
+    assert summary['errors'] == 1
+    assert summary['attractions'] == 4
+    with open(summary['attractions_file'], encoding='utf-8') as f:
+        assert [item['poi_id'] for item in json.load(f)] == [9000003 + i for i in range(4)]
@@ -0,0 +1,47 @@
+import sys
+import os
+import time
+
+# 添加爬虫模块目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from profiler import StageTracer, profile_call
+
+
+def test_stage_tracer():
+    """
+    测试阶段计时器按景点和整次运行聚合
+    """
+    tracer = StageTracer()
+    for poi_id in ('76865', '75628'):
+        with tracer.span('fetch', poi_id):
+            time.sleep(0.01)
+        with tracer.span('parse', poi_id):
+            pass
+
+    run_stats = tracer.get_stats()
+    assert run_stats['fetch']['count'] == 2
+    assert run_stats['fetch']['total'] >= 0.02
+    assert tracer.get_stats('76865')['parse']['count'] == 1
+    assert "fetch 2次" in tracer.report()
+
+
+def test_profile_call(tmp_path):
+    """
+    测试分析器输出 pstats 和 collapsed stack 文件
+    """
+    def busy_work():
+        deadline = time.time() + 0.05
+        while time.time() < deadline:
+            sum(range(1000))
+        return 'done'
+
+    prof_path = tmp_path / 'crawl.prof'
+    assert profile_call(busy_work, output_path=str(prof_path), mode='cprofile') == 'done'
+    assert prof_path.stat().st_size > 0
+
+    folded_path = tmp_path / 'crawl.folded'
+    assert profile_call(busy_work, output_path=str(folded_path), mode='sampling', interval=0.001) == 'done'
+    lines = folded_path.read_text(encoding='utf-8').splitlines()
+    assert lines and all(line.rsplit(' ', 1)[1].isdigit() for line in lines)
+    assert any('busy_work' in line for line in lines)
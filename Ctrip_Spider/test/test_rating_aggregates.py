@@ -0,0 +1,76 @@
+import sys
+import os
+
+# 添加爬虫模块目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from mock_server import MockCtripServer
+from rating_aggregates import RatingAggregateStore
+from sight_comments import CtripCommentSpider
+
+
+def test_aggregates_follow_comment_writes(tmp_path):
+    """
+    测试评论写入时增量更新的汇总与从CSV重建的汇总一致，重新爬取时不重复计数
+    """
+    store = RatingAggregateStore(str(tmp_path / 'ratings.db'))
+    with MockCtripServer(total_comments=400) as server:
+        spider = CtripCommentSpider(str(tmp_path / 'comments'), page_delay=0, poi_delay=0, aggregates=store)
+        spider.post_url = server.url('getCommentCollapseList')
+        assert spider.crawl_comments('76865', '星海广场', max_pages=50)
+        assert spider.crawl_comments('76866', '老虎滩', max_pages=50)
+        # 重新爬取同一景点，CSV被重写，汇总不能重复计数
+        assert spider.crawl_comments('76865', '星海广场', max_pages=50)
+
+    summary = store.get('76865')
+    assert summary['count'] == 400
+    assert summary['histogram'] == {str(star): 80 for star in range(1, 6)}
+    assert summary['mean']['overall'] == 3.0
+    assert abs(summary['std']['overall'] - 2 ** 0.5) < 1e-9
+    assert summary['mean']['scenery'] == 5.0 and summary['std']['scenery'] == 0.0
+    assert summary['tourist_types'] == {'家庭亲子': 100, '情侣夫妻': 100, '朋友出游': 100, '独自旅行': 100}
+    assert store.get()['count'] == 800
+    assert store.rollup(['76865', '76866'])['count'] == 800
+
+    trend = store.trend('76865')
+    assert [period for period, _ in trend] == ['2023-10', '2023-11']
+    assert sum(month['count'] for _, month in trend) == 400
+    assert store.get(period='2023-10')['count'] == 2 * trend[0][1]['count']
+
+    # 从CSV重建得到相同的汇总
+    rebuilt = RatingAggregateStore(str(tmp_path / 'rebuilt.db'))
+    comment_files = sorted(str(path) for path in (tmp_path / 'comments').glob('*.csv'))
+    assert rebuilt.backfill(comment_files) == 800
+    assert rebuilt.get() == store.get()
+    assert rebuilt.trend('76866') == store.trend('76866')
+
+    store.reset_poi('76866')
+    assert store.get('76866') is None
+    assert store.get() == store.get('76865')
+
+
+def test_duplicate_writes_and_multi_poi_backfill(tmp_path):
+    """
+    测试重复写入的评论只计一次，从多景点的分段文件重建时按每行的景区ID归属
+    """
+    store = RatingAggregateStore(str(tmp_path / 'ratings.db'))
+    with MockCtripServer(total_comments=30) as server:
+        spider = CtripCommentSpider(str(tmp_path / 'comments'), page_delay=0, poi_delay=0, aggregates=store)
+        spider.post_url = server.url('getCommentCollapseList')
+        assert spider.crawl_comments('1', '星海广场', max_pages=5)
+        assert spider.crawl_comments('2', '老虎滩', max_pages=5)
+        comments = spider._get_page_comments('1', 1, 10)
+    # 任务重新执行、死信重放时同一批评论再次写入
+    store.add_comments('1', comments)
+    assert store.get('1')['count'] == 30 and store.get()['count'] == 60
+
+    segment = tmp_path / 'segment-00000.csv'
+    with open(segment, 'w', encoding='utf-8-sig') as out:
+        for index, name in enumerate(['1_星海广场.csv', '2_老虎滩.csv']):
+            with open(tmp_path / 'comments' / name, encoding='utf-8-sig') as f:
+                out.writelines(f.readlines()[index:])
+    rebuilt = RatingAggregateStore(str(tmp_path / 'rebuilt.db'))
+    assert rebuilt.backfill([str(segment)]) == 60
+    assert rebuilt.get('1') == store.get('1') and rebuilt.get('2') == store.get('2')
+    assert rebuilt.backfill([str(segment)]) == 60
+    assert rebuilt.get() == store.get()
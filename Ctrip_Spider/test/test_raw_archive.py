@@ -0,0 +1,102 @@
+import sys
+import os
+import json
+
+# 添加爬虫模块目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from mock_server import MockCtripServer, build_comment_page
+from raw_archive import RawArchive
+from sight_comments import CtripCommentSpider
+
+
+def test_append_and_random_read(tmp_path):
+    """
+    测试追加写入、按 (景点, 页码, 时间) 随机读取、分段切换和重新打开
+    """
+    archive = RawArchive(str(tmp_path), codec='gzip', segment_max_bytes=4096)
+    raw_size = 0
+    for page in range(1, 21):
+        payload = json.dumps(build_comment_page('76865', page, 10, 1000), ensure_ascii=False).encode('utf-8')
+        raw_size += len(payload)
+        archive.append('comments', '76865', page, payload, fetched_at=1000.0)
+    archive.append('comments', '76865', 1, b'{"result": {"items": []}}', fetched_at=2000.0)
+
+    stats = archive.stats()
+    assert stats['records'] == 21
+    assert stats['stored_bytes'] < raw_size / 4
+    assert len([name for name in os.listdir(tmp_path) if name.startswith('segment-')]) > 1
+
+    assert archive.get_json('comments', 76865, 1) == {'result': {'items': []}}
+    assert len(archive.get_json('comments', 76865, 1, fetched_at=1500.0)['result']['items']) == 10
+    assert archive.versions('comments', 76865, 1) == [1000.0, 2000.0]
+    assert archive.get('detail', 76865, 0) is None
+    archive.close()
+
+    reopened = RawArchive(str(tmp_path))
+    assert reopened.codec == 'gzip'
+    assert reopened.get_json('comments', 76865, 20)['result']['items'][0]['userInfo']['userNick'] == '游客190'
+    assert reopened.keys('comments')[0] == ('comments', 76865, 1, 0, 0, 0)
+    reopened.close()
+
+
+def test_torn_index_record_is_truncated(tmp_path):
+    """
+    测试索引末尾写了一半的记录在重新打开时被截断，之后追加的记录仍可读取
+    """
+    archive = RawArchive(str(tmp_path), codec='gzip')
+    archive.append('comments', '76865', 1, b'{"page": 1}', fetched_at=1000.0)
+    archive.close()
+    with open(tmp_path / 'index.bin', 'ab') as f:
+        f.write(b'\x00' * 7)
+
+    reopened = RawArchive(str(tmp_path))
+    assert os.path.getsize(tmp_path / 'index.bin') == RawArchive.INDEX_RECORD.size
+    reopened.append('comments', '76865', 2, b'{"page": 2}', fetched_at=1000.0)
+    reopened.close()
+
+    again = RawArchive(str(tmp_path))
+    assert again.get_json('comments', 76865, 1) == {'page': 1}
+    assert again.get_json('comments', 76865, 2) == {'page': 2}
+    again.close()
+
+
+def test_comment_spider_archives_pages(tmp_path):
+    """
+    测试评论爬虫将每页原始响应写入归档，首页探测的不同 pageSize 分别索引
+    """
+    archive = RawArchive(str(tmp_path / 'archive'), codec='gzip')
+    with MockCtripServer(total_comments=300, max_page_size=20) as server:
+        spider = CtripCommentSpider(str(tmp_path / 'csv'), page_delay=0, poi_delay=0, archive=archive)
+        spider.post_url = server.url('getCommentCollapseList')
+        assert spider.crawl_comments('76865', '星海广场', max_pages=3)
+        assert spider._get_page_comments('76865', 1, 20, star_type=5)
+    assert archive.get_json('comments', 76865, 1)['result']['totalCount'] == 300
+    assert archive.get_json('comments', 76865, 2, page_size=20) is not None
+    assert archive.get_json('comments', 76865, 2, page_size=50) is None
+    # 首页以50请求（接口只返回20条），其余页按20请求；星级筛选的首页单独索引
+    assert [key for key in archive.keys('comments') if key[2] == 1] == [
+        ('comments', 76865, 1, 20, 5, 0), ('comments', 76865, 1, 50, 0, 0)]
+    archive.close()
+
+
+def test_legacy_index_is_upgraded(tmp_path):
+    """
+    测试旧版本（没有 pageSize 和筛选条件）的索引在打开时升级，记录仍可读取
+    """
+    archive = RawArchive(str(tmp_path), codec='gzip')
+    archive.append('comments', '76865', 1, b'{"page": 1}', fetched_at=1000.0)
+    archive.close()
+    with open(tmp_path / 'index.bin', 'rb') as f:
+        record = RawArchive.INDEX_RECORD.unpack(f.read())
+    with open(tmp_path / 'index.bin', 'wb') as f:
+        f.write(RawArchive.LEGACY_INDEX_RECORD.pack(*record[:3], *record[6:]))
+    with open(tmp_path / 'manifest.json', 'w', encoding='utf-8') as f:
+        json.dump({'codec': 'gzip'}, f)
+
+    reopened = RawArchive(str(tmp_path))
+    assert reopened.get_json('comments', 76865, 1) == {'page': 1}
+    assert reopened.keys() == [('comments', 76865, 1, 0, 0, 0)]
+    reopened.close()
+    with open(tmp_path / 'manifest.json', encoding='utf-8') as f:
+        assert json.load(f)['index_version'] == RawArchive.INDEX_VERSION
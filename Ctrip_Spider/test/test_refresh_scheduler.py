@@ -0,0 +1,105 @@
+import sys
+import os
+import csv
+
+# 添加爬虫模块目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from mock_server import MockCtripServer
+from refresh_scheduler import RefreshScheduler, SECONDS_PER_DAY
+from retry import RetryPolicy
+from sight_comments import CtripCommentSpider
+
+
+def test_refresh_priorities(tmp_path):
+    """
+    测试按评论数变化估算新增速率，并在请求预算内按优先级安排刷新
+    """
+    scheduler = RefreshScheduler(str(tmp_path / 'state.json'), page_size=10)
+    day0 = 1_700_000_000
+    scheduler.observe([{'poi_id': 1, 'name': '热门', 'review_count': 10000},
+                       {'poi_id': 2, 'name': '冷门', 'review_count': 20000},
+                       {'poi_id': 3, 'name': '新景点', 'review_count': 5}], observed_at=day0)
+    scheduler.observe([{'poi_id': 1, 'review_count': 10300}, {'poi_id': 2, 'review_count': 20001}],
+                      observed_at=day0 + 10 * SECONDS_PER_DAY)
+    assert scheduler.pois['1']['comments_per_day'] == 30
+    assert scheduler.pois['2']['comments_per_day'] == 0.1
+    for poi_id in ('1', '2', '3'):
+        scheduler.record_crawl(poi_id, 0, crawled_at=day0 + 10 * SECONDS_PER_DAY)
+
+    # 两天后热门景点预计新增60条，评论总数更多的冷门景点几乎没有变化
+    now = day0 + 12 * SECONDS_PER_DAY
+    plan = scheduler.plan(budget=5, now=now)
+    assert [task['poi_id'] for task in plan] == ['1']
+    assert plan[0]['max_pages'] == 5
+    plan = scheduler.plan(budget=100, now=now)
+    assert [task['poi_id'] for task in plan] == ['1', '2', '3']
+    assert [task['max_pages'] for task in plan] == [6, 1, 1]
+
+    scheduler.save()
+    assert RefreshScheduler(str(tmp_path / 'state.json')).pois == scheduler.pois
+
+
+def test_refresh_run_against_mock_server(tmp_path):
+    """
+    测试刷新只追加新评论，并且实际请求数不超过预算
+    """
+    scheduler = RefreshScheduler(str(tmp_path / 'state.json'), page_size=10)
+    scheduler.observe([{'poi_id': 76865, 'name': '星海广场', 'review_count': 25}])
+
+    with MockCtripServer(total_comments=25) as server:
+        spider = CtripCommentSpider(str(tmp_path), page_delay=0, poi_delay=0, page_size=10)
+        spider.post_url = server.url('getCommentCollapseList')
+        first = scheduler.run(spider, budget=10)
+        assert first == {'requests': 3, 'new_comments': 25, 'refreshed': ['76865']}
+
+        # 已爬取过的景点增量刷新，首页全部已保存，只请求一页
+        scheduler.pois['76865']['last_crawled'] -= 30 * SECONDS_PER_DAY
+        second = scheduler.run(spider, budget=10)
+        assert second == {'requests': 1, 'new_comments': 0, 'refreshed': ['76865']}
+        assert server.request_counts['getCommentCollapseList'] == 4
+
+    with open(tmp_path / '76865_星海广场.csv', encoding='utf-8-sig') as f:
+        assert len(list(csv.reader(f))) == 26
+
+
+def test_refresh_budget_counts_retries(tmp_path):
+    """
+    测试重试和重新排队也计入请求预算，服务器收到的请求数不超过预算
+    """
+    scheduler = RefreshScheduler(str(tmp_path / 'state.json'), page_size=10)
+    scheduler.observe([{'poi_id': 76865, 'name': '星海广场', 'review_count': 200}])
+
+    with MockCtripServer(total_comments=200, error_rate=0.5, seed=3) as server:
+        spider = CtripCommentSpider(str(tmp_path), page_delay=0, poi_delay=0, page_size=10,
+                                    retry_policy=RetryPolicy(base_delay=0, jitter=False))
+        spider.post_url = server.url('getCommentCollapseList')
+        result = scheduler.run(spider, budget=6)
+        assert server.error_counts['getCommentCollapseList'] > 0
+        assert result['requests'] == server.request_counts['getCommentCollapseList'] <= 6
+
+
+def test_incomplete_refresh_resumes_without_gap(tmp_path):
+    """
+    测试因页数限制没有追上已保存评论的刷新记为未完成，下次从续爬位置继续，不会漏掉中间的评论
+    """
+    with MockCtripServer(total_comments=50) as server:
+        spider = CtripCommentSpider(str(tmp_path), page_delay=0, poi_delay=0, page_size=10)
+        spider.post_url = server.url('getCommentCollapseList')
+        assert spider.crawl_comments('76865', '星海广场')
+        # 只保留较早的20条评论，模拟上次爬取之后又发布了30条新评论
+        file_path = tmp_path / '76865_星海广场.csv'
+        with open(file_path, encoding='utf-8-sig') as f:
+            rows = list(csv.reader(f))
+        with open(file_path, 'w', encoding='utf-8-sig', newline='') as f:
+            csv.writer(f).writerows(rows[:1] + rows[31:])
+
+        # 每次只允许一个请求：前三次各补10条新评论，第四次遇到已保存的评论才算追上
+        results = [spider.refresh_poi('76865', '星海广场', max_pages=1) for _ in range(4)]
+        assert [result['success'] for result in results] == [False, False, False, True]
+        assert [result['new_comments'] for result in results] == [10, 10, 10, 0]
+        assert not os.path.exists(str(file_path) + '.refresh.json')
+
+    with open(file_path, encoding='utf-8-sig') as f:
+        comment_ids = [row[3] for row in list(csv.reader(f))[1:]]
+    assert len(comment_ids) == len(set(comment_ids)) == 50
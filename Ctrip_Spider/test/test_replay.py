@@ -0,0 +1,45 @@
+import sys
+import os
+import json
+
+# 添加爬虫模块目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from mock_server import MockCtripServer
+from replay import RecordingSession, ReplaySession, reparse_comments
+from sight_comments import CtripCommentSpider
+from sight_detail import AttractionDetailFetcher
+
+
+def test_record_and_replay(tmp_path):
+    """
+    测试录制的响应可以在没有网络的情况下经由相同代码路径回放
+    """
+    record_dir = str(tmp_path / 'recordings')
+    with MockCtripServer(total_comments=30) as server:
+        recorder = RecordingSession(record_dir)
+        spider = CtripCommentSpider(str(tmp_path / 'live'), page_delay=0, poi_delay=0, session=recorder)
+        spider.post_url = server.url('getCommentCollapseList')
+        assert spider.crawl_comments('76865', '76865', max_pages=3)
+
+        fetcher = AttractionDetailFetcher(session=recorder)
+        fetcher.detail_url = server.url('getPoiMoreDetail')
+        live_detail = fetcher.get_detail(87211)
+        assert recorder.record_count > 0
+
+    # 服务器已关闭，回放不访问网络
+    replay = ReplaySession(record_dir)
+    fetcher = AttractionDetailFetcher(session=replay)
+    fetcher.detail_url = 'http://unreachable.invalid/restapi/soa2/18254/json/getPoiMoreDetail'
+    assert fetcher.get_detail(87211) == live_detail
+    assert not fetcher.get_detail(99999)['success']
+
+    results = reparse_comments(record_dir, str(tmp_path / 'replayed'), max_pages=3)
+    assert [report['success'] for report in results.values()] == [True]
+    report_files = list((tmp_path / 'replayed').glob('crawl_reports_*.jsonl'))
+    assert len(report_files) == 1
+    with open(report_files[0], encoding='utf-8') as f:
+        assert [json.loads(line)['success'] for line in f] == [True]
+    live_csv = (tmp_path / 'live' / '76865_76865.csv').read_text(encoding='utf-8-sig')
+    replayed_csv = (tmp_path / 'replayed' / '76865_76865.csv').read_text(encoding='utf-8-sig')
+    assert live_csv == replayed_csv
@@ -0,0 +1,100 @@
+import sys
+import os
+
+import requests
+
+# 添加爬虫模块目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from mock_server import MockCtripServer
+from retry import RequestBudgetExhausted, RetryPolicy
+from sight_comments import CtripCommentSpider
+
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+def test_retry_classification_and_retry_after():
+    """
+    测试可重试错误分类、Retry-After 处理和重试次数上限
+    """
+    sleeps = []
+    policy = RetryPolicy(max_attempts=3, base_delay=0.5, jitter=False, sleep=sleeps.append)
+    responses = iter([FakeResponse(503, {'Retry-After': '2'}), FakeResponse(429), FakeResponse(200)])
+    assert policy.call(lambda: next(responses)).status_code == 200
+    assert sleeps == [2.0, 1.0]
+
+    # 4xx（429除外）不重试
+    sleeps.clear()
+    assert policy.call(lambda: FakeResponse(404)).status_code == 404
+    assert sleeps == []
+
+    # 重试耗尽后抛出最后一个异常
+    attempts = []
+
+    def timeout():
+        attempts.append(1)
+        raise requests.Timeout("read timeout")
+
+    try:
+        policy.call(timeout)
+        assert False, "应当抛出异常"
+    except requests.Timeout:
+        pass
+    assert len(attempts) == 3
+
+    # 不可重试的异常立即抛出
+    try:
+        policy.call(lambda: 1 / 0)
+        assert False, "应当抛出异常"
+    except ZeroDivisionError:
+        pass
+
+
+def test_retry_deadline():
+    """
+    测试等待会超过总时限时不再重试
+    """
+    sleeps = []
+    policy = RetryPolicy(max_attempts=10, deadline=5, jitter=False, sleep=sleeps.append)
+    assert policy.call(lambda: FakeResponse(503, {'Retry-After': '60'})).status_code == 503
+    assert sleeps == []
+
+
+def test_request_budget():
+    """
+    测试请求预算计入每次实际请求，用完后不再重试也不再发送新请求
+    """
+    sleeps = []
+    policy = RetryPolicy(max_attempts=5, jitter=False, sleep=sleeps.append)
+    with policy.request_budget(3):
+        assert policy.call(lambda: FakeResponse(200)).status_code == 200
+        # 第二次请求失败后只剩一次预算可用于重试
+        assert policy.call(lambda: FakeResponse(503)).status_code == 503
+        assert policy.remaining_attempts() == 0
+        try:
+            policy.call(lambda: FakeResponse(200))
+            assert False, "应当抛出异常"
+        except RequestBudgetExhausted:
+            pass
+    assert policy.attempt_count == 3
+    assert len(sleeps) == 1
+    assert policy.remaining_attempts() is None
+
+
+def test_comment_spider_recovers_transient_errors(tmp_path):
+    """
+    测试评论爬虫在间歇性5xx错误下通过重试获取全部页面
+    """
+    with MockCtripServer(total_comments=100, error_rate=0.3, seed=1) as server:
+        policy = RetryPolicy(max_attempts=10, base_delay=0.001)
+        spider = CtripCommentSpider(str(tmp_path), page_delay=0, poi_delay=0, retry_policy=policy)
+        spider.post_url = server.url('getCommentCollapseList')
+        assert spider.crawl_comments('76865', '星海广场', max_pages=10)
+        assert server.error_counts['getCommentCollapseList'] > 0
+
+    with open(tmp_path / '76865_星海广场.csv', encoding='utf-8-sig') as f:
+        assert sum(1 for _ in f) == 101
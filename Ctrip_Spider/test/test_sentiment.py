@@ -0,0 +1,63 @@
+import sys
+import os
+import csv
+
+# 添加爬虫模块目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from sentiment import LexiconSentimentModel, SentimentAnalyzer, sentiment_label
+from sight_comments import CtripCommentSpider
+
+
+def write_comments(file_path, poi_id, poi_name, rows):
+    """按评论爬虫的格式写入评论CSV"""
+    comments = [{'commentId': comment_id, 'userNick': '游客', 'score': score, 'content': content,
+                 'publishTime': '2024-01-01', 'usefulCount': 0, 'replyCount': 0, 'touristTypeDisplay': '',
+                 'ipLocatedName': '', 'timeDuration': '', 'imageCount': 0, 'imageUrls': [],
+                 'sceneryScore': '', 'funScore': '', 'valueScore': '', 'recommendItems': []}
+                for comment_id, score, content in rows]
+    with open(file_path, 'w', newline='', encoding='utf-8-sig') as f:
+        csv.writer(f).writerow(CtripCommentSpider.CSV_HEADER)
+        CtripCommentSpider._write_comment_rows(f, comments, poi_id, poi_name, 0)
+
+
+def test_lexicon_model():
+    """
+    测试情感词典的否定词和程度副词处理
+    """
+    model = LexiconSentimentModel()
+    assert model.score("景色非常漂亮，值得一去") > 0.2
+    assert model.score("太坑了，非常失望") < -0.2
+    assert model.score("不太好玩") < 0
+    assert model.score("今天去了") == 0.0
+    assert sentiment_label(0.5) == 'positive' and sentiment_label(0.0) == 'neutral'
+
+
+def test_analyzer_caches_scores(tmp_path):
+    """
+    测试多进程打分、景点汇总，以及重复运行时只对新增或修改过的评论打分
+    """
+    comments_dir = tmp_path / 'comments'
+    comments_dir.mkdir()
+    write_comments(comments_dir / '1_海滩.csv', '1', '海滩', [
+        (101, 5, "风景优美，非常推荐"), (102, 4, "干净整洁，很方便"), (103, 1, "排队太久，很失望")])
+    write_comments(comments_dir / '2_古镇.csv', '2', '古镇', [(201, 2, "商业化严重，很坑")])
+    cache_file = str(tmp_path / 'cache.jsonl')
+
+    summary = SentimentAnalyzer(cache_file, max_workers=2, chunk_size=2, batch_size=1).analyze_directory(
+        str(comments_dir), str(tmp_path / 'out'))
+    assert summary['1']['count'] == 3
+    assert summary['1']['positive'] == 2 and summary['1']['negative'] == 1
+    assert summary['1']['mean_rating'] == round(10 / 3, 2)
+    assert summary['2']['negative'] == 1 and summary['2']['poi_name'] == '古镇'
+    with open(tmp_path / 'out' / 'sentiment_scores.csv', encoding='utf-8-sig') as f:
+        assert len(list(csv.reader(f))) == 5
+    with open(cache_file, encoding='utf-8') as f:
+        assert len(f.readlines()) == 4
+
+    # 修改一条评论并新增一条，只有这两条重新打分
+    write_comments(comments_dir / '2_古镇.csv', '2', '古镇', [(201, 5, "古色古香，很美"), (202, 5, "好玩")])
+    summary = SentimentAnalyzer(cache_file).analyze_directory(str(comments_dir), str(tmp_path / 'out'))
+    assert summary['2']['positive'] == 2
+    with open(cache_file, encoding='utf-8') as f:
+        assert len(f.readlines()) == 6
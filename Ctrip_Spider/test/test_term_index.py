@@ -0,0 +1,96 @@
+import sys
+import os
+import csv
+
+# 添加爬虫模块目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from sight_comments import CtripCommentSpider
+from term_index import TermFrequencyIndex, tokenize
+
+
+def append_comments(file_path, poi_id, poi_name, contents, start_index=0):
+    """按评论爬虫的格式追加评论，文件不存在时写入表头"""
+    comments = [{'commentId': start_index + i, 'userNick': '游客', 'score': 5, 'content': content,
+                 'publishTime': '2024-01-01', 'usefulCount': 0, 'replyCount': 0, 'touristTypeDisplay': '',
+                 'ipLocatedName': '', 'timeDuration': '', 'imageCount': 0, 'imageUrls': [],
+                 'sceneryScore': '', 'funScore': '', 'valueScore': '', 'recommendItems': []}
+                for i, content in enumerate(contents)]
+    new_file = not os.path.exists(file_path)
+    with open(file_path, 'a', newline='', encoding='utf-8-sig') as f:
+        if new_file:
+            csv.writer(f).writerow(CtripCommentSpider.CSV_HEADER)
+        CtripCommentSpider._write_comment_rows(f, comments, poi_id, poi_name, start_index)
+
+
+def test_incremental_term_index(tmp_path):
+    """
+    测试词频索引只统计新追加的评论，并按景点、城市和全局三级汇总
+    """
+    assert '景色' in tokenize("景色很美")
+    comments_dir = tmp_path / 'comments'
+    comments_dir.mkdir()
+    beach, town = comments_dir / '1_海滩.csv', comments_dir / '2_古镇.csv'
+    append_comments(beach, '1', '海滩', ["沙滩干净，海水清澈", "沙滩很大"])
+    append_comments(town, '2', '古镇', ["古镇夜景漂亮", "夜景值得一看"])
+
+    index = TermFrequencyIndex(str(tmp_path / 'index'))
+    index.observe_attractions([{'poi_id': 1, 'city_name': '三亚'}, {'poi_id': 2, 'city_name': '丽江'}])
+    assert index.update(str(comments_dir)) == 4
+    assert index.top_terms(1, poi_id=1) == [('沙滩', 2)]
+    assert index.top_terms(1, city='丽江') == [('夜景', 2)]
+
+    # 重新打开索引后只统计新追加的评论
+    append_comments(beach, '1', '海滩', ["夜景一般，沙滩不错"], start_index=2)
+    index = TermFrequencyIndex(str(tmp_path / 'index'))
+    assert index.update(str(comments_dir)) == 1
+    assert index.update(str(comments_dir)) == 0
+    assert dict(index.top_terms(2)) == {'沙滩': 3, '夜景': 3}
+    assert dict(index.top_terms(10, city='三亚'))['夜景'] == 1
+
+    # 重新爬取的文件撤销旧计数后重新统计
+    os.remove(beach)
+    append_comments(beach, '1', '海滩', ["日落"])
+    assert index.update(str(comments_dir)) == 1
+    assert index.top_terms(5, poi_id=1) == [('日落', 1)]
+    terms = dict(index.top_terms(100))
+    assert '沙滩' not in terms
+    assert terms['夜景'] == 2 and terms['日落'] == 1
+
+
+def test_recrawled_larger_file_is_recounted(tmp_path):
+    """
+    测试重新爬取后文件比原来更长时也会撤销旧计数，从头重新统计
+    """
+    comments_dir = tmp_path / 'comments'
+    comments_dir.mkdir()
+    beach = comments_dir / '1_海滩.csv'
+    append_comments(beach, '1', '海滩', ["沙滩很大"])
+    index = TermFrequencyIndex(str(tmp_path / 'index'))
+    assert index.update(str(comments_dir)) == 1
+
+    os.remove(beach)
+    append_comments(beach, '1', '海滩', ["日落很美"] * 3, start_index=100)
+    index = TermFrequencyIndex(str(tmp_path / 'index'))
+    assert index.update(str(comments_dir)) == 3
+    terms = dict(index.top_terms(100))
+    assert '沙滩' not in terms
+    assert terms['日落'] == 3
+
+
+def test_recrawl_in_later_partition_replaces_counts(tmp_path):
+    """
+    测试分区数据集中同一景点在更晚日期分区的新文件代替旧文件，旧计数被撤销
+    """
+    city_dir = tmp_path / 'comments' / 'province=海南' / 'city=三亚'
+    (city_dir / 'date=2024-05-01').mkdir(parents=True)
+    append_comments(city_dir / 'date=2024-05-01' / '1_海滩.csv', '1', '海滩', ["沙滩很大"])
+    index = TermFrequencyIndex(str(tmp_path / 'index'))
+    assert index.update(str(tmp_path / 'comments')) == 1
+
+    (city_dir / 'date=2024-06-01').mkdir()
+    append_comments(city_dir / 'date=2024-06-01' / '1_海滩.csv', '1', '海滩', ["日落很美"] * 2)
+    assert index.update(str(tmp_path / 'comments')) == 2
+    assert index.update(str(tmp_path / 'comments')) == 0
+    terms = dict(index.top_terms(100))
+    assert '沙滩' not in terms and terms['日落'] == 2